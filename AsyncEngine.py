@@ -0,0 +1,117 @@
+import asyncio
+import json
+import logging
+
+import aiohttp
+from appwrite.exception import AppwriteException
+
+
+class AsyncAppwriteClient:
+    """Asyncio client for the database REST endpoints the Appwrite SDK calls.
+
+    One pooled keep-alive session is shared by every request, so thousands of
+    requests can be in flight from a single thread without one OS thread each.
+    """
+
+    def __init__(self, endpoint, project, key, max_connections=1000, keepalive_timeout=30, timeout=60):
+        self.endpoint = endpoint.rstrip('/')
+        self.headers = {
+            'content-type': 'application/json',
+            'x-appwrite-project': project,
+            'x-appwrite-key': key,
+        }
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            json_serialize=json.dumps
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+        self.session = None
+
+    async def call(self, method, path, params=None, body=None):
+        """Send one request and return the decoded JSON body, raising AppwriteException on errors.
+
+        Like TransportClient.call, only application/json bodies are decoded;
+        others (e.g. a proxy's HTML error page) are returned or reported as text.
+        """
+        async with self.session.request(method, self.endpoint + path, params=params, json=body) as response:
+            text = await response.text()
+            is_json = response.headers.get('Content-Type', '').startswith('application/json')
+            if response.status >= 400:
+                try:
+                    payload = json.loads(text) if is_json and text else {}
+                except ValueError:
+                    payload = {}
+                message = payload.get('message', text) if isinstance(payload, dict) else text
+                error_type = payload.get('type') if isinstance(payload, dict) else None
+                error = AppwriteException(message, response.status, error_type, text)
+                # Lets the request governor honour X-RateLimit-Reset on throttled responses
+                error.headers = dict(response.headers)
+                raise error
+            if not is_json:
+                return text
+            return json.loads(text) if text else {}
+
+    @staticmethod
+    def _documents_path(database_id, collection_id):
+        return f'/databases/{database_id}/collections/{collection_id}/documents'
+
+    @staticmethod
+    def _query_params(queries):
+        # Same flattening the SDK applies to list parameters on GET requests
+        return [(f'queries[{index}]', query) for index, query in enumerate(queries or [])]
+
+    async def create_document(self, database_id, collection_id, document_id, data, permissions=None):
+        body = {'documentId': document_id, 'data': data}
+        if permissions is not None:
+            body['permissions'] = permissions
+        return await self.call('POST', self._documents_path(database_id, collection_id), body=body)
+
+    async def upsert_documents(self, database_id, collection_id, documents):
+        return await self.call('PUT', self._documents_path(database_id, collection_id), body={'documents': documents})
+
+    async def get_document(self, database_id, collection_id, document_id, queries=None):
+        path = f'{self._documents_path(database_id, collection_id)}/{document_id}'
+        return await self.call('GET', path, params=self._query_params(queries))
+
+    async def list_documents(self, database_id, collection_id, queries=None):
+        path = self._documents_path(database_id, collection_id)
+        return await self.call('GET', path, params=self._query_params(queries))
+
+
+async def run_bounded(job_factories, concurrency=1000):
+    """Await coroutines from `job_factories` with at most `concurrency` in flight.
+
+    Factories are only called once a slot is free, so arbitrarily long job
+    streams never materialise more than `concurrency` pending requests.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(factory):
+        try:
+            return await factory()
+        finally:
+            semaphore.release()
+
+    tasks = []
+    for factory in job_factories:
+        await semaphore.acquire()
+        tasks.append(asyncio.ensure_future(run(factory)))
+    logging.debug(f"Scheduled {len(tasks)} async jobs with concurrency {concurrency}")
+    return await asyncio.gather(*tasks)
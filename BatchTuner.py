@@ -0,0 +1,91 @@
+import re
+import threading
+from collections import deque
+
+
+class AimdBatchSizer:
+    """Additive-increase / multiplicative-decrease batch size controller.
+
+    Starts at the largest batch the server accepts and grows by `increase_step`
+    after every batch that finishes under `target_latency_ms`. A slow batch or
+    a failed one shrinks the size by `decrease_factor`. With several batches in
+    flight one congestion event would otherwise be reported by each of them,
+    so only batches issued since the last decrease may trigger another one.
+    """
+
+    def __init__(self, max_size=1000, min_size=1, target_latency_ms=2000, increase_step=None,
+                 decrease_factor=0.5, history=20):
+        self.ceiling = max_size
+        self.min_size = min_size
+        self.target_latency_ms = target_latency_ms
+        self.increase_step = increase_step or max(max_size // 20, 1)
+        self.decrease_factor = decrease_factor
+        self.size = max_size
+        self.epoch = 0
+        self.successes = 0
+        self.errors = 0
+        self._recent_sizes = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def next_batch(self):
+        """Return (size, epoch) for the next batch to issue."""
+        with self._lock:
+            return self.size, self.epoch
+
+    def _decrease(self, epoch):
+        if epoch == self.epoch:
+            self.size = max(int(self.size * self.decrease_factor), self.min_size)
+            self.epoch += 1
+
+    def on_success(self, size, epoch, latency_ms):
+        with self._lock:
+            self.successes += 1
+            self._recent_sizes.append(size)
+            if latency_ms > self.target_latency_ms:
+                self._decrease(epoch)
+            else:
+                self.size = min(self.size + self.increase_step, self.ceiling)
+
+    def on_error(self, size, epoch, error):
+        with self._lock:
+            self.errors += 1
+            limit = batch_limit_from_error(error, size)
+            if limit is not None:
+                # The server told us its limit; never ask for more than that again
+                self.ceiling = max(min(limit, size - 1), self.min_size)
+                self.size = min(self.size, self.ceiling)
+                self.epoch += 1
+            else:
+                self._decrease(epoch)
+
+    @property
+    def error_rate(self):
+        attempts = self.successes + self.errors
+        return self.errors / attempts if attempts else 0.0
+
+    def settled_size(self):
+        """Average size of the most recently completed batches."""
+        with self._lock:
+            if not self._recent_sizes:
+                return self.size
+            return sum(self._recent_sizes) / len(self._recent_sizes)
+
+
+def batch_limit_from_error(error, size):
+    """Return the batch size limit implied by a rejection of a `size` batch for its size alone.
+
+    A 400 counts only when it is the documents-array limit ("array no longer
+    than N items") and N is below `size`; attribute validation errors such as
+    "no longer than 255 chars" do not. A 413 (request body too large) implies
+    half of the rejected size. Returns None for any other kind of error.
+    """
+    code = getattr(error, 'code', None)
+    message = str(getattr(error, 'message', error)).lower()
+    if code == 400:
+        match = re.search(r'array no longer than (\d+) items', message)
+        if match and int(match.group(1)) < size:
+            return int(match.group(1))
+        return None
+    if code == 413:
+        return size // 2
+    return None
@@ -1,25 +1,61 @@
+import asyncio
+import contextlib
 import logging
+import math
+import os
 import random
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from collections import deque
 
-from appwrite.client import Client
 from appwrite.id import ID
 from appwrite.services.databases import Databases
 from appwrite.exception import AppwriteException
-from faker import Faker
+from appwrite.query import Query
+from appwrite.enums.index_type import IndexType
+from appwrite.enums.relation_mutate import RelationMutate
+from appwrite.enums.relationship_type import RelationshipType
+
+from AsyncEngine import AsyncAppwriteClient, run_bounded
+from BatchTuner import AimdBatchSizer, batch_limit_from_error
+from LatencyHistogram import LatencyRecorder
+from LoadScheduler import arrival_offsets, ramp_stages, run_open_loop
+from Metrics import MetricsMonitor
+from Profiler import CpuMeter, StackSampler, StageTimers
+from RequestGovernor import RequestGovernor, TokenBucket
+from Results import ThroughputSeries, build_result, save_result
+from SeedJournal import SeedJournal
+from Transport import TransportClient
+from Workload import Workload
+from WorkingSet import WorkingSet, key_distribution
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Initialize the Faker library
-fake = Faker()
-
 # Setup Appwrite client
-client = Client()
-client.set_endpoint('https://cloud.appwrite.io/v1')  # Your API Endpoint
-client.set_project('1234')  # Your project ID here
-client.set_key('1234')  # Your secret API key here
+APPWRITE_ENDPOINT = os.environ.get('APPWRITE_ENDPOINT', 'https://cloud.appwrite.io/v1')  # Your API Endpoint (or a MockAppwrite server)
+APPWRITE_PROJECT = '1234'  # Your project ID here
+APPWRITE_KEY = '1234'  # Your secret API key here
+HTTP_POOL_SIZE = 100  # Keep-alive connections kept open; at least the largest number of worker threads
+HTTP_SESSION_SCOPE = 'shared'  # 'shared': one pool for all threads, 'thread': one connection per thread
+HTTP_KEEPALIVE = True  # False opens a new connection (and TLS handshake) for every request
+HTTP_TIMEOUT = (10, 120)  # (connect, read) seconds per request; a timed-out request is retried by the governor
+PROFILE_STAGES = False  # Time payload generation, serialization, network wait and result handling of each request
+PROFILE_STACKS_PATH = None  # Sample stacks into this folded-stack file (flamegraph.pl, speedscope), e.g. 'profile-{pid}.folded'
+
+# Per-stage client timings, switched on by PROFILE_STAGES
+stage_timers = StageTimers(PROFILE_STAGES)
+# The client's own CPU use during runs, to tell a saturated server from a saturated client
+cpu_meter = CpuMeter()
+stack_sampler = None
+
+# Pooled keep-alive transport; connection reuse and handshake times end up in client.stats
+client = TransportClient(pool_size=HTTP_POOL_SIZE, scope=HTTP_SESSION_SCOPE, keepalive=HTTP_KEEPALIVE, timeout=HTTP_TIMEOUT,
+                         stages=stage_timers)
+client.set_endpoint(APPWRITE_ENDPOINT)
+client.set_project(APPWRITE_PROJECT)
+client.set_key(APPWRITE_KEY)
 databases = Databases(client)
 
 # Configuration
@@ -27,61 +63,147 @@ DATABASE_ID = 'performance_test_db'
 DATABASE_NAME = 'Performance Test Database'
 COLLECTION_ID = 'users_collection'
 COLLECTION_NAME = 'Users Collection'
+WORKLOAD_FILE = os.environ.get('SEEDER_WORKLOAD')  # YAML/JSON workload spec; unset benchmarks the users collection above
+ASYNC_CONCURRENCY = 1000  # Requests kept in flight by the asyncio engine
+PAYLOAD_SEED = 42  # Seed for the pre-generated payload pool
+MAX_UPSERT_BATCH_SIZE = 1000  # Largest upsert_documents batch the server accepts
+UPSERT_PIPELINE_DEPTH = 4  # Upsert batches kept in flight at once
+UPSERT_TARGET_LATENCY_MS = 2000  # Batches slower than this shrink the adaptive batch size
+MAX_BATCH_RESENDS = 5  # Times the documents of a batch rejected for its size are resent in smaller batches
+VERIFY_BATCH_SIZE = 100  # Document IDs checked per list_documents call in bulk verification
+SETUP_CONCURRENCY = 20  # Attribute/index creations issued at once during setup
+SETUP_TIMEOUT = 600  # Seconds to wait for attributes and indexes to become available
+SETUP_MAX_POLL_INTERVAL = 2.0  # Upper bound of the readiness polling backoff, in seconds
+LOG_EACH_DOCUMENT = True  # Per-document/per-request log lines; turn off for high-RPS runs
+METRICS_PORT = None  # Serve Prometheus metrics on this port during runs (e.g. 9108)
+STATUS_LINE = False  # Show a live one-line status on stderr during runs
+RESULTS_DIR = os.environ.get('SEEDER_RESULTS_DIR', 'results')  # Each run saves a result file here for `Results.py compare`; None disables
 
-# Performance tracking
-write_response_times = []
-read_response_times = []
-upsert_response_times = []
-
-write_start_time = 0
-write_end_time = 0
-read_start_time = 0
-read_end_time = 0
-upsert_start_time = 0
-upsert_end_time = 0
-
-# Categorization dictionaries
-write_latency_categories = {
-    '<1000ms': 0,
-    '1000-2000ms': 0,
-    '2000-3000ms': 0,
-    '3000-4000ms': 0,
-    '4000-5000ms': 0,
-    '>5000ms': 0
+# Requests per second allowed per endpoint class; None leaves a class unlimited
+RATE_LIMITS = {
+    'write': None,  # create_document
+    'bulk': None,  # upsert_documents
+    'read': None,  # get_document
+    'list': None,  # list_documents
+    'setup': None,  # attribute/index creation and readiness polling
 }
 
-read_latency_categories = {
-    '<1000ms': 0,
-    '1000-2000ms': 0,
-    '2000-3000ms': 0,
-    '3000-4000ms': 0,
-    '4000-5000ms': 0,
-    '>5000ms': 0
-}
+# Collections, payload generators and operation mix being benchmarked
+if WORKLOAD_FILE:
+    workload = Workload.load(WORKLOAD_FILE)
+else:
+    workload = Workload.users(DATABASE_ID, DATABASE_NAME, COLLECTION_ID, COLLECTION_NAME)
+DATABASE_ID = workload.database_id
+COLLECTION_ID = workload.target.id
+VERIFY_FIELD = workload.target.verify_field  # Attribute compared when verifying written documents
 
-upsert_latency_categories = {
-    '<1000ms': 0,
-    '1000-2000ms': 0,
-    '2000-3000ms': 0,
-    '3000-4000ms': 0,
-    '4000-5000ms': 0,
-    '>5000ms': 0
-}
+# Document payloads are generated ahead of time, off the request workers
+payload_pool = workload.payload_pool(seed=PAYLOAD_SEED)
 
-def categorize_latency(response_time_ms, category_dict):
-    """Categorize the response time into the appropriate latency category."""
-    if response_time_ms < 1000:
-        category_dict['<1000ms'] += 1
-    elif response_time_ms < 2000:
-        category_dict['1000-2000ms'] += 1
-    elif response_time_ms < 3000:
-        category_dict['2000-3000ms'] += 1
-    elif response_time_ms < 4000:
-        category_dict['3000-4000ms'] += 1
-    elif response_time_ms < 5000:
-        category_dict['4000-5000ms'] += 1
-    else:
-        category_dict['>5000ms'] += 1
+# Shared rate limiting and 429/5xx retry policy for every request
+governor = RequestGovernor(RATE_LIMITS)
+
+# Performance tracking
+write_latency = LatencyRecorder('write')
+read_latency = LatencyRecorder('read')
+upsert_latency = LatencyRecorder('upsert')
+verify_list_latency = LatencyRecorder('verify_list')
+list_latency = LatencyRecorder('list')
+update_latency = LatencyRecorder('update')
+delete_latency = LatencyRecorder('delete')
+
+def use_workload(new_workload, seed=PAYLOAD_SEED, sequence_start=0):
+    """Benchmark `new_workload` from now on, with payloads drawn from `seed`."""
+    global workload, DATABASE_ID, COLLECTION_ID, VERIFY_FIELD, payload_pool
+    workload = new_workload
+    DATABASE_ID = workload.database_id
+    COLLECTION_ID = workload.target.id
+    VERIFY_FIELD = workload.target.verify_field
+    payload_pool = workload.payload_pool(seed=seed, sequence_start=sequence_start)
+
+def phase_recorders():
+    """Latency recorders for each measured phase, keyed by phase name."""
+    return {
+        'write': write_latency,
+        'upsert': upsert_latency,
+        'read': read_latency,
+        'verify_list': verify_list_latency,
+        'list': list_latency,
+        'update': update_latency,
+        'delete': delete_latency,
+    }
+
+# Per-second throughput of every phase, saved with the run's results
+throughput_series = ThroughputSeries(phase_recorders())
+
+def live_metrics(recorders=None):
+    """Context manager measuring throughput and client CPU and publishing live metrics while a run is in progress.
+
+    Live metrics are only published when METRICS_PORT or STATUS_LINE is set;
+    stage timers and the stack sampler run when PROFILE_STAGES and
+    PROFILE_STACKS_PATH ask for them.
+    """
+    global stack_sampler
+    stack = contextlib.ExitStack()
+    stack.enter_context(throughput_series.sampling())
+    stack.enter_context(cpu_meter.measuring())
+    if PROFILE_STAGES:
+        stage_timers.enabled = True
+    if PROFILE_STACKS_PATH:
+        if stack_sampler is None:
+            stack_sampler = StackSampler(PROFILE_STACKS_PATH.format(pid=os.getpid()))
+        stack.enter_context(stack_sampler.sampling())
+    if METRICS_PORT is not None or STATUS_LINE:
+        stack.enter_context(
+            MetricsMonitor(recorders or phase_recorders(), governor, port=METRICS_PORT, status_line=STATUS_LINE)
+        )
+    return stack
+
+def reset_results():
+    """Start a new run: zero the recorders, throughput series and retry, connection and client counters."""
+    for recorder in phase_recorders().values():
+        recorder.reset()
+    throughput_series.reset()
+    governor.reset()
+    client.stats.reset()
+    cpu_meter.reset()
+    stage_timers.reset()
+
+def collect_results():
+    """Serializable snapshot of this process's histograms, throughput series, retry, connection and client counters."""
+    return {
+        'histograms': {name: recorder.snapshot().to_dict() for name, recorder in phase_recorders().items()},
+        'throughput': throughput_series.to_dict(),
+        'governor': governor.snapshot(),
+        'transport': client.stats.snapshot(),
+        'client': client_profile(),
+    }
+
+def client_profile():
+    """This process's CPU use and per-stage timings."""
+    return {'cpu': cpu_meter.snapshot(), 'stages': stage_timers.snapshot()}
+
+def run_config(run, **parameters):
+    """The settings a run's results depend on, stored in its result file."""
+    return {
+        'run': run,
+        'parameters': parameters,
+        'endpoint': APPWRITE_ENDPOINT,
+        'workload': workload.spec,
+        'payload_seed': PAYLOAD_SEED,
+        'rate_limits': RATE_LIMITS,
+        'async_concurrency': ASYNC_CONCURRENCY,
+        'upsert_pipeline_depth': UPSERT_PIPELINE_DEPTH,
+        'http': {'pool_size': HTTP_POOL_SIZE, 'scope': HTTP_SESSION_SCOPE, 'keepalive': HTTP_KEEPALIVE, 'timeout': HTTP_TIMEOUT},
+    }
+
+def save_run_result(config, results=None, label=None):
+    """Save a run's results (defaults to this process's) to RESULTS_DIR; returns the file's path."""
+    if not RESULTS_DIR:
+        return None
+    path = save_result(RESULTS_DIR, build_result(config, results or collect_results(), label))
+    logging.info(f"Saved run results to {path}")
+    return path
 
 def ensure_database_exists():
     """Create database if it doesn't exist."""
@@ -96,7 +218,7 @@ def ensure_database_exists():
                 logging.info(f"Creating database '{DATABASE_ID}'...")
                 databases.create(
                     database_id=DATABASE_ID,
-                    name=DATABASE_NAME,
+                    name=workload.database_name,
                     enabled=True
                 )
                 logging.info(f"Database '{DATABASE_ID}' created successfully")
@@ -108,26 +230,26 @@ def ensure_database_exists():
             logging.error(f"Error checking database: {e}")
             return False
 
-def ensure_collection_exists():
-    """Create collection if it doesn't exist."""
+def ensure_collection_exists(collection):
+    """Create a workload collection if it doesn't exist."""
     try:
         # Try to get the collection first
-        databases.get_collection(database_id=DATABASE_ID, collection_id=COLLECTION_ID)
-        logging.info(f"Collection '{COLLECTION_ID}' already exists")
+        databases.get_collection(database_id=DATABASE_ID, collection_id=collection.id)
+        logging.info(f"Collection '{collection.id}' already exists")
         return True
     except AppwriteException as e:
         if e.code == 404:  # Collection not found
             try:
-                logging.info(f"Creating collection '{COLLECTION_ID}'...")
+                logging.info(f"Creating collection '{collection.id}'...")
                 databases.create_collection(
                     database_id=DATABASE_ID,
-                    collection_id=COLLECTION_ID,
-                    name=COLLECTION_NAME,
-                    permissions=["read(\"any\")", "write(\"any\")"],  # Allow all users to read/write
-                    document_security=False,
+                    collection_id=collection.id,
+                    name=collection.name,
+                    permissions=collection.permissions,
+                    document_security=collection.document_security,
                     enabled=True
                 )
-                logging.info(f"Collection '{COLLECTION_ID}' created successfully")
+                logging.info(f"Collection '{collection.id}' created successfully")
                 return True
             except AppwriteException as create_error:
                 logging.error(f"Failed to create collection: {create_error}")
@@ -136,201 +258,435 @@ def ensure_collection_exists():
             logging.error(f"Error checking collection: {e}")
             return False
 
-def ensure_attributes_exist():
-    """Create required attributes if they don't exist."""
-    required_attributes = [
-        {'key': 'Name', 'type': 'string', 'size': 255, 'required': True},
-        {'key': 'email', 'type': 'email', 'required': True},
-        {'key': 'age', 'type': 'integer', 'required': True, 'min': 0, 'max': 150}
-    ]
-    
-    try:
-        # Get existing attributes
-        existing_attributes = databases.list_attributes(
+def create_attribute(collection_id, attr):
+    """Issue the create call for one attribute of a workload spec."""
+    common = {'database_id': DATABASE_ID, 'collection_id': collection_id}
+    if attr['type'] == 'relationship':
+        return databases.create_relationship_attribute(
+            related_collection_id=attr['related_collection'],
+            type=RelationshipType(attr.get('relation_type', 'manyToOne')),
+            two_way=attr.get('two_way', False),
+            key=attr['key'],
+            two_way_key=attr.get('two_way_key'),
+            on_delete=RelationMutate(attr.get('on_delete', 'setNull')),
+            **common
+        )
+
+    common.update(key=attr['key'], required=attr.get('required', False), default=attr.get('default'), array=attr.get('array'))
+    if attr['type'] == 'string':
+        return databases.create_string_attribute(size=attr['size'], **common)
+    if attr['type'] in ('integer', 'float'):
+        create = databases.create_integer_attribute if attr['type'] == 'integer' else databases.create_float_attribute
+        return create(min=attr.get('min'), max=attr.get('max'), **common)
+    if attr['type'] == 'enum':
+        return databases.create_enum_attribute(elements=attr['elements'], **common)
+    create = {
+        'email': databases.create_email_attribute,
+        'boolean': databases.create_boolean_attribute,
+        'datetime': databases.create_datetime_attribute,
+        'url': databases.create_url_attribute,
+        'ip': databases.create_ip_attribute,
+    }[attr['type']]
+    return create(**common)
+
+def _list_all(list_fn, field, collection_id, page_size=100):
+    """Every attribute or index of a collection, paging past the default limit of 25."""
+    items = []
+    while True:
+        response = governor.call(
+            'setup',
+            list_fn,
             database_id=DATABASE_ID,
-            collection_id=COLLECTION_ID
+            collection_id=collection_id,
+            queries=[Query.limit(page_size), Query.offset(len(items))]
         )
-        existing_keys = {attr['key'] for attr in existing_attributes['attributes']}
-        
-        for attr in required_attributes:
-            if attr['key'] not in existing_keys:
-                logging.info(f"Creating attribute '{attr['key']}'...")
-                try:
-                    if attr['type'] == 'string':
-                        databases.create_string_attribute(
-                            database_id=DATABASE_ID,
-                            collection_id=COLLECTION_ID,
-                            key=attr['key'],
-                            size=attr['size'],
-                            required=attr['required']
-                        )
-                    elif attr['type'] == 'email':
-                        databases.create_email_attribute(
-                            database_id=DATABASE_ID,
-                            collection_id=COLLECTION_ID,
-                            key=attr['key'],
-                            required=attr['required']
-                        )
-                    elif attr['type'] == 'integer':
-                        databases.create_integer_attribute(
-                            database_id=DATABASE_ID,
-                            collection_id=COLLECTION_ID,
-                            key=attr['key'],
-                            required=attr['required'],
-                            min=attr.get('min'),
-                            max=attr.get('max')
-                        )
-                    
-                    logging.info(f"Attribute '{attr['key']}' created successfully")
-                    # Wait a bit for attribute to be ready
-                    time.sleep(1)
-                    
-                except AppwriteException as create_error:
-                    logging.error(f"Failed to create attribute '{attr['key']}': {create_error}")
-                    return False
-            else:
-                logging.info(f"Attribute '{attr['key']}' already exists")
-        
-        return True
+        items.extend(response[field])
+        if len(response[field]) < page_size:
+            return items
+
+def _create_all(kind, creations):
+    """Issue all (collection_id, key, create_fn) creations at once.
+
+    Returns {(collection_id, key): issued_at} for everything that now needs
+    to become available, or None if a creation was rejected.
+    """
+    issued = {}
+    ok = True
+
+    def create(create_fn):
+        issued_at = time.monotonic()
+        try:
+            governor.call('setup', create_fn)
+        except AppwriteException as e:
+            if e.code != 409:  # Created concurrently by another run: wait for it like our own
+                raise
+        return issued_at
+
+    with ThreadPoolExecutor(max_workers=SETUP_CONCURRENCY) as executor:
+        futures = {
+            executor.submit(create, create_fn): (collection_id, key)
+            for collection_id, key, create_fn in creations
+        }
+        for future in as_completed(futures):
+            collection_id, key = futures[future]
+            try:
+                issued[(collection_id, key)] = future.result()
+            except AppwriteException as create_error:
+                logging.error(f"Failed to create {kind} '{key}' on '{collection_id}': {create_error}")
+                ok = False
+    return issued if ok else None
+
+def _wait_until_available(kind, list_fn, field, pending, timeout=SETUP_TIMEOUT):
+    """Poll until every pending (collection_id, key) is available or failed, with backoff.
+
+    `pending` maps (collection_id, key) to when its creation was issued.
+    Logs how long each one took to provision and returns True if all of them
+    became available.
+    """
+    pending = dict(pending)
+    provisioning_times = {}
+    failed = []
+    delay = 0.1
+    deadline = time.monotonic() + timeout
+    while pending:
+        for collection_id in {collection_id for collection_id, _ in pending}:
+            for item in _list_all(list_fn, field, collection_id):
+                ident = (collection_id, item['key'])
+                if ident not in pending:
+                    continue
+                if item['status'] == 'available':
+                    provisioning_times[ident] = time.monotonic() - pending.pop(ident)
+                    logging.info(f"{kind.capitalize()} '{item['key']}' on '{collection_id}' available "
+                                 f"after {provisioning_times[ident]:.2f} s")
+                elif item['status'] in ('failed', 'stuck'):
+                    pending.pop(ident)
+                    failed.append(ident)
+                    logging.error(f"{kind.capitalize()} '{item['key']}' on '{collection_id}' {item['status']}: "
+                                  f"{item.get('error') or 'no error given'}")
+        if not pending:
+            break
+        if time.monotonic() + delay > deadline:
+            logging.error(f"Timed out after {timeout} s waiting for {field}: "
+                          f"{', '.join(f'{c}.{k}' for c, k in pending)}")
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, SETUP_MAX_POLL_INTERVAL)
+
+    if provisioning_times:
+        slowest = max(provisioning_times, key=provisioning_times.get)
+        logging.info(f"Provisioned {len(provisioning_times)} {field}; slowest '{slowest[1]}' on "
+                     f"'{slowest[0]}' took {provisioning_times[slowest]:.2f} s")
+    return not failed
+
+def ensure_attributes_exist(collections=None):
+    """Create the attributes the workload collections declare and wait until they are available.
+
+    All missing attributes are created at once; attributes still processing
+    from an earlier run are waited for as well.
+    """
+    collections = workload.collections if collections is None else collections
+    try:
+        creations = []
+        pending = {}
+        for collection in collections:
+            existing = {attr['key']: attr for attr in _list_all(databases.list_attributes, 'attributes', collection.id)}
+            for attr in collection.attributes:
+                if attr['key'] not in existing:
+                    logging.info(f"Creating attribute '{attr['key']}' on '{collection.id}'...")
+                    creations.append((collection.id, attr['key'],
+                                      lambda collection_id=collection.id, attr=attr: create_attribute(collection_id, attr)))
+                elif existing[attr['key']]['status'] != 'available':
+                    pending[(collection.id, attr['key'])] = time.monotonic()
+                else:
+                    logging.info(f"Attribute '{attr['key']}' on '{collection.id}' already exists")
+
+        issued = _create_all('attribute', creations)
+        if issued is None:
+            return False
+        pending.update(issued)
+        return _wait_until_available('attribute', databases.list_attributes, 'attributes', pending)
         
     except AppwriteException as e:
         logging.error(f"Error managing attributes: {e}")
         return False
 
+def create_index(collection_id, index):
+    """Issue the create call for one index of a workload spec."""
+    return databases.create_index(
+        database_id=DATABASE_ID,
+        collection_id=collection_id,
+        key=index['key'],
+        type=IndexType(index.get('type', 'key')),
+        attributes=index['attributes'],
+        orders=index.get('orders')
+    )
+
+def ensure_indexes_exist(collections=None):
+    """Create the indexes the workload collections declare and wait until they are available."""
+    collections = workload.collections if collections is None else collections
+    try:
+        creations = []
+        pending = {}
+        for collection in collections:
+            existing = {index['key']: index for index in _list_all(databases.list_indexes, 'indexes', collection.id)}
+            for index in collection.indexes:
+                if index['key'] not in existing:
+                    logging.info(f"Creating index '{index['key']}' on '{collection.id}'...")
+                    creations.append((collection.id, index['key'],
+                                      lambda collection_id=collection.id, index=index: create_index(collection_id, index)))
+                elif existing[index['key']]['status'] != 'available':
+                    pending[(collection.id, index['key'])] = time.monotonic()
+                else:
+                    logging.info(f"Index '{index['key']}' on '{collection.id}' already exists")
+
+        issued = _create_all('index', creations)
+        if issued is None:
+            return False
+        pending.update(issued)
+        return _wait_until_available('index', databases.list_indexes, 'indexes', pending)
+
+    except AppwriteException as e:
+        logging.error(f"Error managing indexes: {e}")
+        return False
+
+def drop_indexes(collection_id, keys, timeout=SETUP_TIMEOUT):
+    """Delete the indexes with the given keys and wait until they are gone; missing keys are skipped."""
+    keys = set(keys)
+    try:
+        existing = {index['key'] for index in _list_all(databases.list_indexes, 'indexes', collection_id)}
+        for key in sorted(keys & existing):
+            logging.info(f"Deleting index '{key}' on '{collection_id}'...")
+            try:
+                governor.call('setup', databases.delete_index,
+                              database_id=DATABASE_ID, collection_id=collection_id, key=key)
+            except AppwriteException as e:
+                if e.code != 404:  # Already deleted by another run
+                    raise
+
+        delay = 0.1
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = keys & {index['key'] for index in _list_all(databases.list_indexes, 'indexes', collection_id)}
+            if not remaining:
+                return True
+            if time.monotonic() + delay > deadline:
+                logging.error(f"Timed out after {timeout} s waiting for indexes to be deleted: {', '.join(sorted(remaining))}")
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, SETUP_MAX_POLL_INTERVAL)
+
+    except AppwriteException as e:
+        logging.error(f"Error deleting indexes: {e}")
+        return False
+
 def setup_database_infrastructure():
-    """Setup database, collection, and attributes if they don't exist."""
+    """Setup the workload's database, collections, attributes and indexes if they don't exist.
+
+    Indexes are created once the attributes they cover are available.
+    """
     logging.info("Setting up database infrastructure...")
+    start_time = time.perf_counter()
     
     if not ensure_database_exists():
         return False
     
-    if not ensure_collection_exists():
-        return False
-    
-    # Wait a bit for collection to be ready
-    time.sleep(2)
+    # Every collection exists before any attributes, so relationships can point at them
+    for collection in workload.collections:
+        if not ensure_collection_exists(collection):
+            return False
     
     if not ensure_attributes_exist():
         return False
     
-    # Wait for attributes to be fully ready
-    logging.info("Waiting for attributes to be ready...")
-    time.sleep(5)
+    if not ensure_indexes_exist():
+        return False
     
-    logging.info("Database infrastructure setup complete!")
+    logging.info(f"Database infrastructure setup complete in {time.perf_counter() - start_time:.2f} s!")
     return True
 
 def create_user_document():
     """Create a user document with random data."""
-    global write_start_time
-    global write_end_time
-
-    if not write_start_time:
-        write_start_time = time.perf_counter()
+    write_latency.mark_start()
 
-    name = fake.name()
-    email = fake.email()
-    age = random.randint(18, 100)
-    document_id = ID.unique()
+    with stage_timers.stage('payload'):
+        payload = payload_pool.take()
+        email = payload[VERIFY_FIELD]
+        document_id = ID.unique()
     
     try:
-        start_time = time.perf_counter()
-        response = databases.create_document(
+        response = governor.call(
+            'write',
+            databases.create_document,
             database_id=DATABASE_ID,
             collection_id=COLLECTION_ID,
             document_id=document_id,
-            data={
-                'Name': name,
-                'email': email,
-                'age': age
-            }
+            data=payload,
+            on_conflict=lambda: _get_created(document_id)
         )
-        end_time = time.perf_counter()
-        response_time_ms = (end_time - start_time) * 1000
-        write_response_times.append(response_time_ms)
-        categorize_latency(response_time_ms, write_latency_categories)
-        logging.info(f"Inserted: {response['$id']} - Response Time: {response_time_ms:.2f} ms")
+        response_time_ms = governor.last_attempt_ms()
+        with stage_timers.stage('result'):
+            write_latency.record(response_time_ms)
+            if LOG_EACH_DOCUMENT:
+                logging.info(f"Inserted: {response['$id']} - Response Time: {response_time_ms:.2f} ms")
         return response['$id'], email
     except Exception as e:
+        write_latency.record_error()
         logging.error(f"Failed to insert document: {e}")
         return None, None
     finally:
-        write_end_time = time.perf_counter()
+        write_latency.mark_end()
 
-def upsert_user_documents(count=100):
-    """Upsert user documents using the new upsert method."""
-    global upsert_start_time
-    global upsert_end_time
-    
-    upsert_start_time = time.perf_counter()
+def _get_created(document_id):
+    """The document a retried create found already there, because an earlier attempt committed it."""
+    return governor.call('read', databases.get_document,
+                         database_id=DATABASE_ID, collection_id=COLLECTION_ID, document_id=document_id)
+
+def _upsert_batch(count):
+    """Upsert one batch of `count` new documents, raising on failure.
+
+    Returns the document IDs, their emails and the response time in ms.
+    """
+    upsert_latency.mark_start()
     
     # Prepare documents for upsert
-    documents = []
-    for _ in range(count):
-        document_data = {
-            '$id': ID.unique(),  # Use $id for document ID
-            'Name': fake.name(),
-            'email': fake.email(),
-            'age': random.randint(18, 100)
-        }
-        documents.append(document_data)
+    with stage_timers.stage('payload'):
+        documents = [
+            {'$id': ID.unique(), **payload}  # Use $id for document ID
+            for payload in payload_pool.take_many(count)
+        ]
     
     try:
-        start_time = time.perf_counter()
-        response = databases.upsert_documents(
+        governor.call(
+            'bulk',
+            databases.upsert_documents,
             database_id=DATABASE_ID,
             collection_id=COLLECTION_ID,
             documents=documents
         )
-        end_time = time.perf_counter()
-        response_time_ms = (end_time - start_time) * 1000
-        upsert_response_times.append(response_time_ms)
-        categorize_latency(response_time_ms, upsert_latency_categories)
-        
-        upsert_end_time = time.perf_counter()
-        
-        logging.info(f"Upserted {len(documents)} documents - Response Time: {response_time_ms:.2f} ms")
-        return [doc['$id'] for doc in documents], [doc['email'] for doc in documents]
-        
+        response_time_ms = governor.last_attempt_ms()
+        with stage_timers.stage('result'):
+            upsert_latency.record(response_time_ms, items=len(documents))
+            if LOG_EACH_DOCUMENT:
+                logging.info(f"Upserted {len(documents)} documents - Response Time: {response_time_ms:.2f} ms")
+            return [doc['$id'] for doc in documents], [doc[VERIFY_FIELD] for doc in documents], response_time_ms
+    except Exception:
+        upsert_latency.record_error()
+        raise
+    finally:
+        upsert_latency.mark_end()
+
+def upsert_user_documents(count=100):
+    """Upsert user documents using the new upsert method."""
+    try:
+        doc_ids, emails, _ = _upsert_batch(count)
+        return doc_ids, emails
     except Exception as e:
         logging.error(f"Failed to upsert documents: {e}")
-        upsert_end_time = time.perf_counter()
         return [], []
 
 def verify_document(doc_id, expected_email):
     """Verify a single document."""
-    global read_start_time
-    global read_end_time
-
-    if not read_start_time:
-        read_start_time = time.perf_counter()
+    read_latency.mark_start()
 
     try:
-        start_time = time.perf_counter()
-        document = databases.get_document(
-            database_id=DATABASE_ID, 
+        document = governor.call(
+            'read',
+            databases.get_document,
+            database_id=DATABASE_ID,
             collection_id=COLLECTION_ID, 
             document_id=doc_id
         )
-        end_time = time.perf_counter()
-        response_time_ms = (end_time - start_time) * 1000
-        read_response_times.append(response_time_ms)
-        categorize_latency(response_time_ms, read_latency_categories)
-        
-        if document and 'email' in document and document['email'] is not None and document['email'] == expected_email:
-            logging.info(f"Verified document: {doc_id}, email: {document.get('email')} - Response Time: {response_time_ms:.2f} ms")
-            return True
-        else:
-            logging.error(f"Document {doc_id} verification failed: email mismatch or email is null.")
-            return False
+        response_time_ms = governor.last_attempt_ms()
+        with stage_timers.stage('result'):
+            read_latency.record(response_time_ms)
+
+            if document and document.get(VERIFY_FIELD) is not None and document[VERIFY_FIELD] == expected_email:
+                if LOG_EACH_DOCUMENT:
+                    logging.info(f"Verified document: {doc_id}, {VERIFY_FIELD}: {document.get(VERIFY_FIELD)} - Response Time: {response_time_ms:.2f} ms")
+                return True
+            else:
+                logging.error(f"Document {doc_id} verification failed: {VERIFY_FIELD} mismatch or {VERIFY_FIELD} is null.")
+                return False
     except Exception as e:
+        read_latency.record_error()
         logging.error(f"Failed to verify document {doc_id}: {e}")
         return False
     finally:
-        read_end_time = time.perf_counter()
+        read_latency.mark_end()
+
+def _fetch_emails(doc_ids):
+    """Fetch the stored VERIFY_FIELD value of up to VERIFY_BATCH_SIZE documents in one list_documents call."""
+    verify_list_latency.mark_start()
+    try:
+        response = governor.call(
+            'list',
+            databases.list_documents,
+            database_id=DATABASE_ID,
+            collection_id=COLLECTION_ID,
+            queries=[
+                Query.equal('$id', doc_ids),
+                Query.select(['$id', VERIFY_FIELD]),
+                Query.limit(len(doc_ids))
+            ]
+        )
+        verify_list_latency.record(governor.last_attempt_ms(), items=len(doc_ids))
+    except Exception:
+        verify_list_latency.record_error()
+        raise
+    finally:
+        verify_list_latency.mark_end()
+    return {document['$id']: document.get(VERIFY_FIELD) for document in response['documents']}
+
+def verify_documents_bulk(document_info_list, batch_size=VERIFY_BATCH_SIZE):
+    """Verify documents in batches of IDs and compare their VERIFY_FIELD values locally.
+
+    Returns (verified_count, missing_ids, mismatched_ids). A batch whose
+    request fails counts all of its IDs as missing.
+    """
+    expected = dict(document_info_list)
+    doc_ids = list(expected)
+    batches = [doc_ids[i:i + batch_size] for i in range(0, len(doc_ids), batch_size)]
+    verified_count = 0
+    missing_ids = []
+    mismatched_ids = []
+
+    with ThreadPoolExecutor() as executor:
+        futures = {executor.submit(_fetch_emails, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                found = future.result()
+            except Exception as e:
+                verify_list_latency.record_error()
+                logging.error(f"Failed to verify batch of {len(batch)} documents: {e}")
+                missing_ids.extend(batch)
+                continue
+            for doc_id in batch:
+                if doc_id not in found:
+                    missing_ids.append(doc_id)
+                elif found[doc_id] is None or found[doc_id] != expected[doc_id]:
+                    mismatched_ids.append(doc_id)
+                else:
+                    verified_count += 1
+
+    logging.info(f"Bulk verified {verified_count} of {len(doc_ids)} documents with {len(batches)} list requests")
+    if missing_ids:
+        logging.error(f"Missing documents ({len(missing_ids)}): {missing_ids[:10]}")
+    if mismatched_ids:
+        logging.error(f"Documents with mismatched or null {VERIFY_FIELD} ({len(mismatched_ids)}): {mismatched_ids[:10]}")
+    return verified_count, missing_ids, mismatched_ids
+
+def verify_documents(document_info_list, mode='bulk'):
+    """Verify multiple documents.
+
+    `mode='bulk'` checks up to VERIFY_BATCH_SIZE documents per list_documents
+    call; `mode='get'` issues one concurrent get_document per document, which
+    is what the read latency figures are measured from.
+    """
+    if mode == 'bulk':
+        verified_count, _, _ = verify_documents_bulk(document_info_list)
+        return verified_count
 
-def verify_documents(document_info_list):
-    """Verify multiple documents concurrently."""
     verified_count = 0
     with ThreadPoolExecutor() as executor:
         futures = [executor.submit(verify_document, doc_id, expected_email) 
@@ -340,92 +696,574 @@ def verify_documents(document_info_list):
                 verified_count += 1
     return verified_count
 
-def seed_users_parallel(count=500):
+def seed_users_parallel(count=500, verify_mode='bulk'):
     """Seed users concurrently using create_document."""
     document_ids_with_email = []
     with ThreadPoolExecutor() as executor:
         futures = [executor.submit(create_user_document) for _ in range(count)]
         for future in as_completed(futures):
             doc_id, email = future.result()
-            if doc_id and email:
+            if doc_id:
                 document_ids_with_email.append((doc_id, email))
     
     logging.info(f"Total documents inserted: {len(document_ids_with_email)}")
-    verified_count = verify_documents(document_ids_with_email)
+    verified_count = verify_documents(document_ids_with_email, verify_mode)
     logging.info(f"Total documents verified: {verified_count}")
     
     return document_ids_with_email
 
-def test_upsert_performance(count=1000):
-    """Test upsert performance."""
+def async_client():
+    """Create an asyncio client pointed at the same project as the SDK client."""
+    return AsyncAppwriteClient(
+        APPWRITE_ENDPOINT,
+        APPWRITE_PROJECT,
+        APPWRITE_KEY,
+        max_connections=ASYNC_CONCURRENCY
+    )
+
+async def create_user_document_async(api):
+    """Create a user document with random data through the asyncio engine."""
+    write_latency.mark_start()
+
+    with stage_timers.stage('payload'):
+        payload = payload_pool.take()
+        email = payload[VERIFY_FIELD]
+        document_id = ID.unique()
+
+    try:
+        response = await governor.call_async(
+            'write',
+            lambda: api.create_document(DATABASE_ID, COLLECTION_ID, document_id, payload),
+            on_conflict=lambda: governor.call_async('read', lambda: api.get_document(DATABASE_ID, COLLECTION_ID, document_id))
+        )
+        response_time_ms = governor.last_attempt_ms()
+        with stage_timers.stage('result'):
+            write_latency.record(response_time_ms)
+            if LOG_EACH_DOCUMENT:
+                logging.info(f"Inserted: {response['$id']} - Response Time: {response_time_ms:.2f} ms")
+        return response['$id'], email
+    except Exception as e:
+        write_latency.record_error()
+        logging.error(f"Failed to insert document: {e}")
+        return None, None
+    finally:
+        write_latency.mark_end()
+
+async def verify_document_async(api, doc_id, expected_email):
+    """Verify a single document through the asyncio engine."""
+    read_latency.mark_start()
+
+    try:
+        document = await governor.call_async('read', lambda: api.get_document(DATABASE_ID, COLLECTION_ID, doc_id))
+        response_time_ms = governor.last_attempt_ms()
+        read_latency.record(response_time_ms)
+
+        if document and document.get(VERIFY_FIELD) is not None and document[VERIFY_FIELD] == expected_email:
+            if LOG_EACH_DOCUMENT:
+                logging.info(f"Verified document: {doc_id}, {VERIFY_FIELD}: {document.get(VERIFY_FIELD)} - Response Time: {response_time_ms:.2f} ms")
+            return True
+        else:
+            logging.error(f"Document {doc_id} verification failed: {VERIFY_FIELD} mismatch or {VERIFY_FIELD} is null.")
+            return False
+    except Exception as e:
+        read_latency.record_error()
+        logging.error(f"Failed to verify document {doc_id}: {e}")
+        return False
+    finally:
+        read_latency.mark_end()
+
+async def _seed_users_async(count, concurrency, verify_mode):
+    async with async_client() as api:
+        results = await run_bounded(
+            (lambda: create_user_document_async(api) for _ in range(count)),
+            concurrency
+        )
+        document_ids_with_email = [(doc_id, email) for doc_id, email in results if doc_id]
+        logging.info(f"Total documents inserted: {len(document_ids_with_email)}")
+        if verify_mode != 'get':
+            return document_ids_with_email
+
+        verified = await run_bounded(
+            (lambda doc_id=doc_id, email=email: verify_document_async(api, doc_id, email)
+             for doc_id, email in document_ids_with_email),
+            concurrency
+        )
+        logging.info(f"Total documents verified: {sum(verified)}")
+    return document_ids_with_email
+
+def seed_users_async(count=500, concurrency=ASYNC_CONCURRENCY, verify_mode='bulk'):
+    """Seed and verify users with the asyncio engine instead of a thread pool."""
+    document_ids_with_email = asyncio.run(_seed_users_async(count, concurrency, verify_mode))
+    if verify_mode != 'get':
+        verified_count = verify_documents(document_ids_with_email, verify_mode)
+        logging.info(f"Total documents verified: {verified_count}")
+    return document_ids_with_email
+
+def _open_loop_operation(api, operation, upsert_batch_size, read_ids, written):
+    """Build the coroutine factory issued at every arrival of an open-loop run."""
+    async def create():
+        payload = payload_pool.take()
+        document_id = ID.unique()
+        response = await governor.call_async(
+            'write',
+            lambda: api.create_document(DATABASE_ID, COLLECTION_ID, document_id, payload),
+            on_conflict=lambda: governor.call_async('read', lambda: api.get_document(DATABASE_ID, COLLECTION_ID, document_id))
+        )
+        written.append((response['$id'], payload[VERIFY_FIELD]))
+
+    async def upsert():
+        documents = [{'$id': ID.unique(), **payload} for payload in payload_pool.take_many(upsert_batch_size)]
+        await governor.call_async('bulk', lambda: api.upsert_documents(DATABASE_ID, COLLECTION_ID, documents))
+        written.extend((doc['$id'], doc[VERIFY_FIELD]) for doc in documents)
+
+    async def get():
+        doc_id = random.choice(read_ids)
+        await governor.call_async('read', lambda: api.get_document(DATABASE_ID, COLLECTION_ID, doc_id))
+
+    return {'create': create, 'upsert': upsert, 'get': get}[operation]
+
+async def _run_open_loop_test(operation, rate, duration, ramp, upsert_batch_size, read_ids, max_in_flight):
+    latency = LatencyRecorder(f'open_loop_{operation}')
+    service = LatencyRecorder(f'open_loop_{operation}_service')
+    errors = 0
+    written = []
+
+    def on_complete(latency_ms, service_ms, ok):
+        nonlocal errors
+        if ok:
+            latency.record(latency_ms)
+            # Called in the request's own task, so this is its attempt alone, without rate-limit waits and backoff
+            service.record(governor.last_attempt_ms())
+        else:
+            errors += 1
+            latency.record_error()
+
+    async with async_client() as api:
+        issue = _open_loop_operation(api, operation, upsert_batch_size, read_ids, written)
+
+        async def tracked():
+            # Keeps the in-flight count and phase clock that live metrics read up to date
+            latency.mark_start()
+            try:
+                await issue()
+            finally:
+                latency.mark_end()
+
+        with live_metrics({operation: latency}):
+            elapsed = await run_open_loop(
+                tracked,
+                arrival_offsets(rate, duration, ramp),
+                on_complete,
+                max_in_flight
+            )
+
+    latency_histogram = latency.snapshot()
+    logging.info(f"=== OPEN-LOOP {operation.upper()} PERFORMANCE ===")
+    logging.info(f"Completed requests: {latency_histogram.total}, failed: {errors}, elapsed: {elapsed:.2f} s")
+    logging.info(f"Achieved throughput: {(latency_histogram.total + errors) / elapsed:.2f} requests/s")
+    logging.info(f"Latency from intended send - {latency_histogram.describe()}")
+    logging.info(f"Service time - {service.snapshot().describe()}")
+    return written
+
+def run_open_loop_test(operation='create', rate=100, duration=60, ramp=None,
+                       upsert_batch_size=100, read_ids=None, max_in_flight=ASYNC_CONCURRENCY):
+    """Issue create/upsert/get calls at a target arrival rate (open loop).
+
+    `ramp` is a list of (seconds, start_rps, end_rps) stages and replaces
+    `rate`/`duration` when given. Latency is reported from each request's
+    intended send time, so server slowdowns show up in the tail instead of
+    silently lowering the offered load. Returns the (doc_id, VERIFY_FIELD
+    value) pairs written by create/upsert runs.
+    """
+    if operation == 'get' and not read_ids:
+        logging.error("Open-loop get test needs read_ids to draw documents from.")
+        return []
+    # Fail on a bad profile now rather than once the run has started
+    ramp_stages(rate, duration, ramp)
+    return asyncio.run(_run_open_loop_test(
+        operation, rate, duration, ramp, upsert_batch_size, read_ids, max_in_flight
+    ))
+
+def test_upsert_performance(count=1000, pipeline_depth=UPSERT_PIPELINE_DEPTH, adaptive=True,
+                            batch_size=100, target_latency_ms=UPSERT_TARGET_LATENCY_MS, verify_mode='bulk'):
+    """Test upsert performance with `pipeline_depth` batches in flight.
+
+    With `adaptive=True` the batch size starts at MAX_UPSERT_BATCH_SIZE and is
+    tuned AIMD-style from observed latency and errors; otherwise every batch
+    has `batch_size` documents. Documents of a batch the server rejects for
+    its size are resent in smaller batches, at most MAX_BATCH_RESENDS times,
+    and only while the size limit keeps dropping below the rejected size.
+    """
     logging.info(f"Testing upsert performance with {count} documents...")
     
-    batch_size = 100
+    sizer = AimdBatchSizer(max_size=MAX_UPSERT_BATCH_SIZE, target_latency_ms=target_latency_ms) if adaptive else None
     all_doc_ids = []
     all_emails = []
+    failed_batches = 0
+    failed_documents = 0
+    remaining = count
+    # (documents, resends) rejected for their batch size and waiting to be sent again
+    resends = deque()
+    in_flight = {}
+    start_time = time.perf_counter()
     
-    for i in range(0, count, batch_size):
-        batch_count = min(batch_size, count - i)
-        doc_ids, emails = upsert_user_documents(batch_count)
-        all_doc_ids.extend(doc_ids)
-        all_emails.extend(emails)
-        
-        # Small delay between batches
-        time.sleep(0.1)
+    with ThreadPoolExecutor(max_workers=pipeline_depth) as executor:
+        while remaining or resends or in_flight:
+            while (remaining or resends) and len(in_flight) < pipeline_depth:
+                size, epoch = sizer.next_batch() if sizer else (batch_size, 0)
+                if resends:
+                    documents, attempt = resends.popleft()
+                    size = min(size, documents)
+                    if documents > size:
+                        resends.appendleft((documents - size, attempt))
+                else:
+                    attempt = 0
+                    size = min(size, remaining)
+                    remaining -= size
+                in_flight[executor.submit(_upsert_batch, size)] = (size, epoch, attempt)
+            
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                size, epoch, attempt = in_flight.pop(future)
+                try:
+                    doc_ids, emails, response_time_ms = future.result()
+                except Exception as e:
+                    logging.error(f"Failed to upsert {size} documents: {e}")
+                    failed_batches += 1
+                    if sizer:
+                        sizer.on_error(size, epoch, e)
+                        # Rejected for size alone: resend these documents in smaller batches while that can help
+                        if (batch_limit_from_error(e, size) is not None and size > sizer.min_size
+                                and sizer.ceiling < size and attempt < MAX_BATCH_RESENDS):
+                            resends.append((size, attempt + 1))
+                            continue
+                    failed_documents += size
+                    continue
+                all_doc_ids.extend(doc_ids)
+                all_emails.extend(emails)
+                if sizer:
+                    sizer.on_success(size, epoch, response_time_ms)
+    
+    elapsed = time.perf_counter() - start_time
+    logging.info(f"Upserted {len(all_doc_ids)} documents in {elapsed:.2f} s "
+                 f"({len(all_doc_ids) / elapsed:.2f} documents/s, {failed_batches} failed batches, "
+                 f"{failed_documents} documents not written)")
+    if sizer:
+        logging.info(f"Settled batch size: {sizer.settled_size():.0f} "
+                     f"(ceiling {sizer.ceiling}, error rate {sizer.error_rate:.2%})")
     
     # Verify some of the upserted documents
     if all_doc_ids and all_emails:
         sample_size = min(100, len(all_doc_ids))
         sample_docs = list(zip(all_doc_ids[:sample_size], all_emails[:sample_size]))
-        verified_count = verify_documents(sample_docs)
+        verified_count = verify_documents(sample_docs, verify_mode)
         logging.info(f"Verified {verified_count} out of {sample_size} sampled upserted documents")
     
     return list(zip(all_doc_ids, all_emails))
 
-def print_performance_summary():
-    """Print comprehensive performance summary."""
-    
-    # Write performance summary
-    if write_response_times:
-        logging.info("=== WRITE PERFORMANCE (create_document) ===")
-        logging.info(f"Slowest request: {max(write_response_times):.2f} ms")
-        logging.info(f"Fastest request: {min(write_response_times):.2f} ms")
-        logging.info(f"Average request time: {sum(write_response_times) / len(write_response_times):.2f} ms")
-        if write_end_time and write_start_time:
-            total_write_time = write_end_time - write_start_time
-            write_tps = len(write_response_times) / total_write_time
-            logging.info(f"Transactions per second (TPS): {write_tps:.2f}")
-        logging.info(f"Latency Categories: {write_latency_categories}")
-    
-    # Upsert performance summary
-    if upsert_response_times:
-        logging.info("=== UPSERT PERFORMANCE (upsert_documents) ===")
-        logging.info(f"Slowest request: {max(upsert_response_times):.2f} ms")
-        logging.info(f"Fastest request: {min(upsert_response_times):.2f} ms")
-        logging.info(f"Average request time: {sum(upsert_response_times) / len(upsert_response_times):.2f} ms")
-        if upsert_end_time and upsert_start_time:
-            total_upsert_time = upsert_end_time - upsert_start_time
-            # Calculate documents per second based on total documents upserted
-            total_docs_upserted = len(upsert_response_times) * 100  # Assuming 100 docs per batch
-            upsert_dps = total_docs_upserted / total_upsert_time
-            logging.info(f"Documents per second: {upsert_dps:.2f}")
-        logging.info(f"Latency Categories: {upsert_latency_categories}")
-    
-    # Read performance summary
-    if read_response_times:
-        logging.info("=== READ PERFORMANCE (get_document) ===")
-        logging.info(f"Slowest request: {max(read_response_times):.2f} ms")
-        logging.info(f"Fastest request: {min(read_response_times):.2f} ms")
-        logging.info(f"Average request time: {sum(read_response_times) / len(read_response_times):.2f} ms")
-        if read_end_time and read_start_time:
-            total_read_time = read_end_time - read_start_time
-            read_tps = len(read_response_times) / total_read_time
-            logging.info(f"Transactions per second (TPS): {read_tps:.2f}")
-        logging.info(f"Latency Categories: {read_latency_categories}")
-
-def run_comprehensive_test(create_count=500, upsert_count=1000):
-    """Run comprehensive performance test with both create and upsert methods."""
+def seed_plan(count, batch_size=MAX_UPSERT_BATCH_SIZE, seed=PAYLOAD_SEED, id_prefix='seed'):
+    """The deterministic plan of a resumable seed job, as stored in its journal."""
+    if len(id_prefix) + 12 > 36:
+        raise ValueError("id_prefix leaves no room for the 12-digit document number in a 36-character ID")
+    return {
+        'database_id': DATABASE_ID,
+        'collection_id': COLLECTION_ID,
+        'count': count,
+        'batch_size': batch_size,
+        'seed': seed,
+        'id_prefix': id_prefix,
+        'workload': workload.spec,
+    }
+
+def planned_documents(plan, pool, batch):
+    """The documents of batch `batch` of a seed plan; always the same IDs and payloads."""
+    start = batch * plan['batch_size']
+    size = min(plan['batch_size'], plan['count'] - start)
+    # Generate the full batch so its payloads never depend on where the job ends
+    columns = pool.build_batch(batch)
+    return [
+        {'$id': ID.custom(f"{plan['id_prefix']}{start + offset:012d}"),
+         **{key: values[offset] for key, values in columns.items()}}
+        for offset in range(size)
+    ]
+
+def seed_documents_resumable(count, journal_path, batch_size=MAX_UPSERT_BATCH_SIZE, seed=PAYLOAD_SEED,
+                             id_prefix='seed', rate=None, workers=UPSERT_PIPELINE_DEPTH, progress_interval=30):
+    """Seed `count` documents in fixed batches that survive crashes and restarts.
+
+    Document IDs (`id_prefix` plus a 12-digit number) and payloads follow
+    from the plan alone, so batch n is the same on every run. Each batch is
+    upserted and then recorded in the SeedJournal at `journal_path`;
+    running again with the same arguments skips the committed batches and
+    resends the rest, including any that were in flight when the job died.
+    `rate` caps ingest at that many documents per second, evenly paced, for
+    multi-hour loads. Returns the number of committed documents.
+    """
+    plan = seed_plan(count, batch_size, seed, id_prefix)
+    pool = workload.payload_pool(seed=seed, batch_size=batch_size)
+    batches = math.ceil(count / batch_size)
+    pacer = TokenBucket(rate / batch_size, burst=1) if rate else None
+
+    def upsert(batch):
+        if pacer:
+            time.sleep(pacer.reserve())
+        documents = planned_documents(plan, pool, batch)
+        _timed_call(upsert_latency, 'bulk', databases.upsert_documents, items=lambda response: len(documents),
+                    database_id=DATABASE_ID, collection_id=COLLECTION_ID, documents=documents)
+        journal.record(batch, len(documents))
+        return len(documents)
+
+    with SeedJournal(journal_path, plan) as journal:
+        pending = journal.pending(batches)
+        resumed = journal.committed
+        logging.info(f"Seeding {count} documents in {batches} batches: {batches - len(pending)} already committed "
+                     f"({resumed} documents), {len(pending)} to go")
+        failed_batches = 0
+        start_time = last_report = time.perf_counter()
+        with live_metrics(), ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(upsert, batch): batch for batch in pending}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed_batches += 1
+                    logging.error(f"Failed to upsert seed batch {futures[future]}: {e}")
+                now = time.perf_counter()
+                if now - last_report >= progress_interval:
+                    last_report = now
+                    committed = journal.committed
+                    rate_now = (committed - resumed) / (now - start_time)
+                    eta = (count - committed) / rate_now if rate_now else float('inf')
+                    logging.info(f"Seed progress: {committed}/{count} documents ({rate_now:.0f}/s, ETA {eta:.0f} s)")
+        committed = journal.committed
+
+    elapsed = time.perf_counter() - start_time
+    logging.info(f"Committed {committed - resumed} documents in {elapsed:.2f} s "
+                 f"({(committed - resumed) / elapsed if elapsed else 0:.2f} documents/s); {committed}/{count} done")
+    if failed_batches:
+        logging.warning(f"{failed_batches} batches failed; run again with journal {journal_path} to retry them")
+    return committed
+
+def _timed_call(recorder, endpoint_class, fn, items=None, **kwargs):
+    """Call `fn` through the governor, recording its latency (and failures) in `recorder`."""
+    recorder.mark_start()
+    try:
+        response = governor.call(endpoint_class, fn, **kwargs)
+        recorder.record(governor.last_attempt_ms(), items=items(response) if items else 1)
+        return response
+    except Exception:
+        recorder.record_error()
+        raise
+    finally:
+        recorder.mark_end()
+
+def _run_mix_operation(name, options, working_set, keys, rng):
+    """Run one operation of the workload mix against the working set.
+
+    Returns False when a read came back with content other than expected.
+    """
+    if name in ('create', 'upsert'):
+        count = options.get('batch_size', 100) if name == 'upsert' else 1
+        documents = [{'$id': ID.unique(), **payload} for payload in payload_pool.take_many(count)]
+        if name == 'create':
+            _timed_call(write_latency, 'write', databases.create_document,
+                        database_id=DATABASE_ID, collection_id=COLLECTION_ID,
+                        document_id=documents[0]['$id'],
+                        data={key: value for key, value in documents[0].items() if key != '$id'},
+                        on_conflict=lambda: _get_created(documents[0]['$id']))
+        else:
+            _timed_call(upsert_latency, 'bulk', databases.upsert_documents, items=lambda response: len(documents),
+                        database_id=DATABASE_ID, collection_id=COLLECTION_ID, documents=documents)
+        working_set.add_many(documents)
+    elif name == 'list':
+        _timed_call(
+            list_latency, 'list', databases.list_documents,
+            items=lambda response: len(response['documents']),
+            database_id=DATABASE_ID,
+            collection_id=COLLECTION_ID,
+            queries=[Query.limit(options.get('limit', 25))]
+        )
+    elif name == 'delete':
+        taken = working_set.take(keys, rng)
+        if taken:
+            _timed_call(delete_latency, 'write', databases.delete_document,
+                        database_id=DATABASE_ID, collection_id=COLLECTION_ID, document_id=taken[0])
+    else:
+        drawn = working_set.draw(keys, rng)
+        if not drawn:
+            return True
+        slot, doc_id, expected_hash = drawn
+        if name == 'get':
+            document = _timed_call(read_latency, 'read', databases.get_document,
+                                   database_id=DATABASE_ID, collection_id=COLLECTION_ID, document_id=doc_id)
+            return working_set.matches(expected_hash, document) is not False
+        fields = options.get('fields')
+        data = {key: value for key, value in payload_pool.take().items() if not fields or key in fields}
+        _timed_call(update_latency, 'write', databases.update_document,
+                    database_id=DATABASE_ID, collection_id=COLLECTION_ID, document_id=doc_id, data=data)
+        working_set.updated(slot, doc_id, data)
+    return True
+
+def preload_working_set(working_set, count, batch_size=MAX_UPSERT_BATCH_SIZE):
+    """Upsert `count` documents and track them, so a soak run starts from a populated collection."""
+    def load(size):
+        documents = [{'$id': ID.unique(), **payload} for payload in payload_pool.take_many(size)]
+        governor.call('bulk', databases.upsert_documents,
+                      database_id=DATABASE_ID, collection_id=COLLECTION_ID, documents=documents)
+        working_set.add_many(documents)
+
+    sizes = [min(batch_size, count - offset) for offset in range(0, count, batch_size)]
+    with ThreadPoolExecutor(max_workers=UPSERT_PIPELINE_DEPTH) as executor:
+        list(executor.map(load, sizes))
+    logging.info(f"Preloaded working set with {len(working_set)} documents")
+
+def verify_working_set(working_set, sample_size=1000, batch_size=VERIFY_BATCH_SIZE):
+    """Check a sample of the working set against the server; returns (checked, missing, mismatched)."""
+    sample = working_set.sample(sample_size, random.Random(PAYLOAD_SEED))
+    fields = ['$id'] + working_set.fields
+    missing = mismatched = 0
+    for offset in range(0, len(sample), batch_size):
+        batch = dict(sample[offset:offset + batch_size])
+        response = _timed_call(
+            verify_list_latency, 'list', databases.list_documents, items=lambda response: len(batch),
+            database_id=DATABASE_ID,
+            collection_id=COLLECTION_ID,
+            queries=[Query.equal('$id', list(batch)), Query.select(fields), Query.limit(len(batch))]
+        )
+        found = {document['$id']: document for document in response['documents']}
+        missing += len(batch) - len(found)
+        mismatched += sum(working_set.matches(batch[doc_id], document) is False for doc_id, document in found.items())
+    logging.info(f"Checked {len(sample)} working-set documents: {missing} missing, {mismatched} with unexpected content")
+    return len(sample), missing, mismatched
+
+def _log_interval(previous):
+    """Log per-operation throughput and tail latency since the `previous` snapshots; returns the new ones."""
+    current = {name: recorder.snapshot() for name, recorder in phase_recorders().items()}
+    parts = []
+    for name, histogram in current.items():
+        delta = histogram.difference(previous[name])
+        if delta.total or delta.errors:
+            parts.append(f"{name} {delta.throughput():.0f}/s p50 {delta.percentile(50):.1f}ms "
+                         f"p99 {delta.percentile(99):.1f}ms err {delta.errors}")
+    logging.info(f"Interval: {' | '.join(parts) or 'no requests'}")
+    return current
+
+def run_workload_mix(duration=60, workers=50, distribution=None, preload=0, report_interval=60, verify_sample=1000):
+    """Run the workload's operation mix as a long-running soak test.
+
+    `workers` threads each draw operations by the mix weights of the
+    workload spec for `duration` seconds. Live documents are tracked in a
+    WorkingSet (IDs plus expected field hashes); get, update and delete pick
+    from it with `distribution` ('uniform', 'zipfian', 'hotset' or a
+    {'kind': ..., **options} dict; defaults to the spec's key_distribution),
+    and every get is checked against the expected hash. `preload` documents
+    are upserted first and excluded from the measurements. Per-operation
+    throughput and latency are logged every `report_interval` seconds.
+    Returns the working set.
+    """
+    reset_results()
+    names, weights = workload.operation_mix()
+    keys = key_distribution(distribution or workload.key_distribution)
+    working_set = WorkingSet(workload.target.hash_fields)
+    if preload:
+        preload_working_set(working_set, preload)
+        for recorder in phase_recorders().values():
+            recorder.reset()
+
+    mix = ', '.join(f"{name} {weight:.0%}" for name, weight in zip(names, weights))
+    logging.info(f"Running workload mix for {duration} s with {workers} workers ({type(keys).__name__}): {mix}")
+    deadline = time.perf_counter() + duration
+    stop = threading.Event()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        failures = unexpected_reads = 0
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            try:
+                if not _run_mix_operation(name, workload.operations[name], working_set, keys, rng):
+                    unexpected_reads += 1
+            except Exception as e:
+                failures += 1
+                logging.error(f"Workload {name} failed: {e}")
+        return failures, unexpected_reads
+
+    def reporter():
+        snapshots = {name: recorder.snapshot() for name, recorder in phase_recorders().items()}
+        while not stop.wait(report_interval):
+            snapshots = _log_interval(snapshots)
+
+    threading.Thread(target=reporter, daemon=True).start()
+    try:
+        with live_metrics(), ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(worker, range(PAYLOAD_SEED, PAYLOAD_SEED + workers)))
+    finally:
+        stop.set()
+
+    failures = sum(result[0] for result in results)
+    unexpected_reads = sum(result[1] for result in results)
+    logging.info(f"Workload mix finished with {len(working_set)} live documents, {failures} failed operations "
+                 f"and {unexpected_reads} reads with unexpected content (includes reads racing their own updates)")
+    print_performance_summary()
+    save_run_result(run_config(
+        'workload_mix', duration=duration, workers=workers, distribution=distribution or workload.key_distribution,
+        preload=preload
+    ))
+    if len(working_set) and verify_sample:
+        verify_working_set(working_set, verify_sample)
+    return working_set
+
+def log_latency_summary(title, histogram, rate_label='Transactions per second (TPS)', per_item=False):
+    """Log percentiles and throughput for one histogram."""
+    if not histogram.total:
+        return
+    logging.info(f"=== {title} ===")
+    logging.info(f"Requests: {histogram.total} ({histogram.errors} failed)")
+    logging.info(f"Fastest request: {histogram.min:.2f} ms")
+    logging.info(f"Average request time: {histogram.mean:.2f} ms")
+    logging.info(f"Latency percentiles: {histogram.describe()}")
+    if histogram.duration:
+        logging.info(f"{rate_label}: {histogram.throughput(per_item):.2f}")
+
+def print_performance_summary(histograms=None, retries=None, transport=None, profile=None):
+    """Print comprehensive performance summary.
+
+    Defaults to this process's recorders; pass merged `histograms` (as from
+    collect_results), the `retries`/`transport` descriptions and the merged
+    client `profile` to report on a distributed run.
+    """
+    histograms = histograms or {name: recorder.snapshot() for name, recorder in phase_recorders().items()}
+    log_latency_summary("WRITE PERFORMANCE (create_document)", histograms['write'])
+    log_latency_summary(
+        "UPSERT PERFORMANCE (upsert_documents)", histograms['upsert'],
+        rate_label='Documents per second', per_item=True
+    )
+    log_latency_summary("READ PERFORMANCE (get_document)", histograms['read'])
+    log_latency_summary(
+        "BULK VERIFY PERFORMANCE (list_documents)", histograms['verify_list'],
+        rate_label='Documents verified per second', per_item=True
+    )
+    log_latency_summary("LIST PERFORMANCE (list_documents)", histograms['list'])
+    log_latency_summary("UPDATE PERFORMANCE (update_document)", histograms['update'])
+    log_latency_summary("DELETE PERFORMANCE (delete_document)", histograms['delete'])
+    logging.info(f"Requests and retries: {retries or governor.describe()}")
+    logging.info(f"Connections: {transport or client.stats.describe()}")
+    profile = profile or client_profile()
+    logging.info(f"Client CPU: {CpuMeter.describe(profile['cpu'])}")
+    if profile['stages']:
+        logging.info("Client time by stage (wall includes waiting for the network, the GIL and locks):")
+        for line in StageTimers.describe(profile['stages']):
+            logging.info(f"  {line}")
+
+def run_comprehensive_test(create_count=500, upsert_count=1000, engine='threads', verify_mode='bulk'):
+    """Run comprehensive performance test with both create and upsert methods.
+
+    `engine='async'` drives the create/read phase through the asyncio engine.
+    `verify_mode='get'` verifies with one get_document per document, which is
+    needed for the read latency section of the summary.
+    """
     
+    reset_results()
     # Setup infrastructure
     if not setup_database_infrastructure():
         logging.error("Failed to setup database infrastructure. Exiting.")
@@ -433,16 +1271,23 @@ def run_comprehensive_test(create_count=500, upsert_count=1000):
     
     logging.info("=== Starting Comprehensive Performance Test ===")
     
-    # Test individual document creation
-    logging.info(f"Testing individual document creation with {create_count} documents...")
-    create_results = seed_users_parallel(create_count)
-    
-    # Test batch upsert
-    logging.info(f"Testing batch upsert with {upsert_count} documents...")
-    upsert_results = test_upsert_performance(upsert_count)
+    with live_metrics():
+        # Test individual document creation
+        logging.info(f"Testing individual document creation with {create_count} documents...")
+        if engine == 'async':
+            create_results = seed_users_async(create_count, verify_mode=verify_mode)
+        else:
+            create_results = seed_users_parallel(create_count, verify_mode)
+        
+        # Test batch upsert
+        logging.info(f"Testing batch upsert with {upsert_count} documents...")
+        upsert_results = test_upsert_performance(upsert_count, verify_mode=verify_mode)
     
     # Print comprehensive summary
     print_performance_summary()
+    save_run_result(run_config(
+        'comprehensive', create_count=create_count, upsert_count=upsert_count, engine=engine, verify_mode=verify_mode
+    ))
     
     logging.info("=== Performance Test Complete ===")
     logging.info(f"Total documents created individually: {len(create_results)}")
@@ -454,3 +1299,18 @@ if __name__ == '__main__':
     
     # Or test just upsert performance
     # test_upsert_performance(1000)
+
+    # Or keep thousands of create/read requests in flight from one process
+    # run_comprehensive_test(create_count=100000, upsert_count=1000, engine='async')
+
+    # Or run the operation mix of a workload spec (SEEDER_WORKLOAD=orders.yaml)
+    # setup_database_infrastructure()
+    # run_workload_mix(duration=3600, workers=100, distribution='zipfian', preload=100000)
+
+    # Or drive an open-loop run at a fixed arrival rate, ramping up first
+    # written = run_open_loop_test('create', ramp=[(60, 10, 500), (300, 500, 500)])
+    # run_open_loop_test('get', rate=1000, duration=300, read_ids=[doc_id for doc_id, _ in written])
+
+    # Or bulk-load millions of documents at a steady rate; rerun the same call to resume after a crash
+    # setup_database_infrastructure()
+    # seed_documents_resumable(5_000_000, 'seed-5m.journal', rate=5000)
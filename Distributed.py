@@ -0,0 +1,282 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client as connect, Listener, wait
+
+import DBSeeder
+import Profiler
+from LatencyHistogram import LatencyHistogram
+from RequestGovernor import RequestGovernor
+from Results import merge_throughput
+from Transport import TransportStats
+from Workload import Workload
+
+DEFAULT_ADDRESS = ('127.0.0.1', 6000)  # Pass --listen 0.0.0.0:6000 to accept workers from other hosts
+START_DELAY = 3  # Seconds between handing out jobs and the synchronised start
+RESULT_TIMEOUT = 3600  # Seconds the coordinator waits for workers' results before reporting without them
+WORKER_SEQUENCE_SPAN = 10 ** 12  # Generated sequence numbers reserved per worker, keeping unique fields unique
+METRICS_BASE_PORT = DBSeeder.METRICS_PORT  # Worker n serves its metrics on this port + n
+
+
+def authkey(generate=False):
+    """The shared secret from SEEDER_AUTHKEY; with `generate`, a fresh one is made and logged when it is unset."""
+    key = os.environ.get('SEEDER_AUTHKEY')
+    if not key:
+        if not generate:
+            raise ValueError("Set SEEDER_AUTHKEY to the key the coordinator was started with")
+        key = secrets.token_urlsafe(24)
+        logging.info(f"Generated a worker key; start workers with SEEDER_AUTHKEY={key}")
+    return key.encode()
+
+
+def send_message(connection, message):
+    # JSON rather than Connection.send, which pickles: a peer must never be able to run code here
+    connection.send_bytes(json.dumps(message).encode())
+
+
+def receive_message(connection):
+    return json.loads(connection.recv_bytes())
+
+
+def split_evenly(total, parts):
+    """Split `total` into `parts` integers that differ by at most one."""
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def make_jobs(workers, create_count, upsert_count, engine='threads', verify_mode='bulk', start_delay=START_DELAY):
+    """One job per worker, all starting at the same wall-clock time."""
+    start_at = time.time() + start_delay
+    return [
+        {
+            'worker': worker,
+            'create_count': create_share,
+            'upsert_count': upsert_share,
+            'engine': engine,
+            'verify_mode': verify_mode,
+            'start_at': start_at,
+            # Shipped with the job so remote workers need no copy of the spec file
+            'workload': DBSeeder.workload.spec,
+        }
+        for worker, (create_share, upsert_share) in enumerate(
+            zip(split_evenly(create_count, workers), split_evenly(upsert_count, workers))
+        )
+    ]
+
+
+def run_worker(job):
+    """Run one share of the DBSeeder workload in this process and return its results."""
+    # Each worker draws from its own payload stream so shares never repeat each other
+    DBSeeder.use_workload(
+        Workload(job['workload']),
+        seed=DBSeeder.PAYLOAD_SEED + job['worker'] + 1,
+        sequence_start=(job['worker'] + 1) * WORKER_SEQUENCE_SPAN
+    )
+    if METRICS_BASE_PORT is not None:
+        # Workers on one host each need a port of their own
+        DBSeeder.METRICS_PORT = METRICS_BASE_PORT + job['worker']
+    # A pool process may run more than one job
+    DBSeeder.reset_results()
+    delay = job['start_at'] - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
+    with DBSeeder.live_metrics():
+        if job['create_count']:
+            if job['engine'] == 'async':
+                DBSeeder.seed_users_async(job['create_count'], verify_mode=job['verify_mode'])
+            else:
+                DBSeeder.seed_users_parallel(job['create_count'], job['verify_mode'])
+        if job['upsert_count']:
+            DBSeeder.test_upsert_performance(job['upsert_count'], verify_mode=job['verify_mode'])
+
+    results = DBSeeder.collect_results()
+    results['worker'] = f"{socket.gethostname()}:{os.getpid()}"
+    return results
+
+
+def run_local_workers(jobs, processes):
+    """Run jobs on a pool of fresh (spawned) processes."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        return list(executor.map(run_worker, jobs))
+
+
+def merge_results(results):
+    """Merge worker results into one histogram per phase, one set of retry and connection counters and one client profile."""
+    histograms = {}
+    governor = RequestGovernor()
+    transport = TransportStats()
+    for result in results:
+        for name, data in result['histograms'].items():
+            histogram = LatencyHistogram.from_dict(data)
+            if name in histograms:
+                histograms[name].merge(histogram)
+            else:
+                histograms[name] = histogram
+        governor.absorb(result['governor'])
+        transport.absorb(result.get('transport', {}))
+    client = {
+        'cpu': Profiler.merge_cpu(result.get('client', {}).get('cpu', {}) for result in results),
+        'stages': Profiler.merge_stages(result.get('client', {}).get('stages', {}) for result in results),
+    }
+    return histograms, governor, transport, client
+
+
+def report(results, config=None):
+    """Log a line per worker, then the merged summary, and save the merged results when `config` is given.
+
+    Aggregate TPS divides all completed requests by the span from the
+    earliest start to the latest finish across workers, which assumes the
+    hosts' clocks are synchronised (e.g. by NTP); so does the merged
+    throughput series.
+    """
+    for result in results:
+        write = LatencyHistogram.from_dict(result['histograms']['write'])
+        upsert = LatencyHistogram.from_dict(result['histograms']['upsert'])
+        logging.info(f"Worker {result['worker']}: {write.total} writes ({write.throughput():.2f} TPS), "
+                     f"{upsert.items} upserted documents ({upsert.throughput(per_item=True):.2f}/s)")
+    histograms, governor, transport, client = merge_results(results)
+    logging.info(f"=== MERGED RESULTS FROM {len(results)} WORKERS ===")
+    DBSeeder.print_performance_summary(histograms, governor.describe(), transport.describe(), client)
+    if config:
+        DBSeeder.save_run_result(config, {
+            'histograms': {name: histogram.to_dict() for name, histogram in histograms.items()},
+            'throughput': merge_throughput([result.get('throughput') for result in results]),
+            'governor': governor.snapshot(),
+            'transport': transport.snapshot(),
+            'client': client,
+        })
+    return histograms
+
+
+def run_multiprocess_test(create_count=500, upsert_count=1000, processes=None, engine='threads', verify_mode='bulk'):
+    """Split the comprehensive test across a process pool on this host."""
+    processes = processes or os.cpu_count()
+    if not DBSeeder.setup_database_infrastructure():
+        logging.error("Failed to setup database infrastructure. Exiting.")
+        return None
+    jobs = make_jobs(processes, create_count, upsert_count, engine, verify_mode)
+    config = DBSeeder.run_config('multiprocess', create_count=create_count, upsert_count=upsert_count,
+                                 processes=processes, engine=engine, verify_mode=verify_mode)
+    return report(run_local_workers(jobs, processes), config)
+
+
+def gather_results(connections, timeout=RESULT_TIMEOUT):
+    """Receive results from {connection: worker address} until all answered or `timeout` seconds passed.
+
+    Returns the results received and the addresses of the workers that
+    failed or did not answer in time.
+    """
+    results, missing = [], []
+    pending = dict(connections)
+    deadline = time.monotonic() + timeout
+    while pending:
+        ready = wait(list(pending), timeout=max(deadline - time.monotonic(), 0))
+        if not ready:
+            break
+        for connection in ready:
+            worker = pending.pop(connection)
+            try:
+                results.extend(receive_message(connection))
+            except (EOFError, OSError, ValueError) as e:
+                logging.error(f"Worker {worker} failed before sending its results: {e!r}")
+                missing.append(worker)
+            connection.close()
+    for connection, worker in pending.items():
+        logging.error(f"Worker {worker} sent no results within {timeout} s")
+        missing.append(worker)
+        connection.close()
+    return results, missing
+
+
+def run_coordinator(workers, create_count=500, upsert_count=1000, address=DEFAULT_ADDRESS,
+                    engine='threads', verify_mode='bulk', result_timeout=RESULT_TIMEOUT):
+    """Wait for `workers` remote workers to connect, hand each a share and merge what they send back.
+
+    Workers that crash or send nothing within `result_timeout` seconds are
+    reported and left out of the merged results.
+    """
+    if not DBSeeder.setup_database_infrastructure():
+        logging.error("Failed to setup database infrastructure. Exiting.")
+        return None
+    with Listener(address, authkey=authkey(generate=True)) as listener:
+        logging.info(f"Waiting for {workers} workers on {address[0]}:{address[1]}...")
+        connections = {}
+        while len(connections) < workers:
+            try:
+                connection = listener.accept()
+            except AuthenticationError:
+                logging.warning("Rejected a connection with the wrong SEEDER_AUTHKEY")
+                continue
+            connections[connection] = f"{listener.last_accepted[0]}:{listener.last_accepted[1]}"
+            logging.info(f"Worker connected from {listener.last_accepted} ({len(connections)}/{workers})")
+
+        jobs = make_jobs(workers, create_count, upsert_count, engine, verify_mode)
+        for connection, job in zip(connections, jobs):
+            send_message(connection, job)
+        results, missing = gather_results(connections, result_timeout)
+    if not results:
+        logging.error("No worker sent results.")
+        return None
+    if missing:
+        logging.warning(f"Merging the results that arrived; missing workers: {', '.join(missing)}")
+    config = DBSeeder.run_config('distributed', create_count=create_count, upsert_count=upsert_count,
+                                 workers=workers, engine=engine, verify_mode=verify_mode, missing_workers=missing)
+    return report(results, config)
+
+
+def run_remote_worker(address, processes=1):
+    """Connect to a coordinator, run the assigned share across `processes` local processes and send back the results."""
+    with connect(address, authkey=authkey()) as connection:
+        job = receive_message(connection)
+        logging.info(f"Received job: {job['create_count']} creates, {job['upsert_count']} upserts")
+        jobs = [
+            dict(job, worker=job['worker'] * processes + index, create_count=create_share, upsert_count=upsert_share)
+            for index, (create_share, upsert_share) in enumerate(
+                zip(split_evenly(job['create_count'], processes), split_evenly(job['upsert_count'], processes))
+            )
+        ]
+        send_message(connection, run_local_workers(jobs, processes) if processes > 1 else [run_worker(jobs[0])])
+
+
+def _address(value):
+    host, _, port = value.rpartition(':')
+    return host or DEFAULT_ADDRESS[0], int(port)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Distributed DBSeeder load generation')
+    subcommands = parser.add_subparsers(dest='role', required=True)
+
+    local = subcommands.add_parser('local', help='split the test across processes on this host')
+    coordinator = subcommands.add_parser('coordinator', help='hand out shares to remote workers and merge results')
+    for command in (local, coordinator):
+        command.add_argument('--create-count', type=int, default=500)
+        command.add_argument('--upsert-count', type=int, default=1000)
+        command.add_argument('--engine', choices=('threads', 'async'), default='threads')
+        command.add_argument('--verify-mode', choices=('bulk', 'get'), default='bulk')
+    local.add_argument('--processes', type=int, default=None)
+    coordinator.add_argument('--workers', type=int, required=True)
+    coordinator.add_argument('--listen', type=_address, default=DEFAULT_ADDRESS)
+    coordinator.add_argument('--result-timeout', type=float, default=RESULT_TIMEOUT,
+                             help='seconds to wait for workers to send results')
+
+    worker = subcommands.add_parser('worker', help='run shares handed out by a coordinator')
+    worker.add_argument('coordinator', type=_address, help='host:port of the coordinator')
+    worker.add_argument('--processes', type=int, default=1)
+
+    args = parser.parse_args()
+    if args.role == 'local':
+        run_multiprocess_test(args.create_count, args.upsert_count, args.processes, args.engine, args.verify_mode)
+    elif args.role == 'coordinator':
+        run_coordinator(args.workers, args.create_count, args.upsert_count, args.listen, args.engine, args.verify_mode,
+                        args.result_timeout)
+    else:
+        run_remote_worker(args.coordinator, args.processes)
@@ -1,30 +1,186 @@
-from appwrite.client import Client
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from appwrite.exception import AppwriteException
 from appwrite.services.storage import Storage
 from appwrite.query import Query
 
-def main():
-    # Initialize the Appwrite client
-    client = Client()
-    client.set_endpoint('https://cloud.appwrite.io/v1')  # Your API Endpoint
-    client.set_project('1234')  # Your project ID
-    client.set_key('1234')  # Your secret API key
+from RequestGovernor import RequestGovernor
+from Transport import TransportClient
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+APPWRITE_ENDPOINT = os.environ.get('APPWRITE_ENDPOINT', 'https://cloud.appwrite.io/v1')  # Your API Endpoint (or a MockAppwrite server)
+APPWRITE_PROJECT = '1234'  # Your project ID
+APPWRITE_KEY = '1234'  # Your secret API key
+
+LIST_PAGE_SIZE = 100  # Files per list_files page
+DOWNLOAD_WORKERS = 16  # Downloads in flight at once
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes written per chunk while streaming a download
+
+# Initialize the Appwrite client; each download thread keeps its own keep-alive connection
+client = TransportClient(scope='thread')
+client.set_endpoint(APPWRITE_ENDPOINT)
+client.set_project(APPWRITE_PROJECT)
+client.set_key(APPWRITE_KEY)
+
+# Initialize the Storage service
+storage = Storage(client)
+
+# Retry throttled and failed storage calls instead of giving up
+governor = RequestGovernor()
+
+
+def iterate_files(bucket_id, mime_type=None, queries=(), page_size=LIST_PAGE_SIZE):
+    """Yield every file of a bucket, paging with cursorAfter.
+
+    `mime_type` filters server-side with Query.equal('mimeType', ...); it may
+    be one type or a list of types.
+    """
+    page_queries = list(queries) + [Query.limit(page_size)]
+    if mime_type:
+        page_queries.append(Query.equal('mimeType', mime_type if isinstance(mime_type, list) else [mime_type]))
+    cursor = None
+    while True:
+        cursor_queries = page_queries + ([Query.cursor_after(cursor)] if cursor else [])
+        response = governor.call('storage', storage.list_files, bucket_id, queries=cursor_queries)
+        files = response['files']
+        yield from files
+        if len(files) < page_size:
+            return
+        cursor = files[-1]['$id']
+
+
+def local_path(dest_dir, file):
+    """Where a file is mirrored: its ID keeps same-named files apart."""
+    return os.path.join(dest_dir, f"{file['$id']}-{os.path.basename(file['name'])}")
+
+
+def _md5(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-    # Initialize the Storage service
-    storage = Storage(client)
 
+def already_present(path, file, check='size'):
+    """True if `path` already holds the file: same size, and with `check='signature'` also the same md5."""
+    if not check or not os.path.exists(path) or os.path.getsize(path) != file['sizeOriginal']:
+        return False
+    return check == 'size' or _md5(path) == file['signature']
+
+
+def _stream_to_disk(bucket_id, file, path, chunk_size):
+    """Stream one download into `path` through a temporary file; returns the bytes written."""
+    url = f"{APPWRITE_ENDPOINT.rstrip('/')}/storage/buckets/{bucket_id}/files/{file['$id']}/download"
+    temporary_path = path + '.part'
+    headers = {'x-appwrite-project': APPWRITE_PROJECT, 'x-appwrite-key': APPWRITE_KEY}
+    start_time = time.perf_counter()
+    try:
+        with client.session().get(url, headers=headers, stream=True, timeout=60) as response:
+            if response.status_code >= 400:
+                try:
+                    message = response.json().get('message', response.text)
+                except ValueError:
+                    message = response.text
+                error = AppwriteException(message, response.status_code, None, response.text)
+                # Lets the request governor honour X-RateLimit-Reset on throttled responses
+                error.headers = dict(response.headers)
+                raise error
+            written = 0
+            with open(temporary_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size):
+                    f.write(chunk)
+                    written += len(chunk)
+    except requests.RequestException as e:
+        # Transport failures are retried like any other code-less AppwriteException
+        raise AppwriteException(f"Download of {file['$id']} failed: {e}")
+    finally:
+        client.stats.record_request(time.perf_counter() - start_time)
+    os.replace(temporary_path, path)
+    return written
+
+
+def download_file(bucket_id, file, dest_dir, check='size', chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """Download one file unless an identical copy is already there; returns the bytes downloaded."""
+    path = local_path(dest_dir, file)
+    if already_present(path, file, check):
+        logging.debug(f"Skipping {file['$id']}: already present")
+        return None
+    return governor.call('storage', _stream_to_disk, bucket_id, file, path, chunk_size)
+
+
+def mirror_bucket(bucket_id, dest_dir, mime_type=None, workers=DOWNLOAD_WORKERS, check='size',
+                  chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """Download every (matching) file of a bucket into `dest_dir`.
+
+    Listing and downloading overlap: pages are fetched while up to `workers`
+    downloads stream to disk in `chunk_size` chunks, and no more than
+    2 * `workers` files are queued at once however large the bucket is.
+    Files already present with the same size (`check='size'`) or the same
+    size and md5 signature (`check='signature'`) are skipped; `check=None`
+    downloads everything. Returns a dict of counters.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    stats = {'listed': 0, 'downloaded': 0, 'skipped': 0, 'failed': 0, 'bytes': 0}
+    start_time = time.perf_counter()
+    in_flight = {}
+
+    def collect(done):
+        for future in done:
+            file = in_flight.pop(future)
+            try:
+                written = future.result()
+            except Exception as e:
+                stats['failed'] += 1
+                logging.error(f"Failed to download {file['$id']} ({file['name']}): {e}")
+                continue
+            if written is None:
+                stats['skipped'] += 1
+            else:
+                stats['downloaded'] += 1
+                stats['bytes'] += written
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for file in iterate_files(bucket_id, mime_type):
+            stats['listed'] += 1
+            if len(in_flight) >= 2 * workers:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight[executor.submit(download_file, bucket_id, file, dest_dir, check, chunk_size)] = file
+        collect(wait(in_flight).done)
+
+    elapsed = time.perf_counter() - start_time
+    megabytes = stats['bytes'] / (1024 * 1024)
+    logging.info(f"Listed {stats['listed']} files: {stats['downloaded']} downloaded, {stats['skipped']} skipped, "
+                 f"{stats['failed']} failed")
+    logging.info(f"Downloaded {megabytes:.2f} MB in {elapsed:.2f} s ({megabytes / elapsed if elapsed else 0:.2f} MB/s)")
+    logging.info(f"Requests and retries: {governor.describe()}")
+    logging.info(f"Connections: {client.stats.describe()}")
+    return stats
+
+
+def main():
     # Your bucket ID
     bucket_id = '1234'
 
     # Retrieve files based on MIME type
     mime_type = 'image/png'  # Specify the desired MIME type
     try:
-        response = storage.list_files(bucket_id, search=f'mimeType:{mime_type}')
-        files = response['files']
         print(f"List of files with MIME type '{mime_type}':")
-        for file in files:
+        for file in iterate_files(bucket_id, mime_type):
             print(file)
     except Exception as e:
         print(f"Error listing files with MIME type '{mime_type}':", str(e))
 
+    # Or mirror the matching files to a local directory
+    # mirror_bucket(bucket_id, 'downloads', mime_type, workers=32)
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,226 @@
+import threading
+import time
+from array import array
+
+REPORTED_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """Fixed-memory, log-bucketed latency histogram (HDR-style).
+
+    Values are recorded in microseconds. Below 2**precision_bits every value
+    has its own bucket; above that each power of two is split into
+    2**(precision_bits - 1) linear sub-buckets, so the relative error stays
+    under 1 / 2**(precision_bits - 1) across the whole range. The default
+    tracks up to one hour with <1.6% error in under 14 KB.
+
+    `start_time`/`end_time` are wall-clock timestamps bounding the measured
+    phase, so histograms recorded in different processes or on different
+    hosts can be merged into one aggregate throughput figure.
+    """
+
+    def __init__(self, precision_bits=7, max_value_us=3_600_000_000):
+        self.precision_bits = precision_bits
+        self.sub_buckets = 1 << precision_bits
+        self.half = self.sub_buckets >> 1
+        self.max_value_us = max_value_us
+        self.counts = array('q', [0]) * (self._index(max_value_us) + 1)
+        self.total = 0
+        self.items = 0
+        self.sum_us = 0
+        self.min_us = 0
+        self.max_us = 0
+        self.errors = 0
+        self.started = 0
+        self.start_time = 0.0
+        self.end_time = 0.0
+
+    def _index(self, value):
+        if value < self.sub_buckets:
+            return value
+        shift = value.bit_length() - self.precision_bits
+        return self.sub_buckets + (shift - 1) * self.half + (value >> shift) - self.half
+
+    def _highest_equivalent(self, index):
+        if index < self.sub_buckets:
+            return index
+        shift, offset = divmod(index - self.sub_buckets, self.half)
+        return ((self.half + offset + 1) << (shift + 1)) - 1
+
+    def record(self, value_ms, items=1):
+        """Record one latency sample in milliseconds; `items` counts e.g. documents in a batch."""
+        value = min(max(int(value_ms * 1000), 0), self.max_value_us)
+        self.counts[self._index(value)] += 1
+        if not self.total or value < self.min_us:
+            self.min_us = value
+        if value > self.max_us:
+            self.max_us = value
+        self.total += 1
+        self.items += items
+        self.sum_us += value
+
+    def merge(self, other):
+        """Add another histogram with the same layout into this one."""
+        if other.precision_bits != self.precision_bits or len(other.counts) != len(self.counts):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        self.errors += other.errors
+        self.started += other.started
+        if other.start_time and (not self.start_time or other.start_time < self.start_time):
+            self.start_time = other.start_time
+        self.end_time = max(self.end_time, other.end_time)
+        if not other.total:
+            return self
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            if count:
+                counts[index] += count
+        self.min_us = other.min_us if not self.total else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+        self.total += other.total
+        self.items += other.items
+        self.sum_us += other.sum_us
+        return self
+
+    def percentile(self, pct):
+        """Latency in milliseconds at or below which `pct` percent of samples fall."""
+        if not self.total:
+            return 0.0
+        target = max(int(round(pct / 100 * self.total + 0.5 - 1e-9)), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count:
+                seen += count
+                if seen >= target:
+                    return min(self._highest_equivalent(index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time if self.start_time and self.end_time else 0.0
+
+    def throughput(self, per_item=False):
+        """Completed requests (or items) per second over the recorded phase."""
+        completed = self.items if per_item else self.total
+        return completed / self.duration if self.duration else 0.0
+
+    def to_dict(self):
+        """Compact, JSON-friendly form with only the non-empty buckets."""
+        return {
+            'precision_bits': self.precision_bits,
+            'max_value_us': self.max_value_us,
+            'buckets': [[index, count] for index, count in enumerate(self.counts) if count],
+            'total': self.total,
+            'items': self.items,
+            'sum_us': self.sum_us,
+            'min_us': self.min_us,
+            'max_us': self.max_us,
+            'errors': self.errors,
+            'started': self.started,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(precision_bits=data['precision_bits'], max_value_us=data['max_value_us'])
+        for index, count in data['buckets']:
+            histogram.counts[index] = count
+        for field in ('total', 'items', 'sum_us', 'min_us', 'max_us', 'errors', 'started', 'start_time', 'end_time'):
+            setattr(histogram, field, data.get(field, 0))
+        return histogram
+
+    def difference(self, earlier):
+        """Histogram of the samples recorded since `earlier`, a previous snapshot of the same recorder."""
+        delta = LatencyHistogram(precision_bits=self.precision_bits, max_value_us=self.max_value_us)
+        first = last = -1
+        for index, (count, previous) in enumerate(zip(self.counts, earlier.counts)):
+            if count != previous:
+                delta.counts[index] = count - previous
+                if first < 0:
+                    first = index
+                last = index
+        for field in ('total', 'items', 'sum_us', 'errors', 'started'):
+            setattr(delta, field, getattr(self, field) - getattr(earlier, field))
+        if last >= 0:
+            # Exact extremes are not kept per interval; bucket bounds are within the histogram's precision
+            delta.min_us = self._highest_equivalent(first)
+            delta.max_us = min(self._highest_equivalent(last), self.max_us)
+        delta.start_time = earlier.end_time or earlier.start_time or self.start_time
+        delta.end_time = self.end_time
+        return delta
+
+    @property
+    def in_flight(self):
+        """Requests marked as started that have neither completed nor failed yet."""
+        return max(self.started - self.total - self.errors, 0)
+
+    @property
+    def mean(self):
+        return self.sum_us / self.total / 1000 if self.total else 0.0
+
+    @property
+    def min(self):
+        return self.min_us / 1000
+
+    @property
+    def max(self):
+        return self.max_us / 1000
+
+    def describe(self):
+        """One-line percentile summary used in log output."""
+        parts = [f"p{pct:g}: {self.percentile(pct):.2f} ms" for pct in REPORTED_PERCENTILES]
+        return ', '.join(parts + [f"max: {self.max:.2f} ms"])
+
+
+class LatencyRecorder:
+    """Thread-safe latency recorder built from per-thread histogram shards.
+
+    Each thread records into its own shard without locking; `snapshot()`
+    merges the shards into a single histogram for reporting.
+    """
+
+    def __init__(self, name, **histogram_options):
+        self.name = name
+        self.histogram_options = histogram_options
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'histogram', None)
+        if shard is None:
+            shard = LatencyHistogram(**self.histogram_options)
+            with self._lock:
+                self._shards.append(shard)
+            self._local.histogram = shard
+        return shard
+
+    def record(self, value_ms, items=1):
+        self._shard().record(value_ms, items)
+
+    def record_error(self):
+        self._shard().errors += 1
+
+    def mark_start(self):
+        """Count a started request and start the phase clock if this thread has not started it yet."""
+        shard = self._shard()
+        shard.started += 1
+        if not shard.start_time:
+            shard.start_time = time.time()
+
+    def mark_end(self):
+        """Move the end of the phase to now."""
+        self._shard().end_time = time.time()
+
+    def snapshot(self):
+        merged = LatencyHistogram(**self.histogram_options)
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            merged.merge(shard)
+        return merged
+
+    def reset(self):
+        with self._lock:
+            self._shards = []
+        self._local = threading.local()
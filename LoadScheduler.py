@@ -0,0 +1,85 @@
+import asyncio
+import math
+
+
+def ramp_stages(rate=None, duration=None, ramp=None):
+    """Normalise a constant rate or a ramp profile into (seconds, start_rps, end_rps) stages."""
+    if ramp:
+        stages = [(float(seconds), float(start), float(end)) for seconds, start, end in ramp]
+    else:
+        stages = [(float(duration), float(rate), float(rate))]
+    for seconds, _, _ in stages:
+        if seconds <= 0:
+            raise ValueError(f"Load stages must last longer than 0 seconds, got {seconds:g}")
+    return stages
+
+
+def arrival_offsets(rate=None, duration=None, ramp=None):
+    """Yield intended send times, in seconds from the start of the run.
+
+    Within a stage the rate changes linearly from start_rps to end_rps, and the
+    k-th arrival is placed where the integral of the rate reaches k.
+    """
+    stage_start = 0.0
+    for seconds, start_rate, end_rate in ramp_stages(rate, duration, ramp):
+        slope = (end_rate - start_rate) / seconds
+        arrival = 0
+        while True:
+            if slope == 0:
+                if start_rate <= 0:
+                    break
+                offset = arrival / start_rate
+            else:
+                # Solve start_rate * t + slope * t^2 / 2 = arrival for t
+                discriminant = start_rate * start_rate + 2 * slope * arrival
+                if discriminant < 0:
+                    break
+                offset = (math.sqrt(discriminant) - start_rate) / slope
+            if offset >= seconds:
+                break
+            yield stage_start + offset
+            arrival += 1
+        stage_start += seconds
+
+
+async def run_open_loop(operation, offsets, on_complete, max_in_flight=1000):
+    """Start `operation()` at each intended offset whether or not earlier calls finished.
+
+    `on_complete(latency_ms, service_ms, ok)` receives the latency measured
+    from the intended send time, which includes any time spent waiting for an
+    in-flight slot, and the service time measured from the actual send. Using
+    the former avoids coordinated omission: a slow server cannot push back on
+    the schedule and hide its own tail.
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks = set()
+    start = loop.time()
+
+    async def fire(intended):
+        try:
+            sent = loop.time()
+            ok = True
+            try:
+                await operation()
+            except Exception:
+                ok = False
+            done = loop.time()
+            on_complete((done - intended) * 1000, (done - sent) * 1000, ok)
+        finally:
+            slots.release()
+
+    for offset in offsets:
+        intended = start + offset
+        delay = intended - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await slots.acquire()
+        task = asyncio.ensure_future(fire(intended))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    return loop.time() - start
+
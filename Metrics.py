@@ -0,0 +1,177 @@
+import logging
+import sys
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from LatencyHistogram import LatencyHistogram
+
+METRIC_PREFIX = 'appwrite_seeder'
+WINDOW_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class _Series:
+    """Per-second deltas of one recorder, kept for the rolling window."""
+
+    def __init__(self, recorder, window):
+        self.recorder = recorder
+        self.previous = recorder.snapshot()
+        self.current = self.previous
+        self.deltas = deque(maxlen=window)
+
+    def sample(self):
+        self.current = self.recorder.snapshot()
+        self.deltas.append(self.current.difference(self.previous))
+        self.previous = self.current
+
+    def last_second(self):
+        return self.deltas[-1] if self.deltas else LatencyHistogram()
+
+    def window(self):
+        merged = LatencyHistogram()
+        for delta in self.deltas:
+            merged.merge(delta)
+        return merged
+
+
+class MetricsMonitor:
+    """Samples latency recorders once per interval and publishes live metrics.
+
+    Nothing is added to the request hot path: each tick snapshots the
+    recorders and diffs them against the previous tick, which yields
+    per-second throughput, errors and in-flight counts plus rolling-window
+    percentiles. The results are served in Prometheus text format on
+    `http://<host>:<port>/metrics` when `port` is set and written as a
+    single, continuously rewritten status line to stderr when `status_line`
+    is true.
+    """
+
+    def __init__(self, recorders, governor=None, port=None, host='0.0.0.0', status_line=True, window=10, interval=1.0):
+        self.series = {name: _Series(recorder, window) for name, recorder in recorders.items()}
+        self.governor = governor
+        self.port = port
+        self.host = host
+        self.status_line = status_line
+        self.interval = interval
+        self.retry_rates = {}
+        self._previous_retries = governor.snapshot()['retries'] if governor else {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def _tick(self):
+        with self._lock:
+            for series in self.series.values():
+                series.sample()
+            if self.governor:
+                retries = self.governor.snapshot()['retries']
+                self.retry_rates = {
+                    name: (count - self._previous_retries.get(name, 0)) / self.interval
+                    for name, count in retries.items()
+                }
+                self._previous_retries = retries
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._tick()
+            if self.status_line:
+                sys.stderr.write('\r' + self.render_status() + '\033[K')
+                sys.stderr.flush()
+
+    def render_status(self):
+        """Compact one-line view of the last second and the rolling window."""
+        with self._lock:
+            parts = []
+            for name, series in self.series.items():
+                second = series.last_second()
+                if not (series.current.started or series.current.total or series.current.errors):
+                    continue
+                window = series.window()
+                parts.append(
+                    f"{name} {second.total / self.interval:.0f}/s p50 {window.percentile(50):.0f}ms "
+                    f"p99 {window.percentile(99):.0f}ms inflight {series.current.in_flight} err {second.errors}"
+                )
+            retries = sum(self.retry_rates.values())
+            return ' | '.join(parts + [f"retries {retries:.0f}/s"])
+
+    def render_prometheus(self):
+        """Current metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}")
+
+        with self._lock:
+            current = {name: series.current for name, series in self.series.items()}
+            seconds = {name: series.last_second() for name, series in self.series.items()}
+            windows = {name: series.window() for name, series in self.series.items()}
+            metric('requests_total', 'counter', 'Completed requests.',
+                   [({'operation': name}, histogram.total) for name, histogram in current.items()])
+            metric('items_total', 'counter', 'Documents handled by completed requests.',
+                   [({'operation': name}, histogram.items) for name, histogram in current.items()])
+            metric('errors_total', 'counter', 'Requests that failed after retries.',
+                   [({'operation': name}, histogram.errors) for name, histogram in current.items()])
+            metric('in_flight', 'gauge', 'Requests currently in flight.',
+                   [({'operation': name}, histogram.in_flight) for name, histogram in current.items()])
+            metric('throughput', 'gauge', 'Completed requests per second over the last interval.',
+                   [({'operation': name}, histogram.total / self.interval) for name, histogram in seconds.items()])
+            metric('latency_ms', 'summary', 'Request latency over the rolling window.',
+                   [({'operation': name, 'quantile': f'{quantile:g}'}, histogram.percentile(quantile * 100))
+                    for name, histogram in windows.items() for quantile in WINDOW_QUANTILES])
+            if self.governor:
+                snapshot = self.governor.snapshot()
+                metric('retries_total', 'counter', 'Retried requests per endpoint class.',
+                       [({'endpoint_class': name}, count) for name, count in snapshot['retries'].items()])
+                metric('throttled_total', 'counter', 'Requests throttled with 429 per endpoint class.',
+                       [({'endpoint_class': name}, count) for name, count in snapshot['throttled'].items()])
+        return '\n'.join(lines) + '\n'
+
+    def _serve(self):
+        monitor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = monitor.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logging.info(f"Serving metrics on http://{self.host}:{self._server.server_address[1]}/metrics")
+
+    def start(self):
+        if self.port is not None:
+            self._serve()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self._server:
+            self._server.shutdown()
+        if self.status_line:
+            sys.stderr.write('\n')
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,572 @@
+import bisect
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# Appwrite stops counting matches for `total` at this many documents
+COUNT_LIMIT = 5000
+# Largest batch accepted by the bulk document endpoints
+BATCH_LIMIT = 1000
+
+
+class MockError(Exception):
+    def __init__(self, code, message, error_type='general_argument_invalid', headers=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.type = error_type
+        self.headers = headers or {}
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+
+
+class LatencyModel:
+    """Injected response latency: ('constant', ms), ('uniform', low_ms, high_ms) or ('lognormal', median_ms, sigma)."""
+
+    def __init__(self, spec=None):
+        self.spec = spec or ('constant', 0)
+
+    def sample(self, rng):
+        kind, *args = self.spec
+        if kind == 'constant':
+            return args[0] / 1000
+        if kind == 'uniform':
+            return rng.uniform(args[0], args[1]) / 1000
+        if kind == 'lognormal':
+            return rng.lognormvariate(math.log(args[0]), args[1]) / 1000
+        raise ValueError(f"Unknown latency distribution: {kind}")
+
+
+class MockAppwrite:
+    """In-memory state and fault injection for the mock Appwrite server.
+
+    `latency` is a LatencyModel spec applied to every request, `error_rate`
+    the probability of an injected 500, `throttle_rps` a project-wide request
+    rate above which requests get 429 with X-RateLimit-* headers, and
+    `attribute_delay` how long new attributes and indexes stay 'processing'.
+    Randomness comes from `seed`, so a given request sequence always sees the
+    same injected latencies and errors.
+    """
+
+    def __init__(self, latency=None, error_rate=0.0, throttle_rps=None, attribute_delay=0.0,
+                 count_limit=COUNT_LIMIT, batch_limit=BATCH_LIMIT, seed=0):
+        self.latency = LatencyModel(latency)
+        self.error_rate = error_rate
+        self.throttle_rps = throttle_rps
+        self.attribute_delay = attribute_delay
+        self.count_limit = count_limit
+        self.batch_limit = batch_limit
+        self.rng = random.Random(seed)
+        self.databases = {}
+        self.buckets = {}
+        self.requests = 0
+        self._window_start = time.time()
+        self._window_count = 0
+        self._lock = threading.RLock()
+
+    # Fault injection
+
+    def admit(self):
+        """Return the injected delay for a request, or raise an injected 429/500."""
+        with self._lock:
+            self.requests += 1
+            if self.throttle_rps:
+                now = time.time()
+                if now - self._window_start >= 1:
+                    self._window_start = now
+                    self._window_count = 0
+                self._window_count += 1
+                if self._window_count > self.throttle_rps:
+                    reset = int(self._window_start) + 1
+                    raise MockError(429, 'Rate limit for the current endpoint has been exceeded.',
+                                    'general_rate_limit_exceeded', {
+                                        'X-RateLimit-Limit': str(self.throttle_rps),
+                                        'X-RateLimit-Remaining': '0',
+                                        'X-RateLimit-Reset': str(reset),
+                                    })
+            delay = self.latency.sample(self.rng)
+            if self.error_rate and self.rng.random() < self.error_rate:
+                raise MockError(500, 'Injected server error', 'general_server_error')
+            return delay
+
+    # Lookups
+
+    def _database(self, database_id):
+        if database_id not in self.databases:
+            raise MockError(404, 'Database not found', 'database_not_found')
+        return self.databases[database_id]
+
+    def _collection(self, database_id, collection_id):
+        collections = self._database(database_id)['collections']
+        if collection_id not in collections:
+            raise MockError(404, 'Collection with the requested ID could not be found.', 'collection_not_found')
+        return collections[collection_id]
+
+    def _status(self, item):
+        if item['status'] == 'processing' and time.monotonic() - item['_created'] >= self.attribute_delay:
+            item['status'] = 'available'
+        return {key: value for key, value in item.items() if not key.startswith('_')}
+
+    # Databases, collections, attributes and indexes
+
+    def create_database(self, body):
+        database_id = body['databaseId']
+        if database_id in self.databases:
+            raise MockError(409, 'Database already exists', 'database_already_exists')
+        self.databases[database_id] = {
+            '$id': database_id, 'name': body.get('name', database_id), 'enabled': body.get('enabled', True),
+            '$createdAt': _now(), '$updatedAt': _now(), 'collections': {}
+        }
+        return 201, self.get_database(database_id)
+
+    def get_database(self, database_id):
+        database = self._database(database_id)
+        return {key: value for key, value in database.items() if key != 'collections'}
+
+    def create_collection(self, database_id, body):
+        collections = self._database(database_id)['collections']
+        collection_id = body['collectionId']
+        if collection_id in collections:
+            raise MockError(409, 'Collection already exists', 'collection_already_exists')
+        collections[collection_id] = {
+            '$id': collection_id, '$databaseId': database_id, 'name': body.get('name', collection_id),
+            '$permissions': body.get('permissions') or [], 'documentSecurity': body.get('documentSecurity', False),
+            'enabled': body.get('enabled', True), '$createdAt': _now(), '$updatedAt': _now(),
+            'attributes': {}, 'indexes': {}, 'documents': {}, 'ids': []
+        }
+        return 201, self.get_collection(database_id, collection_id)
+
+    def get_collection(self, database_id, collection_id):
+        collection = self._collection(database_id, collection_id)
+        result = {key: value for key, value in collection.items() if key not in ('attributes', 'indexes', 'documents', 'ids')}
+        result['attributes'] = [self._status(attribute) for attribute in collection['attributes'].values()]
+        result['indexes'] = [self._status(index) for index in collection['indexes'].values()]
+        return result
+
+    def create_attribute(self, database_id, collection_id, attribute_type, body):
+        collection = self._collection(database_id, collection_id)
+        key = body['key']
+        if key in collection['attributes']:
+            raise MockError(409, 'Attribute with the requested key already exists.', 'attribute_already_exists')
+        attribute = {
+            'key': key, 'type': attribute_type, 'status': 'processing', 'error': '',
+            'required': body.get('required', False), 'array': body.get('array', False),
+            '_created': time.monotonic()
+        }
+        attribute.update({name: body[name] for name in ('size', 'min', 'max', 'default', 'elements', 'format') if name in body})
+        collection['attributes'][key] = attribute
+        return 202, self._status(attribute)
+
+    @staticmethod
+    def _page(items, queries):
+        """The limit/offset page of `items` that `queries` ask for (25 from the start by default)."""
+        limit, offset = 25, 0
+        for query in queries:
+            if query['method'] == 'limit':
+                limit = query['values'][0]
+            elif query['method'] == 'offset':
+                offset = query['values'][0]
+        return items[offset:offset + limit]
+
+    def list_attributes(self, database_id, collection_id, queries):
+        attributes = [self._status(attribute) for attribute in self._collection(database_id, collection_id)['attributes'].values()]
+        return {'total': len(attributes), 'attributes': self._page(attributes, queries)}
+
+    def get_attribute(self, database_id, collection_id, key):
+        attributes = self._collection(database_id, collection_id)['attributes']
+        if key not in attributes:
+            raise MockError(404, 'Attribute with the requested ID could not be found.', 'attribute_not_found')
+        return self._status(attributes[key])
+
+    def create_index(self, database_id, collection_id, body):
+        collection = self._collection(database_id, collection_id)
+        key = body['key']
+        if key in collection['indexes']:
+            raise MockError(409, 'Index with the requested key already exists.', 'index_already_exists')
+        index = {
+            'key': key, 'type': body['type'], 'status': 'processing', 'error': '',
+            'attributes': body['attributes'], 'orders': body.get('orders') or [],
+            '_created': time.monotonic()
+        }
+        collection['indexes'][key] = index
+        return 202, self._status(index)
+
+    def list_indexes(self, database_id, collection_id, queries):
+        indexes = [self._status(index) for index in self._collection(database_id, collection_id)['indexes'].values()]
+        return {'total': len(indexes), 'indexes': self._page(indexes, queries)}
+
+    def delete_index(self, database_id, collection_id, key):
+        indexes = self._collection(database_id, collection_id)['indexes']
+        if indexes.pop(key, None) is None:
+            raise MockError(404, 'Index not found', 'index_not_found')
+        return 204, None
+
+    # Documents
+
+    def _validate(self, collection, data, partial=False):
+        attributes = collection['attributes']
+        if not attributes:
+            return
+        for key in data:
+            if not key.startswith('$') and key not in attributes:
+                raise MockError(400, f'Invalid document structure: Unknown attribute: "{key}"', 'document_invalid_structure')
+        if not partial:
+            for key, attribute in attributes.items():
+                if attribute['required'] and data.get(key) is None:
+                    raise MockError(400, f'Invalid document structure: Missing required attribute "{key}"',
+                                    'document_invalid_structure')
+
+    def _store(self, database_id, collection_id, collection, document_id, data, permissions=None):
+        documents = collection['documents']
+        now = _now()
+        existing = documents.get(document_id)
+        document = {key: value for key, value in data.items() if not key.startswith('$')}
+        document.update({
+            '$id': document_id, '$databaseId': database_id, '$collectionId': collection_id,
+            '$createdAt': existing['$createdAt'] if existing else now, '$updatedAt': now,
+            '$permissions': permissions if permissions is not None else (existing or {}).get('$permissions', [])
+        })
+        if existing is None:
+            bisect.insort(collection['ids'], document_id)
+        documents[document_id] = document
+        return document
+
+    def create_document(self, database_id, collection_id, body):
+        collection = self._collection(database_id, collection_id)
+        document_id = body['documentId']
+        if document_id == 'unique()':
+            document_id = '%x%05x' % (time.time_ns() // 1000, self.rng.getrandbits(20))
+        if document_id in collection['documents']:
+            raise MockError(409, 'Document with the requested ID already exists.', 'document_already_exists')
+        self._validate(collection, body['data'])
+        return 201, self._store(database_id, collection_id, collection, document_id, body['data'], body.get('permissions'))
+
+    def upsert_documents(self, database_id, collection_id, body):
+        collection = self._collection(database_id, collection_id)
+        documents = body['documents']
+        if len(documents) > self.batch_limit:
+            raise MockError(400, f'Invalid `documents` param: Value must a valid array no longer than {self.batch_limit} items')
+        for data in documents:
+            self._validate(collection, data)
+        stored = [self._store(database_id, collection_id, collection, data['$id'], data, data.get('$permissions'))
+                  for data in documents]
+        return 200, {'total': len(stored), 'documents': stored}
+
+    def get_document(self, database_id, collection_id, document_id, queries):
+        collection = self._collection(database_id, collection_id)
+        if document_id not in collection['documents']:
+            raise MockError(404, 'Document with the requested ID could not be found.', 'document_not_found')
+        document = collection['documents'][document_id]
+        select = next((query['values'] for query in queries if query['method'] == 'select'), None)
+        return self._project(document, select)
+
+    def update_document(self, database_id, collection_id, document_id, body):
+        collection = self._collection(database_id, collection_id)
+        existing = collection['documents'].get(document_id)
+        if existing is None:
+            raise MockError(404, 'Document with the requested ID could not be found.', 'document_not_found')
+        data = body.get('data') or {}
+        self._validate(collection, data, partial=True)
+        merged = {**existing, **data}
+        return self._store(database_id, collection_id, collection, document_id, merged, body.get('permissions'))
+
+    def delete_document(self, database_id, collection_id, document_id):
+        collection = self._collection(database_id, collection_id)
+        if collection['documents'].pop(document_id, None) is None:
+            raise MockError(404, 'Document with the requested ID could not be found.', 'document_not_found')
+        ids = collection['ids']
+        del ids[bisect.bisect_left(ids, document_id)]
+        return 204, None
+
+    @staticmethod
+    def _project(document, select):
+        if not select:
+            return document
+        projected = {key: value for key, value in document.items() if key.startswith('$')}
+        projected.update({key: document.get(key) for key in select if key in document})
+        return projected
+
+    def _matches(self, collection, document, filters):
+        for query in filters:
+            method, attribute, values = query['method'], query.get('attribute'), query.get('values') or []
+            value = document.get(attribute)
+            if method == 'search':
+                if not any(index['type'] == 'fulltext' and attribute in index['attributes']
+                           for index in collection['indexes'].values()):
+                    raise MockError(400, 'Searching by attribute "%s" requires a fulltext index.' % attribute)
+                words = str(values[0]).lower().split()
+                if not any(word in str(value or '').lower() for word in words):
+                    return False
+            elif method == 'equal':
+                if value not in values:
+                    return False
+            elif method == 'notEqual':
+                if value in values:
+                    return False
+            elif method in ('isNull', 'isNotNull'):
+                if (value is None) != (method == 'isNull'):
+                    return False
+            elif value is None:
+                return False
+            elif method == 'lessThan' and not value < values[0]:
+                return False
+            elif method == 'lessThanEqual' and not value <= values[0]:
+                return False
+            elif method == 'greaterThan' and not value > values[0]:
+                return False
+            elif method == 'greaterThanEqual' and not value >= values[0]:
+                return False
+            elif method == 'between' and not values[0] <= value <= values[1]:
+                return False
+            elif method == 'startsWith' and not str(value).startswith(values[0]):
+                return False
+        return True
+
+    def list_documents(self, database_id, collection_id, queries):
+        collection = self._collection(database_id, collection_id)
+        documents = collection['documents']
+        limit, offset, cursor, select, orders, filters = 25, 0, None, None, [], []
+        for query in queries:
+            method, values = query['method'], query.get('values') or []
+            if method == 'limit':
+                limit = values[0]
+            elif method == 'offset':
+                offset = values[0]
+            elif method == 'cursorAfter':
+                cursor = values[0]
+            elif method == 'select':
+                select = values
+            elif method in ('orderAsc', 'orderDesc'):
+                orders.append((query['attribute'], method == 'orderDesc'))
+            else:
+                filters.append(query)
+
+        if cursor is not None and cursor not in documents:
+            raise MockError(400, f'Document \'{cursor}\' for the \'cursor\' value not found.', 'document_not_found')
+
+        if not orders or orders == [('$id', False)]:
+            # Documents are kept sorted by $id, so pages can start at the cursor without sorting
+            ids = collection['ids']
+            start = bisect.bisect_right(ids, cursor) if cursor is not None else 0
+            candidates = (documents[document_id] for document_id in ids[start:])
+            count_filters = filters
+        else:
+            candidates = [document for document in documents.values() if self._matches(collection, document, filters)]
+            for attribute, descending in reversed(orders):
+                candidates.sort(key=lambda document: (document.get(attribute) is None, document.get(attribute)),
+                                reverse=descending)
+            if cursor is not None:
+                position = next((i for i, document in enumerate(candidates) if document['$id'] == cursor), None)
+                if position is None:
+                    # The cursor document exists but does not match the filters
+                    raise MockError(400, f'Document \'{cursor}\' for the \'cursor\' value not found.', 'document_not_found')
+                candidates = candidates[position + 1:]
+            count_filters, filters = filters, []
+
+        page = []
+        skipped = 0
+        for document in candidates:
+            if filters and not self._matches(collection, document, filters):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            if len(page) >= limit:
+                break
+            page.append(self._project(document, select))
+        return {'total': self._count(collection, count_filters), 'documents': page}
+
+    def _count(self, collection, filters):
+        """Matches for `total`, ignoring limit/offset/cursor and capped like the real server."""
+        documents = collection['documents']
+        if not filters:
+            return min(len(documents), self.count_limit)
+        total = 0
+        for document in documents.values():
+            if self._matches(collection, document, filters):
+                total += 1
+                if total >= self.count_limit:
+                    break
+        return total
+
+    # Storage
+
+    def add_file(self, bucket_id, file_id, name, mime_type, content):
+        """Seed a file into a bucket (buckets are created on demand)."""
+        bucket = self.buckets.setdefault(bucket_id, {})
+        bucket[file_id] = {
+            '$id': file_id, 'bucketId': bucket_id, 'name': name, 'mimeType': mime_type,
+            'sizeOriginal': len(content), 'signature': hashlib.md5(content).hexdigest(),
+            '$createdAt': _now(), '$updatedAt': _now(), '$permissions': [], 'chunksTotal': 1, 'chunksUploaded': 1,
+            '_content': content
+        }
+
+    def _bucket(self, bucket_id):
+        if bucket_id not in self.buckets:
+            raise MockError(404, 'Storage bucket with the requested ID could not be found.', 'storage_bucket_not_found')
+        return self.buckets[bucket_id]
+
+    def list_files(self, bucket_id, queries, search=None):
+        bucket = self._bucket(bucket_id)
+        limit, cursor, filters = 25, None, []
+        for query in queries:
+            if query['method'] == 'limit':
+                limit = query['values'][0]
+            elif query['method'] == 'cursorAfter':
+                cursor = query['values'][0]
+            elif query['method'] not in ('orderAsc', 'orderDesc', 'select'):
+                filters.append(query)
+        files = [bucket[file_id] for file_id in sorted(bucket) if cursor is None or file_id > cursor]
+        files = [file for file in files if self._matches({'indexes': {}}, file, filters)]
+        if search:
+            files = [file for file in files if search.lower() in (file['name'] + ' ' + file['mimeType']).lower()]
+        public = [{key: value for key, value in file.items() if not key.startswith('_')} for file in files]
+        return {'total': min(len(public), self.count_limit), 'files': public[:limit]}
+
+    def file_content(self, bucket_id, file_id):
+        bucket = self._bucket(bucket_id)
+        if file_id not in bucket:
+            raise MockError(404, 'The requested file could not be found.', 'storage_file_not_found')
+        return bucket[file_id]['_content'], bucket[file_id]['mimeType']
+
+
+_DATABASE_ROUTES = [
+    ('POST', r'/databases', 'create_database', ('body',)),
+    ('GET', r'/databases/([^/]+)', 'get_database', ()),
+    ('POST', r'/databases/([^/]+)/collections', 'create_collection', ('body',)),
+    ('GET', r'/databases/([^/]+)/collections/([^/]+)', 'get_collection', ()),
+    ('GET', r'/databases/([^/]+)/collections/([^/]+)/attributes', 'list_attributes', ('queries',)),
+    ('POST', r'/databases/([^/]+)/collections/([^/]+)/attributes/([a-z]+)', 'create_attribute', ('body',)),
+    ('GET', r'/databases/([^/]+)/collections/([^/]+)/attributes/([^/]+)', 'get_attribute', ()),
+    ('GET', r'/databases/([^/]+)/collections/([^/]+)/indexes', 'list_indexes', ('queries',)),
+    ('POST', r'/databases/([^/]+)/collections/([^/]+)/indexes', 'create_index', ('body',)),
+    ('DELETE', r'/databases/([^/]+)/collections/([^/]+)/indexes/([^/]+)', 'delete_index', ()),
+    ('GET', r'/databases/([^/]+)/collections/([^/]+)/documents', 'list_documents', ('queries',)),
+    ('POST', r'/databases/([^/]+)/collections/([^/]+)/documents', 'create_document', ('body',)),
+    ('PUT', r'/databases/([^/]+)/collections/([^/]+)/documents', 'upsert_documents', ('body',)),
+    ('GET', r'/databases/([^/]+)/collections/([^/]+)/documents/([^/]+)', 'get_document', ('queries',)),
+    ('PATCH', r'/databases/([^/]+)/collections/([^/]+)/documents/([^/]+)', 'update_document', ('body',)),
+    ('DELETE', r'/databases/([^/]+)/collections/([^/]+)/documents/([^/]+)', 'delete_document', ()),
+    ('GET', r'/storage/buckets/([^/]+)/files', 'list_files', ('queries', 'search')),
+]
+_ROUTES = [(method, re.compile(pattern + '$'), handler, extras) for method, pattern, handler, extras in _DATABASE_ROUTES]
+_DOWNLOAD_ROUTE = re.compile(r'/storage/buckets/([^/]+)/files/([^/]+)/(?:download|view)$')
+
+
+def _parse_queries(params):
+    indexed = sorted(
+        (int(key[len('queries['):-1]), value) for key, value in params if key.startswith('queries[') and key.endswith(']')
+    )
+    return [json.loads(value) for _, value in indexed]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle on, keep-alive clients wait out a delayed ACK on each
+    disable_nagle_algorithm = True
+    state = None
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+    def _send(self, status, payload=None, headers=None, content_type='application/json'):
+        body = b'' if payload is None else (payload if isinstance(payload, bytes) else json.dumps(payload).encode())
+        self.send_response(status)
+        # Empty responses (204) are not JSON; the SDK would otherwise try to parse them
+        self.send_header('Content-Type', content_type if payload is not None else 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        state = self.state
+        url = urlsplit(self.path)
+        path = url.path[len('/v1'):] if url.path.startswith('/v1') else url.path
+        params = parse_qsl(url.query, keep_blank_values=True)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+        try:
+            delay = state.admit()
+            if delay:
+                time.sleep(delay)
+            download = _DOWNLOAD_ROUTE.match(path)
+            if method == 'GET' and download:
+                with state._lock:
+                    content, mime_type = state.file_content(*download.groups())
+                return self._send(200, content, content_type=mime_type)
+            for route_method, pattern, handler, extras in _ROUTES:
+                match = pattern.match(path)
+                if route_method != method or not match:
+                    continue
+                args = list(match.groups())
+                for extra in extras:
+                    if extra == 'body':
+                        args.append(json.loads(raw_body or b'{}'))
+                    elif extra == 'queries':
+                        args.append(_parse_queries(params))
+                    elif extra == 'search':
+                        args.append(dict(params).get('search'))
+                with state._lock:
+                    result = getattr(state, handler)(*args)
+                status, payload = result if isinstance(result, tuple) else (200, result)
+                return self._send(status, payload)
+            raise MockError(404, f'Route not found: {method} {path}', 'general_route_not_found')
+        except MockError as e:
+            self._send(e.code, {'message': e.message, 'code': e.code, 'type': e.type, 'version': 'mock'}, e.headers)
+        except (KeyError, ValueError, TypeError) as e:
+            self._send(400, {'message': f'Invalid request: {e}', 'code': 400, 'type': 'general_argument_invalid',
+                             'version': 'mock'})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+def start_server(host='127.0.0.1', port=0, **options):
+    """Start a mock server on a background thread.
+
+    Returns (server, endpoint, state); pass `endpoint` wherever an Appwrite
+    endpoint is expected and call `server.shutdown()` when done. `options`
+    are forwarded to MockAppwrite.
+    """
+    state = MockAppwrite(**options)
+    handler = type('MockAppwriteHandler', (_Handler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f'http://{host}:{server.server_address[1]}/v1'
+    logging.info(f"Mock Appwrite listening on {endpoint}")
+    return server, endpoint, state
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    # Point the scripts at the mock with APPWRITE_ENDPOINT=http://127.0.0.1:8080/v1
+    server, endpoint, state = start_server(port=8080, latency=('lognormal', 40, 0.5), error_rate=0.001)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
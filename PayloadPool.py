@@ -0,0 +1,233 @@
+import queue
+import re
+import string
+import threading
+
+import numpy as np
+from faker import Faker
+
+
+def _local_part(name):
+    return re.sub(r'[^a-z0-9]', '', name.lower()) or 'user'
+
+
+class NameField:
+    """'First Last' names drawn from a small Faker vocabulary."""
+
+    def __init__(self, faker, vocabulary_size=1000):
+        self.first_names = np.array([faker.first_name() for _ in range(vocabulary_size)])
+        self.last_names = np.array([faker.last_name() for _ in range(vocabulary_size)])
+
+    def generate(self, rng, start, size):
+        first = self.first_names[rng.integers(0, len(self.first_names), size)]
+        last = self.last_names[rng.integers(0, len(self.last_names), size)]
+        return np.char.add(np.char.add(first, ' '), last).tolist()
+
+
+class EmailField:
+    """Unique 'first.last<sequence>@domain' addresses."""
+
+    def __init__(self, faker, vocabulary_size=1000):
+        self.first_locals = np.array([_local_part(faker.first_name()) for _ in range(vocabulary_size)])
+        self.last_locals = np.array([_local_part(faker.last_name()) for _ in range(vocabulary_size)])
+        self.domains = np.array(sorted({faker.free_email_domain() for _ in range(50)}))
+
+    def generate(self, rng, start, size):
+        first = self.first_locals[rng.integers(0, len(self.first_locals), size)]
+        last = self.last_locals[rng.integers(0, len(self.last_locals), size)]
+        domain = self.domains[rng.integers(0, len(self.domains), size)]
+        # The running sequence number keeps every generated email unique
+        sequence = np.arange(start, start + size).astype(str)
+        local_parts = np.char.add(np.char.add(first, '.'), last)
+        return np.char.add(np.char.add(np.char.add(local_parts, sequence), '@'), domain).tolist()
+
+
+class IntegerField:
+    def __init__(self, low=0, high=1000):
+        self.low = low
+        self.high = high
+
+    def generate(self, rng, start, size):
+        return rng.integers(self.low, self.high + 1, size).tolist()
+
+
+class FloatField:
+    def __init__(self, low=0.0, high=1000.0, decimals=2):
+        self.low = low
+        self.high = high
+        self.decimals = decimals
+
+    def generate(self, rng, start, size):
+        return np.round(rng.uniform(self.low, self.high, size), self.decimals).tolist()
+
+
+class BooleanField:
+    def __init__(self, probability=0.5):
+        self.probability = probability
+
+    def generate(self, rng, start, size):
+        return (rng.random(size) < self.probability).tolist()
+
+
+class ChoiceField:
+    """Values drawn from a fixed list, optionally weighted."""
+
+    def __init__(self, values, weights=None):
+        self.values = np.array(values)
+        self.weights = np.array(weights, dtype=float) / sum(weights) if weights else None
+
+    def generate(self, rng, start, size):
+        return self.values[rng.choice(len(self.values), size, p=self.weights)].tolist()
+
+
+class TextField:
+    """Random lowercase text with a length drawn uniformly from [min_length, max_length].
+
+    Rows are slices of one pre-generated character buffer, so wide text
+    attributes cost a slice per row rather than a random draw per character.
+    Use this to control document size.
+    """
+
+    ALPHABET = string.ascii_lowercase + ' '
+
+    def __init__(self, min_length=8, max_length=64, seed=0):
+        self.min_length = min_length
+        self.max_length = max_length
+        buffer_size = max(1 << 16, 2 * max_length)
+        characters = np.random.default_rng(seed).integers(0, len(self.ALPHABET), buffer_size)
+        self.buffer = ''.join(np.array(list(self.ALPHABET))[characters])
+
+    def generate(self, rng, start, size):
+        lengths = rng.integers(self.min_length, self.max_length + 1, size)
+        offsets = rng.integers(0, len(self.buffer) - self.max_length, size)
+        return [self.buffer[offset:offset + length] for offset, length in zip(offsets.tolist(), lengths.tolist())]
+
+
+class DatetimeField:
+    """ISO 8601 timestamps uniformly distributed between `start` and `end`."""
+
+    def __init__(self, start='2020-01-01T00:00:00', end='2025-01-01T00:00:00'):
+        self.start = np.datetime64(start, 's').astype(np.int64)
+        self.end = np.datetime64(end, 's').astype(np.int64)
+
+    def generate(self, rng, start, size):
+        seconds = rng.integers(self.start, self.end, size).astype('datetime64[s]')
+        return np.datetime_as_string(seconds, timezone='UTC').tolist()
+
+
+class SequenceField:
+    """Unique `prefix<sequence>` strings, e.g. for URLs or external keys."""
+
+    def __init__(self, prefix='', width=0):
+        self.prefix = prefix
+        self.width = width
+
+    def generate(self, rng, start, size):
+        sequence = np.char.zfill(np.arange(start, start + size).astype(str), self.width)
+        return np.char.add(self.prefix, sequence).tolist()
+
+
+class IpField:
+    def generate(self, rng, start, size):
+        octets = rng.integers(1, 255, (size, 4)).astype(str)
+        return [
+            '.'.join(row)
+            for row in zip(octets[:, 0].tolist(), octets[:, 1].tolist(), octets[:, 2].tolist(), octets[:, 3].tolist())
+        ]
+
+
+class ConstantField:
+    def __init__(self, value=None):
+        self.value = value
+
+    def generate(self, rng, start, size):
+        return [self.value] * size
+
+
+class ArrayField:
+    """Lists of `min_items`..`max_items` values from another field generator."""
+
+    def __init__(self, field, min_items=1, max_items=5):
+        self.field = field
+        self.min_items = min_items
+        self.max_items = max_items
+
+    def generate(self, rng, start, size):
+        lengths = rng.integers(self.min_items, self.max_items + 1, size).tolist()
+        values = self.field.generate(rng, start * self.max_items, sum(lengths))
+        offsets = np.cumsum([0] + lengths).tolist()
+        return [values[offsets[row]:offsets[row + 1]] for row in range(size)]
+
+
+def user_fields(seed=0, vocabulary_size=1000, min_age=18, max_age=100):
+    """The field generators of the built-in users collection (Name, email, age)."""
+    faker = Faker()
+    faker.seed_instance(seed)
+    return {
+        'Name': NameField(faker, vocabulary_size),
+        'email': EmailField(faker, vocabulary_size),
+        'age': IntegerField(min_age, max_age),
+    }
+
+
+class PayloadPool:
+    """Pre-generated document payloads served from columnar batches.
+
+    `fields` maps attribute keys to field generators (defaults to the users
+    collection). Generators draw whole columns at once with NumPy; Faker is
+    only used up front to build small vocabularies. Batches are assembled on
+    a background thread that keeps up to `queue_batches` batches ready in a
+    bounded queue. Batch `n` is always generated from the seed stream
+    (seed, n), so a pool is fully reproducible from its seed and fields.
+    Sequence-based fields (unique emails, sequence keys) count up from
+    `sequence_start`; give pools that write to the same collection disjoint
+    starts.
+    """
+
+    def __init__(self, seed=0, batch_size=10000, queue_batches=4, fields=None, sequence_start=0):
+        self.seed = seed
+        self.batch_size = batch_size
+        self.sequence_start = sequence_start
+        self.fields = fields if fields is not None else user_fields(seed)
+
+        self._queue = queue.Queue(maxsize=queue_batches)
+        self._lock = threading.Lock()
+        self._producer = None
+        self._columns = None
+        self._size = 0
+        self._position = 0
+
+    def build_batch(self, index, size=None):
+        """Build batch `index` as a dict of columns (Python lists, ready for JSON)."""
+        size = size or self.batch_size
+        rng = np.random.default_rng((self.seed, index))
+        start = self.sequence_start + index * size
+        return {key: field.generate(rng, start, size) for key, field in self.fields.items()}
+
+    def _produce(self):
+        index = 0
+        while True:
+            self._queue.put(self.build_batch(index))
+            index += 1
+
+    def _next_columns(self):
+        if self._producer is None:
+            self._producer = threading.Thread(target=self._produce, daemon=True)
+            self._producer.start()
+        self._columns = self._queue.get()
+        self._size = len(next(iter(self._columns.values()), []))
+        self._position = 0
+
+    def take(self):
+        """Return the next payload as a {key: value} dict."""
+        with self._lock:
+            if self._columns is None or self._position >= self._size:
+                self._next_columns()
+            position = self._position
+            self._position += 1
+            columns = self._columns
+        return {key: values[position] for key, values in columns.items()}
+
+    def take_many(self, count):
+        """Return the next `count` payloads."""
+        return [self.take() for _ in range(count)]
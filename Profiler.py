@@ -0,0 +1,227 @@
+import collections
+import contextlib
+import os
+import re
+import sys
+import threading
+import time
+
+# Shared no-op context for disabled stage timers; nullcontext is reentrant
+_NO_STAGE = contextlib.nullcontext()
+
+
+class StageTimers:
+    """Wall-clock and CPU time spent in named stages of the client's request path.
+
+    Used as `with timers.stage('payload'): ...`. Each thread accumulates
+    into its own shard, so timing adds no locking; `snapshot()` sums the
+    shards. CPU time is the calling thread's own (time.thread_time), so a
+    stage whose wall time far exceeds its CPU time was waiting (on the
+    network, the GIL or a lock) rather than computing. When disabled,
+    `stage()` returns a shared no-op context and costs next to nothing.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'stages', None)
+        if shard is None:
+            shard = self._local.stages = collections.defaultdict(lambda: [0.0, 0.0, 0])
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    @contextlib.contextmanager
+    def _timed(self, name):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            totals = self._shard()[name]
+            totals[0] += time.perf_counter() - wall
+            totals[1] += time.thread_time() - cpu
+            totals[2] += 1
+
+    def stage(self, name):
+        return self._timed(name) if self.enabled else _NO_STAGE
+
+    def reset(self):
+        with self._lock:
+            self._shards = []
+        self._local = threading.local()
+
+    def snapshot(self):
+        """{stage: [wall_seconds, cpu_seconds, count]} summed over threads."""
+        totals = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for name, (wall, cpu, count) in list(shard.items()):
+                entry = totals.setdefault(name, [0.0, 0.0, 0])
+                entry[0] += wall
+                entry[1] += cpu
+                entry[2] += count
+        return totals
+
+    @staticmethod
+    def describe(snapshot):
+        """One line per stage: time per call and how much of it was CPU."""
+        lines = []
+        for name, (wall, cpu, count) in sorted(snapshot.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name}: {count} calls, {wall / count * 1000:.3f} ms wall / {cpu / count * 1000:.3f} ms CPU "
+                         f"per call, {cpu:.2f} s CPU in total")
+        return lines
+
+
+class CpuMeter:
+    """The client process's own CPU use while measuring() blocks are running.
+
+    Consecutive and nested blocks accumulate. User and system CPU time come
+    from os.times(), which covers every thread of the process.
+    """
+
+    def __init__(self):
+        self.wall = 0.0
+        self.user = 0.0
+        self.system = 0.0
+        self._depth = 0
+        self._start = None
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measuring(self):
+        with self._lock:
+            self._depth += 1
+            if self._depth == 1:
+                times = os.times()
+                self._start = (time.perf_counter(), times.user, times.system)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._depth -= 1
+                if self._depth == 0:
+                    times = os.times()
+                    self.wall += time.perf_counter() - self._start[0]
+                    self.user += times.user - self._start[1]
+                    self.system += times.system - self._start[2]
+
+    def reset(self):
+        """Drop the totals of finished blocks."""
+        with self._lock:
+            self.wall = self.user = self.system = 0.0
+
+    def snapshot(self):
+        return {'wall': self.wall, 'user': self.user, 'system': self.system, 'processes': 1}
+
+    @staticmethod
+    def describe(snapshot):
+        """CPU utilisation in cores, with a warning when the client may have been the bottleneck."""
+        wall = snapshot.get('wall', 0.0)
+        if not wall:
+            return 'not measured'
+        processes = snapshot.get('processes', 1)
+        cores = (snapshot['user'] + snapshot['system']) / wall
+        per_process = cores / processes
+        line = (f"{cores:.2f} cores (user {snapshot['user'] / wall:.2f}, system {snapshot['system'] / wall:.2f}) "
+                f"over {wall / processes:.1f} s")
+        if processes > 1:
+            line += f", {per_process:.2f} per process"
+        # The GIL lets one process run Python code on about one core at a time
+        if per_process >= 0.8:
+            line += "; WARNING: close to one core per process, results may be limited by the client"
+        return line
+
+
+def merge_cpu(snapshots):
+    """Sum CpuMeter snapshots from several processes."""
+    merged = {'wall': 0.0, 'user': 0.0, 'system': 0.0, 'processes': 0}
+    for snapshot in snapshots:
+        for key in merged:
+            merged[key] += snapshot.get(key, 0)
+    return merged
+
+
+def merge_stages(snapshots):
+    """Sum StageTimers snapshots from several processes."""
+    merged = {}
+    for snapshot in snapshots:
+        for name, values in snapshot.items():
+            entry = merged.setdefault(name, [0.0, 0.0, 0])
+            for position, value in enumerate(values):
+                entry[position] += value
+    return merged
+
+
+class StackSampler:
+    """Statistical profiler sampling every thread's stack with sys._current_frames().
+
+    Samples are aggregated as folded stacks (`thread;file:function;... count`),
+    the input format of flamegraph.pl, speedscope and inferno. Sampling is
+    wall-clock: threads blocked in socket reads show up too, which is what
+    separates "waiting on the server" from "busy in the client".
+    """
+
+    def __init__(self, path, interval=0.005):
+        self.path = path
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _thread_names():
+        # Pool workers are named like ThreadPoolExecutor-0_7; fold them into one root per pool
+        return {thread.ident: re.sub(r'_\d+$', '', thread.name) for thread in threading.enumerate()}
+
+    def _sample(self):
+        names = self._thread_names()
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stack.append(names.get(ident, 'thread'))
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def write(self):
+        with open(self.path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    @contextlib.contextmanager
+    def sampling(self):
+        """Sample for the duration of the block and rewrite `path` at its end; nested blocks share one thread."""
+        with self._lock:
+            self._depth += 1
+            start = self._depth == 1
+        if start:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='StackSampler', daemon=True)
+            self._thread.start()
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._depth -= 1
+                stop = self._depth == 0
+            if stop:
+                self._stop.set()
+                self._thread.join()
+                self.write()
@@ -0,0 +1,334 @@
+import argparse
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from appwrite.query import Query
+
+import DBSeeder
+from LatencyHistogram import LatencyRecorder
+from Profiler import CpuMeter
+from Workload import CollectionSpec, load_spec
+
+SAMPLE_SIZE = 1000  # Documents read up front to draw filter values from
+DEFAULT_LIMIT = 25  # Documents per query unless a shape sets its own limit
+INDEX_PREFIX = 'qb_'  # Keys of the indexes the benchmark creates and drops
+VARIANTS = ('without index', 'with index')
+ORDERED_TYPES = ('integer', 'float', 'datetime')
+SHAPE_KINDS = ('equal', 'range', 'search', 'order', 'cursor', 'offset', 'select')
+
+
+class QueryShape:
+    """One list_documents query pattern of the benchmark, built from a spec dict.
+
+    Kinds:
+
+    - `equal`: `attribute` equal to a value seen in the collection
+    - `range`: `attribute` between two sampled values spanning about
+      `selectivity` (default 0.1) of the documents
+    - `search`: full-text search of `attribute` for a sampled word
+    - `order`: all documents ordered by `attribute`, `direction` 'desc'
+      (default) or 'asc'
+    - `cursor`: the page `depth` pages deep, reached with cursorAfter,
+      in $id order or ordered by `attribute`
+    - `offset`: the same page reached with offset, for comparison
+    - `select`: a projection of `attributes`
+
+    Every shape takes a `limit` and a `name`. Filtered and ordered shapes
+    get an index on their attribute (fulltext for search) unless `index`
+    gives another index spec, or null for none. Parameters are redrawn for
+    every request, so results are not served from a query cache.
+    """
+
+    def __init__(self, spec):
+        self.spec = dict(spec)
+        self.kind = spec['kind']
+        if self.kind not in SHAPE_KINDS:
+            raise ValueError(f"Unknown query kind '{self.kind}'; expected one of {', '.join(SHAPE_KINDS)}")
+        self.attribute = spec.get('attribute')
+        self.limit = spec.get('limit', DEFAULT_LIMIT)
+        self.depth = spec.get('depth', 10)
+        self.name = spec.get('name') or self._default_name()
+        self.index = spec['index'] if 'index' in spec else self._default_index()
+
+    def _default_name(self):
+        if self.kind == 'range':
+            return f"range({self.attribute}, {self.spec.get('selectivity', 0.1):.0%})"
+        if self.kind == 'order':
+            return f"order{self.spec.get('direction', 'desc').capitalize()}({self.attribute})"
+        if self.kind in ('cursor', 'offset'):
+            return f"{self.kind}(depth {self.depth}{', ' + self.attribute if self.attribute else ''})"
+        if self.kind == 'select':
+            return f"select({', '.join(self.spec['attributes'])})"
+        return f"{self.kind}({self.attribute})"
+
+    def _default_index(self):
+        if not self.attribute or self.kind == 'select':
+            return None
+        if self.kind == 'search':
+            return {'key': f'{INDEX_PREFIX}{self.attribute}_ft', 'type': 'fulltext', 'attributes': [self.attribute]}
+        return {'key': f'{INDEX_PREFIX}{self.attribute}', 'type': 'key', 'attributes': [self.attribute]}
+
+    def prepare(self, samples):
+        """Derive the values requests draw from, using sampled documents (and, for cursors, an ID walk)."""
+        if self.kind in ('equal', 'range'):
+            # Range bounds are quantiles over documents, so repeated values are kept
+            values = [document[self.attribute] for document in samples if document.get(self.attribute) is not None]
+            self.values = sorted(values) if self.kind == 'range' else sorted(set(values))
+            if not self.values:
+                raise ValueError(f"No sampled document has a value for '{self.attribute}'")
+        elif self.kind == 'search':
+            self.values = sorted({
+                word for document in samples for word in str(document.get(self.attribute) or '').split() if len(word) >= 3
+            })
+            if not self.values:
+                raise ValueError(f"No sampled document has words to search for in '{self.attribute}'")
+        elif self.kind == 'cursor':
+            ids = ordered_ids((self.depth + 1) * self.limit, self.attribute)
+            # Cursors anywhere on the page before the target depth, so requests are not all identical
+            self.values = ids[max(self.depth - 1, 0) * self.limit:self.depth * self.limit]
+            if not self.values:
+                raise ValueError(f"Collection has fewer than {self.depth * self.limit} documents for {self.name}")
+
+    def queries(self, rng):
+        """The queries of one request."""
+        queries = [Query.limit(self.limit)]
+        if self.kind == 'equal':
+            queries.append(Query.equal(self.attribute, [rng.choice(self.values)]))
+        elif self.kind == 'range':
+            span = max(int(len(self.values) * self.spec.get('selectivity', 0.1)), 1)
+            low = rng.randrange(max(len(self.values) - span, 1))
+            queries.append(Query.between(self.attribute, self.values[low], self.values[min(low + span, len(self.values) - 1)]))
+        elif self.kind == 'search':
+            queries.append(Query.search(self.attribute, rng.choice(self.values)))
+        elif self.kind == 'order':
+            order = Query.order_asc if self.spec.get('direction', 'desc') == 'asc' else Query.order_desc
+            queries.append(order(self.attribute))
+        elif self.kind in ('cursor', 'offset'):
+            if self.attribute:
+                queries.append(Query.order_asc(self.attribute))
+            if self.kind == 'cursor':
+                queries.append(Query.cursor_after(rng.choice(self.values)))
+            else:
+                queries.append(Query.offset(self.depth * self.limit + rng.randrange(self.limit)))
+        elif self.kind == 'select':
+            queries.append(Query.select(self.spec['attributes']))
+        return queries
+
+
+def default_shapes(collection, documents=None):
+    """Query shapes covering each kind, picked from the collection's attribute types.
+
+    Cursor and offset depths are limited to pages that exist among
+    `documents` documents, when that count is given.
+    """
+    attributes = collection.generated_attributes()
+    ordered = next((attr['key'] for attr in attributes if attr['type'] in ORDERED_TYPES and not attr.get('array')), None)
+    text = next((attr['key'] for attr in attributes if attr['type'] == 'string' and not attr.get('array')), None)
+    keyword = next(
+        (attr['key'] for attr in attributes if attr['type'] in ('email', 'enum', 'string') and attr['key'] != text), text
+    )
+    shapes = []
+    if keyword:
+        shapes.append({'kind': 'equal', 'attribute': keyword})
+    if ordered:
+        shapes.append({'kind': 'range', 'attribute': ordered, 'selectivity': 0.1})
+        shapes.append({'kind': 'order', 'attribute': ordered, 'direction': 'desc'})
+    if text:
+        shapes.append({'kind': 'search', 'attribute': text})
+    depths = [depth for depth in (1, 10, 100) if documents is None or (depth + 1) * DEFAULT_LIMIT <= documents]
+    shapes.extend({'kind': 'cursor', 'depth': depth} for depth in depths)
+    if depths:
+        shapes.append({'kind': 'offset', 'depth': depths[-1]})
+    if attributes:
+        shapes.append({'kind': 'select', 'attributes': [attr['key'] for attr in attributes[:2]]})
+    return shapes
+
+
+def _list(queries):
+    return DBSeeder.governor.call(
+        'list', DBSeeder.databases.list_documents,
+        database_id=DBSeeder.DATABASE_ID, collection_id=DBSeeder.COLLECTION_ID, queries=queries
+    )['documents']
+
+
+def collection_size():
+    """Documents in the target collection, as counted by the server."""
+    return DBSeeder.governor.call(
+        'list', DBSeeder.databases.list_documents,
+        database_id=DBSeeder.DATABASE_ID, collection_id=DBSeeder.COLLECTION_ID,
+        queries=[Query.limit(1), Query.select(['$id'])]
+    )['total']
+
+
+def sample_documents(count=SAMPLE_SIZE, page_size=100):
+    """Up to `count` documents of the target collection, in $id order."""
+    documents = []
+    while len(documents) < count:
+        cursor = [Query.cursor_after(documents[-1]['$id'])] if documents else []
+        page = _list([Query.limit(min(page_size, count - len(documents)))] + cursor)
+        documents.extend(page)
+        if len(page) < page_size:
+            break
+    return documents
+
+
+def ordered_ids(count, attribute=None, page_size=100):
+    """The first `count` document IDs in $id order, or ordered by `attribute`."""
+    ids = []
+    order = [Query.order_asc(attribute)] if attribute else []
+    while len(ids) < count:
+        cursor = [Query.cursor_after(ids[-1])] if ids else []
+        page = _list(order + [Query.select(['$id']), Query.limit(min(page_size, count - len(ids)))] + cursor)
+        ids.extend(document['$id'] for document in page)
+        if len(page) < page_size:
+            break
+    return ids
+
+
+def run_shape(shape, recorder, concurrency, requests, warmup, seed):
+    """Send `requests` requests of one shape from `concurrency` threads; returns the first error, if any."""
+    errors = []
+
+    def send(rng, record):
+        queries = shape.queries(rng)
+        if record:
+            recorder.mark_start()
+        try:
+            documents = _list(queries)
+            if record:
+                recorder.record(DBSeeder.governor.last_attempt_ms(), items=len(documents))
+        except Exception as e:
+            if record:
+                recorder.record_error()
+            errors.append(e)
+        finally:
+            if record:
+                recorder.mark_end()
+
+    def worker(worker_id):
+        rng = random.Random(f'{seed}:{shape.name}:{worker_id}')
+        share = requests // concurrency + (worker_id < requests % concurrency)
+        for _ in range(warmup // concurrency):
+            send(rng, False)
+        for _ in range(share):
+            send(rng, True)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    return errors[0] if errors else None
+
+
+def _summary(histogram):
+    if not histogram.total:
+        return f"all {histogram.errors} failed"
+    failed = f", {histogram.errors} failed" if histogram.errors else ''
+    return f"p50 {histogram.percentile(50):.1f} ms, p99 {histogram.percentile(99):.1f} ms{failed}"
+
+
+def log_report(results, concurrency, requests):
+    """Log each shape's latency with and without its index."""
+    logging.info(f"=== QUERY BENCHMARK ({requests} requests per shape, {concurrency} concurrent) ===")
+    for name, variants in results.items():
+        without, with_index = variants[VARIANTS[0]], variants[VARIANTS[1]]
+        rows = with_index.items / with_index.total if with_index.total else 0
+        line = f"{name}: without index {_summary(without)}; with index {_summary(with_index)}; {rows:.1f} rows/request"
+        if without.total and with_index.total and with_index.percentile(50):
+            line += f"; index speedup {without.percentile(50) / with_index.percentile(50):.2f}x at p50, " \
+                    f"{without.percentile(99) / with_index.percentile(99):.2f}x at p99"
+        logging.info(line)
+
+
+def run_query_benchmark(shapes=None, concurrency=8, requests=200, warmup=20, sample_size=SAMPLE_SIZE,
+                        keep_indexes=False, seed=DBSeeder.PAYLOAD_SEED):
+    """Benchmark list_documents query shapes on the target collection, without and then with their indexes.
+
+    `shapes` are QueryShape spec dicts; they default to the workload's
+    `queries`, or to shapes derived from the target collection's attribute
+    types. The collection should already be seeded (e.g. with
+    DBSeeder.seed_documents_resumable). The benchmark's own indexes are
+    dropped for the first pass, created (and waited for) before the second
+    and dropped again afterwards unless `keep_indexes` is set; indexes the
+    workload spec declares stay in place throughout. Each shape gets
+    `warmup` untimed and `requests` timed requests from `concurrency`
+    threads. Returns {shape name: {variant: LatencyHistogram}}.
+    """
+    DBSeeder.reset_results()
+    collection = DBSeeder.workload.target
+    samples = sample_documents(sample_size)
+    if not samples:
+        logging.error(f"Collection '{collection.id}' is empty; seed it before benchmarking queries")
+        return None
+    specs = shapes or DBSeeder.workload.queries or default_shapes(collection, collection_size())
+    shapes = []
+    for shape in map(QueryShape, specs):
+        try:
+            shape.prepare(samples)
+        except ValueError as e:
+            logging.warning(f"Skipping {shape.name}: {e}")
+            continue
+        shapes.append(shape)
+    if not shapes:
+        logging.error(f"No query shape can run on '{collection.id}'; seed more documents")
+        return None
+
+    indexes = list({shape.index['key']: shape.index for shape in shapes if shape.index}.values())
+    index_keys = [index['key'] for index in indexes]
+    logging.info(f"Benchmarking {len(shapes)} query shapes on '{collection.id}' with indexes: "
+                 f"{', '.join(index_keys) or 'none'}")
+
+    recorders = {}
+    with DBSeeder.live_metrics():
+        for variant in VARIANTS:
+            if variant == 'without index':
+                ready = DBSeeder.drop_indexes(collection.id, index_keys)
+            else:
+                ready = DBSeeder.ensure_indexes_exist([CollectionSpec({'id': collection.id, 'indexes': indexes})])
+            if not ready:
+                logging.error(f"Could not prepare indexes for the '{variant}' pass. Exiting.")
+                return None
+            for shape in shapes:
+                recorder = recorders[(shape.name, variant)] = LatencyRecorder(f'{shape.name} [{variant}]')
+                error = run_shape(shape, recorder, concurrency, requests, warmup, seed)
+                if error:
+                    logging.warning(f"{shape.name} [{variant}]: requests failed, e.g. {error}")
+    if not keep_indexes:
+        DBSeeder.drop_indexes(collection.id, index_keys)
+
+    results = {}
+    for (name, variant), recorder in recorders.items():
+        results.setdefault(name, {})[variant] = recorder.snapshot()
+    log_report(results, concurrency, requests)
+    logging.info(f"Client CPU: {CpuMeter.describe(DBSeeder.cpu_meter.snapshot())}")
+    DBSeeder.save_run_result(
+        DBSeeder.run_config('query_benchmark', shapes=[shape.spec for shape in shapes], indexes=indexes,
+                            concurrency=concurrency, requests=requests, warmup=warmup),
+        {
+            'histograms': {recorder.name: results[name][variant].to_dict()
+                           for (name, variant), recorder in recorders.items()},
+            'governor': DBSeeder.governor.snapshot(),
+            'transport': DBSeeder.client.stats.snapshot(),
+            'client': DBSeeder.client_profile(),
+        }
+    )
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark list_documents query shapes with and without indexes')
+    parser.add_argument('--shapes', help='YAML/JSON file with a list of query shape specs')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per shape and variant')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--keep-indexes', action='store_true', help='leave the benchmark indexes in place')
+    parser.add_argument('--seed-count', type=int, default=0,
+                        help='first seed this many documents (resumable, journaled in query-seed.journal)')
+    args = parser.parse_args()
+
+    if not DBSeeder.setup_database_infrastructure():
+        logging.error("Failed to setup database infrastructure. Exiting.")
+    else:
+        if args.seed_count:
+            DBSeeder.seed_documents_resumable(args.seed_count, 'query-seed.journal')
+        run_query_benchmark(load_spec(args.shapes) if args.shapes else None, args.concurrency, args.requests,
+                            args.warmup, keep_indexes=args.keep_indexes)
@@ -1,51 +1,485 @@
+import functools
+import gzip
+import importlib.util
+import json
 import logging
+import os
+import queue
+import threading
+import time
+import contextlib
 import concurrent.futures
-from appwrite.client import Client
+from datetime import datetime
 from appwrite.services.databases import Databases
 from appwrite.query import Query
 
+from LatencyHistogram import LatencyRecorder
+from Metrics import MetricsMonitor
+from RequestGovernor import RequestGovernor
+from Transport import TransportClient
+
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 
+http_pool_size = 150  # Keep-alive connections kept open; at least the largest number of scan/count workers
+
 # Setup Appwrite client
-client = Client()
-client.set_endpoint('https://cloud.appwrite.io/v1')  # Your API Endpoint
+client = TransportClient(pool_size=http_pool_size)
+client.set_endpoint(os.environ.get('APPWRITE_ENDPOINT', 'https://cloud.appwrite.io/v1'))  # Your API Endpoint (or a MockAppwrite server)
 client.set_project('1234')  # Your project ID here
 client.set_key('1234')  # Your secret API key here
 databases = Databases(client)
 database_id = '1234'  # Your database ID here
 collection_id = '1234'  # Your collection ID here
+page_size = 1000
+list_rate_limit = None  # list_documents requests per second; None for unlimited
+prefetch_pages = 4  # Pages each cursor stream may buffer ahead of the consumer
+export_row_group_size = 100000  # Documents per compressed row group in exports
+count_limit = 5000  # Largest `total` list_documents reports; Appwrite caps counts at 5000 by default
+count_partitions = 16  # Ranges a capped count is split into at each level
+count_workers = 16  # Count requests in flight at once
+log_each_page = True  # Per-page log lines; turn off for large scans
+metrics_port = None  # Serve Prometheus metrics on this port during scans (e.g. 9108)
+status_line = False  # Show a live one-line status on stderr during scans
+
+# Shared rate limiting and 429/5xx retry policy for every request
+governor = RequestGovernor({'list': list_rate_limit})
+# Page latency and documents per page for every list_documents call of a scan
+scan_latency = LatencyRecorder('scan')
+
+# Marks the end of a cursor stream on the shared page queue
+_STREAM_DONE = object()
+# Characters used when splitting $id ranges; ordered the same way with or without case folding
+_ID_ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+def _list_page(queries):
+    """Run one list_documents call, recording its latency in scan_latency."""
+    scan_latency.mark_start()
+    try:
+        response = governor.call('list', databases.list_documents, database_id, collection_id, queries=queries)
+        documents = response['documents']
+        scan_latency.record(governor.last_attempt_ms(), items=len(documents))
+        return documents
+    except Exception:
+        scan_latency.record_error()
+        raise
+    finally:
+        scan_latency.mark_end()
+
+def live_metrics():
+    """Context manager publishing scan metrics; does nothing unless metrics_port or status_line is set."""
+    if metrics_port is None and not status_line:
+        return contextlib.nullcontext()
+    return MetricsMonitor({'scan': scan_latency}, governor, port=metrics_port, status_line=status_line)
 
 def retrieve_documents(page):
     try:
         page_size = 1000
-        response = databases.list_documents(
-            database_id,
-            collection_id,
-            queries=[
-                Query.limit(page_size),
-                Query.offset(page * page_size)
-            ]
-        )
-        documents = response['documents']
-        logging.info(f"Retrieved {len(documents)} documents (page: {page + 1})")
+        documents = _list_page([
+            Query.limit(page_size),
+            Query.offset(page * page_size)
+        ])
+        if log_each_page:
+            logging.info(f"Retrieved {len(documents)} documents (page: {page + 1})")
         return documents
     except Exception as e:
-        logging.error(f"Something messed up: {e}")
-        return []
+        # Returning an empty page here would end the scan early and under-count
+        logging.error(f"Something messed up on page {page + 1}: {e}")
+        raise
 
 def process_documents(documents):
     for document in documents:
         # Perform any desired operations with each document
-        logging.info(f"Document ID: {document['$id']}")
+        logging.debug(f"Document ID: {document['$id']}")
         # Add more logging or processing as needed
 
-def scan_collection():
+def retrieve_page(queries, cursor=None):
+    """Fetch one page ordered by $id, starting after the given cursor."""
+    page_queries = list(queries) + [Query.limit(page_size), Query.order_asc('$id')]
+    if cursor:
+        page_queries.append(Query.cursor_after(cursor))
+    return _list_page(page_queries)
+
+def _put_unless_stopped(page_queue, item, stop_event):
+    """Put an item on the page queue, giving up once the consumer has gone away."""
+    while not stop_event.is_set():
+        try:
+            page_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _cursor_stream(stream, queries, page_queue, stop_event, cursor=None):
+    """Page through one range with cursorAfter, pushing pages onto the shared queue."""
+    pages = 0
+    try:
+        while not stop_event.is_set():
+            documents = retrieve_page(queries, cursor)
+            pages += 1
+            if log_each_page:
+                logging.info(f"Retrieved {len(documents)} documents (stream: {stream + 1}, page: {pages})")
+            if documents and not _put_unless_stopped(page_queue, (stream, documents), stop_event):
+                return
+            if len(documents) < page_size:
+                break
+            cursor = documents[-1]['$id']
+    except Exception as e:
+        _put_unless_stopped(page_queue, (stream, e), stop_event)
+    finally:
+        _put_unless_stopped(page_queue, (stream, _STREAM_DONE), stop_event)
+
+def _boundary_value(attribute, queries, descending=False):
+    """Return the lowest (or highest) value of an attribute matching the queries."""
+    order = Query.order_desc(attribute) if descending else Query.order_asc(attribute)
+    response = governor.call(
+        'list',
+        databases.list_documents,
+        database_id,
+        collection_id,
+        queries=list(queries) + [Query.limit(1), order, Query.select([attribute])]
+    )
+    documents = response['documents']
+    return documents[0][attribute] if documents else None
+
+def _id_to_int(value, width):
+    number = 0
+    for char in value.lower()[:width].ljust(width, _ID_ALPHABET[0]):
+        number = number * len(_ID_ALPHABET) + max(_ID_ALPHABET.find(char), 0)
+    return number
+
+def _int_to_id(number, width):
+    chars = []
+    for _ in range(width):
+        number, digit = divmod(number, len(_ID_ALPHABET))
+        chars.append(_ID_ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+def _split_points(attribute, low, high, partitions):
+    """Evenly spaced boundaries strictly between low and high."""
+    if attribute == '$createdAt' or attribute == '$updatedAt':
+        start = datetime.fromisoformat(low)
+        span = datetime.fromisoformat(high) - start
+        return [(start + span * i / partitions).isoformat(timespec='milliseconds') for i in range(1, partitions)]
+    width = max(len(low), len(high))
+    start = _id_to_int(low, width)
+    span = _id_to_int(high, width) - start
+    return [_int_to_id(start + span * i // partitions, width) for i in range(1, partitions)]
+
+def partition_ranges(attribute='$id', partitions=4, queries=()):
+    """Split the collection into contiguous ranges of an attribute.
+
+    The first and last ranges are open-ended, so every document matching the
+    queries falls into exactly one range even if the collection grows while
+    it is being scanned.
+    """
+    low = _boundary_value(attribute, queries)
+    high = _boundary_value(attribute, queries, descending=True)
+    if partitions <= 1 or low is None or low == high:
+        return [[]]
+
+    boundaries = []
+    for point in _split_points(attribute, low, high, partitions):
+        if (not boundaries or point > boundaries[-1]) and low < point <= high:
+            boundaries.append(point)
+    if not boundaries:
+        return [[]]
+
+    ranges = [[Query.less_than(attribute, boundaries[0])]]
+    for lower, upper in zip(boundaries, boundaries[1:]):
+        ranges.append([Query.greater_than_equal(attribute, lower), Query.less_than(attribute, upper)])
+    ranges.append([Query.greater_than_equal(attribute, boundaries[-1])])
+    return ranges
+
+def _stream_ranges(streams, prefetch=prefetch_pages):
+    """Run one cursor stream per (stream, queries, start_cursor) entry.
+
+    Yields (stream, documents) for every page and (stream, None) once a
+    stream is exhausted. Each stream runs in its own thread and may only
+    buffer `prefetch` pages ahead of the consumer, so memory stays flat
+    regardless of collection size.
+    """
+    page_queue = queue.Queue(maxsize=prefetch * max(len(streams), 1))
+    stop_event = threading.Event()
+    threads = [
+        threading.Thread(
+            target=_cursor_stream,
+            args=(stream, stream_queries, page_queue, stop_event, cursor),
+            daemon=True
+        )
+        for stream, stream_queries, cursor in streams
+    ]
+    for thread in threads:
+        thread.start()
+
+    remaining = len(threads)
+    try:
+        while remaining:
+            stream, item = page_queue.get()
+            if item is _STREAM_DONE:
+                remaining -= 1
+                yield stream, None
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield stream, item
+    finally:
+        stop_event.set()
+
+def stream_pages(queries=(), partitions=1, partition_attribute='$id', prefetch=prefetch_pages):
+    """Yield pages of documents from one cursor stream per partition range."""
+    ranges = partition_ranges(partition_attribute, partitions, queries) if partitions > 1 else [[]]
+    streams = [(stream, list(queries) + range_queries, None) for stream, range_queries in enumerate(ranges)]
+    for _, documents in _stream_ranges(streams, prefetch):
+        if documents is not None:
+            yield documents
+
+def stream_documents(queries=(), partitions=1, partition_attribute='$id', prefetch=prefetch_pages):
+    """Yield documents one at a time as their pages arrive."""
+    for documents in stream_pages(queries, partitions, partition_attribute, prefetch):
+        yield from documents
+
+def _count(queries):
+    """The `total` list_documents reports for the queries, transferring at most one $id."""
+    response = governor.call(
+        'list',
+        databases.list_documents,
+        database_id,
+        collection_id,
+        queries=list(queries) + [Query.limit(1), Query.select(['$id'])]
+    )
+    return response['total']
+
+def _count_by_paging(queries):
+    """Exact count of a range too dense to split, paging through its $ids only."""
+    return sum(len(documents) for documents in stream_pages([Query.select(['$id'])] + list(queries)))
+
+def count_documents(queries=(), partition_attribute='$id', partitions=count_partitions, workers=count_workers):
+    """Exactly count the documents matching `queries` without downloading them.
+
+    Each count is a limit(1), select(['$id']) request that reads the
+    response's `total`. A total that reaches the server's cap
+    (`count_limit`) is not exact, so that range is split into `partitions`
+    sub-ranges of `partition_attribute` ('$id' or '$createdAt') and those are
+    counted in parallel, level by level, until every range is under the cap.
+    """
+    start_time = time.perf_counter()
+    total_documents = 0
+    count_requests = 0
+    pending = [list(queries)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending:
+            counts = list(executor.map(_count, pending))
+            count_requests += len(pending)
+            capped = []
+            for range_queries, count in zip(pending, counts):
+                if count < count_limit:
+                    total_documents += count
+                else:
+                    capped.append(range_queries)
+            splits = list(executor.map(
+                lambda range_queries: partition_ranges(partition_attribute, partitions, range_queries), capped
+            ))
+            pending = []
+            for range_queries, ranges in zip(capped, splits):
+                if ranges == [[]]:
+                    # Every document in the range has the same value: nothing left to split on
+                    total_documents += _count_by_paging(range_queries)
+                else:
+                    pending.extend(range_queries + sub_range for sub_range in ranges)
+
+    logging.info(f"Counted {total_documents} documents with {count_requests} count requests "
+                 f"in {time.perf_counter() - start_time:.2f} s")
+    return total_documents
+
+def scan_collection(mode='cursor', partitions=1, partition_attribute='$id', queries=()):
+    """Scan the whole collection.
+
+    `mode='cursor'` pages with cursorAfter over one stream per partition;
+    `mode='offset'` keeps the original speculative offset waves;
+    `mode='count'` only counts (see count_documents), optionally filtered by
+    `queries`, and fetches no documents.
+    """
+    if mode == 'offset':
+        return _scan_collection_offset()
+    if mode == 'count':
+        return count_documents(queries, partition_attribute, partitions if partitions > 1 else count_partitions)
+
+    total_documents = 0
+    with live_metrics():
+        for documents in stream_pages(queries, partitions, partition_attribute):
+            total_documents += len(documents)
+            process_documents(documents)
+
+    logging.info(f"Total documents scanned: {total_documents}")
+    logging.info(f"Requests and retries: {governor.describe()}")
+    logging.info(f"Connections: {client.stats.describe()}")
+    return total_documents
+
+def _ndjson_compression():
+    """'zstd' when the optional zstandard package is installed, otherwise the standard library's 'gzip'."""
+    return 'zstd' if importlib.util.find_spec('zstandard') else 'gzip'
+
+class _NdjsonPartWriter:
+    """Appends row groups to one zstd- or gzip-compressed NDJSON file, one frame (or member) per group.
+
+    Concatenated frames decode as a single stream, so resuming only has to
+    truncate the file back to the size recorded at the last checkpoint.
+    """
+
+    def __init__(self, base_path, stream, state, compression, compression_level):
+        if compression == 'zstd':
+            import zstandard
+
+            self.compress = zstandard.ZstdCompressor(level=compression_level).compress
+            extension = 'zst'
+        else:
+            self.compress = functools.partial(gzip.compress, compresslevel=min(max(compression_level, 1), 9))
+            extension = 'gz'
+        self.file_path = f'{base_path}-{stream:03d}.ndjson.{extension}'
+        self.file = open(self.file_path, 'r+b' if state.get('bytes') else 'wb')
+        self.file.truncate(state.get('bytes', 0))
+        self.file.seek(0, os.SEEK_END)
+
+    def write(self, rows):
+        data = b''.join(json.dumps(row, separators=(',', ':')).encode() + b'\n' for row in rows)
+        self.file.write(self.compress(data))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {'bytes': self.file.tell()}
+
+    def close(self):
+        self.file.close()
+
+class _ParquetPartWriter:
+    """Writes each row group as its own Parquet file, renamed into place once complete."""
+
+    def __init__(self, base_path, stream, state, compression, compression_level):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("fmt='parquet' needs the optional pyarrow package (pip install pyarrow)") from e
+
+        self.pyarrow = pyarrow
+        self.parquet = pyarrow.parquet
+        self.base_path = base_path
+        self.stream = stream
+        self.parts = state.get('parts', 0)
+        self.compression_level = compression_level
+
+    def write(self, rows):
+        file_path = f'{self.base_path}-{self.stream:03d}-{self.parts:06d}.parquet'
+        table = self.pyarrow.Table.from_pylist(rows)
+        self.parquet.write_table(
+            table,
+            file_path + '.tmp',
+            compression='zstd',
+            compression_level=self.compression_level
+        )
+        os.replace(file_path + '.tmp', file_path)
+        self.parts += 1
+        return {'parts': self.parts}
+
+    def close(self):
+        pass
+
+_EXPORT_WRITERS = {'ndjson': _NdjsonPartWriter, 'parquet': _ParquetPartWriter}
+
+def _save_checkpoint(checkpoint_path, checkpoint):
+    with open(checkpoint_path + '.tmp', 'w') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(checkpoint_path + '.tmp', checkpoint_path)
+
+def export_collection(base_path, fmt='ndjson', columns=None, partitions=1, partition_attribute='$id',
+                      row_group_size=export_row_group_size, compression_level=3, checkpoint_path=None):
+    """Export the collection to compressed NDJSON or Parquet files.
+
+    One output stream is written per partition range (`{base_path}-NNN...`).
+    `columns` limits the fetched attributes with Query.select. Every row
+    group is made durable before the checkpoint records its last `$id` as the
+    stream's cursor, so rerunning the same call after an interruption resumes
+    each stream from its checkpoint instead of starting over.
+
+    NDJSON is zstd-compressed (`.ndjson.zst`) when the optional zstandard
+    package is installed and gzip-compressed (`.ndjson.gz`) otherwise. Each
+    row group is its own frame, so read zstd files with
+    `zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)`
+    (or `zstd -dc`); gzip.open reads all members of a gzip file. Parquet
+    needs the optional pyarrow package and writes one file per row group.
+    """
+    checkpoint_path = checkpoint_path or f'{base_path}.checkpoint.json'
+    # Compared with the checkpoint after a JSON round trip, where tuples become lists
+    columns = list(columns) if columns else None
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint['format'] != fmt or checkpoint['columns'] != columns:
+            raise ValueError(f"Checkpoint {checkpoint_path} belongs to a different export; remove it to start over")
+        logging.info(f"Resuming export from {checkpoint_path}")
+    else:
+        ranges = partition_ranges(partition_attribute, partitions) if partitions > 1 else [[]]
+        checkpoint = {
+            'format': fmt,
+            'columns': columns,
+            'compression': _ndjson_compression() if fmt == 'ndjson' else 'zstd',
+            # Stored so a resumed export reuses exactly the same partition boundaries
+            'ranges': ranges,
+            'streams': {str(stream): {'cursor': None, 'rows': 0, 'done': False} for stream in range(len(ranges))}
+        }
+        _save_checkpoint(checkpoint_path, checkpoint)
+
+    queries = [Query.select(['$id'] + [column for column in columns if column != '$id'])] if columns else []
+    streams = [
+        (stream, queries + range_queries, checkpoint['streams'][str(stream)]['cursor'])
+        for stream, range_queries in enumerate(checkpoint['ranges'])
+        if not checkpoint['streams'][str(stream)]['done']
+    ]
+    writers = {
+        # Checkpoints from before gzip support always used zstd
+        stream: _EXPORT_WRITERS[fmt](base_path, stream, checkpoint['streams'][str(stream)],
+                                     checkpoint.get('compression', 'zstd'), compression_level)
+        for stream, _, _ in streams
+    }
+    buffers = {stream: [] for stream in writers}
+
+    def flush(stream, done=False):
+        state = checkpoint['streams'][str(stream)]
+        rows = buffers[stream]
+        if rows:
+            state.update(writers[stream].write(rows))
+            state['cursor'] = rows[-1]['$id']
+            state['rows'] += len(rows)
+            buffers[stream] = []
+        state['done'] = done
+        _save_checkpoint(checkpoint_path, checkpoint)
+
+    try:
+        with live_metrics():
+            for stream, documents in _stream_ranges(streams):
+                if documents is None:
+                    flush(stream, done=True)
+                    continue
+                buffers[stream].extend(documents)
+                # Pages always end a row group, so the checkpointed cursor matches the written rows
+                if len(buffers[stream]) >= row_group_size:
+                    flush(stream)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    total_rows = sum(state['rows'] for state in checkpoint['streams'].values())
+    logging.info(f"Exported {total_rows} documents to {base_path} ({fmt})")
+    return total_rows
+
+def _scan_collection_offset():
     total_documents = 0
     page = 0
     max_workers = 150  # Adjust the number of workers based on your system and API rate limits
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with live_metrics(), concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
         while True:
             futures = [executor.submit(retrieve_documents, page + i) for i in range(max_workers)]
             completed_futures = concurrent.futures.as_completed(futures)
@@ -63,6 +497,19 @@ def scan_collection():
             page += max_workers
 
     logging.info(f"Total documents scanned: {total_documents}")
+    logging.info(f"Requests and retries: {governor.describe()}")
+    logging.info(f"Connections: {client.stats.describe()}")
+    return total_documents
 
 if __name__ == "__main__":
-    scan_collection()
\ No newline at end of file
+    scan_collection()
+
+    # Or count exactly without downloading documents, optionally filtered
+    # scan_collection(mode='count', partitions=16)
+    # count_documents([Query.equal('age', [42])])
+
+    # Or run several cursor streams in parallel over $createdAt ranges
+    # scan_collection(partitions=8, partition_attribute='$createdAt')
+
+    # Or export selected columns to compressed NDJSON (or fmt='parquet'); rerun to resume
+    # export_collection('exports/users', columns=['Name', 'email', 'age'], partitions=4)
\ No newline at end of file
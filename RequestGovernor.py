@@ -0,0 +1,210 @@
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import Counter
+
+from appwrite.exception import AppwriteException
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+COUNTERS = ('requests', 'retries', 'throttled', 'failures', 'waited')
+
+# Duration of the calling thread's (or asyncio task's) last successful attempt, in seconds
+_last_attempt = contextvars.ContextVar('last_attempt', default=0.0)
+
+
+class TokenBucket:
+    """Token bucket limiting one endpoint class to `rate` requests per second."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RequestGovernor:
+    """Shared rate limiting and retry policy for Appwrite calls.
+
+    Every call names an endpoint class ('write', 'bulk', 'read', 'list',
+    'storage', ...). Classes listed in `rates` get a token bucket of that many
+    requests per second; the rest are unlimited. Calls that fail with 429,
+    5xx or a connection error are retried with jittered exponential backoff,
+    waiting at least until `X-RateLimit-Reset` when the error carries
+    response headers. The SDK's own Client raises without them; the
+    clients here attach them as `error.headers` (TransportClient,
+    AsyncAppwriteClient and FileGetter's downloads), and errors without
+    headers get plain exponential backoff. Retries are counted per class, apart from requests,
+    and so is the time spent waiting. Callers take latency from
+    `last_attempt_ms()`, which times only the attempt that succeeded.
+    """
+
+    def __init__(self, rates=None, max_retries=5, base_delay=0.25, max_delay=30.0):
+        self.buckets = {name: TokenBucket(rate) for name, rate in (rates or {}).items() if rate}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.requests = Counter()
+        self.retries = Counter()
+        self.throttled = Counter()
+        self.failures = Counter()
+        self.waited = Counter()  # Seconds spent in rate-limit waits and retry backoff
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_retryable(error):
+        if isinstance(error, AppwriteException):
+            # The SDK wraps transport failures in an AppwriteException without a status code
+            return not error.code or error.code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError))
+
+    @staticmethod
+    def _reset_delay(error):
+        headers = {key.lower(): value for key, value in (getattr(error, 'headers', None) or {}).items()}
+        try:
+            if 'x-ratelimit-reset' in headers:
+                return max(float(headers['x-ratelimit-reset']) - time.time(), 0.0)
+            if 'retry-after' in headers:
+                return max(float(headers['retry-after']), 0.0)
+        except ValueError:
+            pass
+        return None
+
+    def retry_delay(self, error, attempt):
+        """Full-jitter exponential backoff, never shorter than the reset time in `error.headers`, if any."""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        reset = self._reset_delay(error)
+        if reset is not None:
+            return min(reset, self.max_delay) + random.uniform(0, self.base_delay)
+        return backoff
+
+    def _count(self, counter, endpoint_class):
+        with self._lock:
+            counter[endpoint_class] += 1
+
+    def _should_retry(self, endpoint_class, error, attempt):
+        if attempt >= self.max_retries or not self.is_retryable(error):
+            self._count(self.failures, endpoint_class)
+            return False
+        self._count(self.retries, endpoint_class)
+        if getattr(error, 'code', None) == 429:
+            self._count(self.throttled, endpoint_class)
+        logging.warning(f"Retrying {endpoint_class} request (attempt {attempt + 1}): {error}")
+        return True
+
+    def _reserve(self, endpoint_class):
+        self._count(self.requests, endpoint_class)
+        bucket = self.buckets.get(endpoint_class)
+        wait = bucket.reserve() if bucket else 0.0
+        if wait:
+            self._wait(endpoint_class, wait)
+        return wait
+
+    def _wait(self, endpoint_class, seconds):
+        with self._lock:
+            self.waited[endpoint_class] += seconds
+
+    @staticmethod
+    def last_attempt_ms():
+        """Latency of the caller's last successful call, without rate-limit waits, backoff and failed attempts."""
+        return _last_attempt.get() * 1000
+
+    @staticmethod
+    def _is_own_conflict(error, attempt):
+        # A 409 on a retry most likely means an earlier attempt went through and only its response was lost
+        return attempt > 0 and getattr(error, 'code', None) == 409
+
+    def call(self, endpoint_class, fn, *args, on_conflict=None, **kwargs):
+        """Call `fn(*args, **kwargs)` under this class's rate limit and retry policy.
+
+        Calls that create a resource under a fixed ID are not idempotent; pass
+        `on_conflict` to have a 409 on a retry return `on_conflict()` (e.g. the
+        existing document) instead of failing.
+        """
+        attempt = 0
+        while True:
+            wait = self._reserve(endpoint_class)
+            if wait:
+                time.sleep(wait)
+            try:
+                start_time = time.perf_counter()
+                result = fn(*args, **kwargs)
+                _last_attempt.set(time.perf_counter() - start_time)
+                return result
+            except Exception as e:
+                if on_conflict and self._is_own_conflict(e, attempt):
+                    elapsed = time.perf_counter() - start_time
+                    result = on_conflict()
+                    _last_attempt.set(elapsed)
+                    return result
+                if not self._should_retry(endpoint_class, e, attempt):
+                    raise
+                delay = self.retry_delay(e, attempt)
+                self._wait(endpoint_class, delay)
+                time.sleep(delay)
+                attempt += 1
+
+    async def call_async(self, endpoint_class, coroutine_factory, on_conflict=None):
+        """Async variant of `call`; `coroutine_factory()` must return a fresh coroutine per attempt, as must `on_conflict()`."""
+        attempt = 0
+        while True:
+            wait = self._reserve(endpoint_class)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                start_time = time.perf_counter()
+                result = await coroutine_factory()
+                _last_attempt.set(time.perf_counter() - start_time)
+                return result
+            except Exception as e:
+                if on_conflict and self._is_own_conflict(e, attempt):
+                    elapsed = time.perf_counter() - start_time
+                    result = await on_conflict()
+                    _last_attempt.set(elapsed)
+                    return result
+                if not self._should_retry(endpoint_class, e, attempt):
+                    raise
+                delay = self.retry_delay(e, attempt)
+                self._wait(endpoint_class, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def snapshot(self):
+        """Plain-dict copy of the counters, e.g. to send to another process."""
+        with self._lock:
+            return {name: dict(getattr(self, name)) for name in COUNTERS}
+
+    def reset(self):
+        """Zero the counters; rate limits keep their state."""
+        with self._lock:
+            for name in COUNTERS:
+                getattr(self, name).clear()
+
+    def absorb(self, snapshot):
+        """Add counters from another governor's snapshot into this one."""
+        with self._lock:
+            for name in COUNTERS:
+                getattr(self, name).update(snapshot.get(name, {}))
+
+    def describe(self):
+        """Per-class request, retry and failure counts and time spent waiting, for log output."""
+        with self._lock:
+            classes = sorted(self.requests)
+            return '; '.join(
+                f"{name}: {self.requests[name]} attempts, {self.retries[name]} retries "
+                f"({self.throttled[name]} throttled), {self.failures[name]} failed"
+                + (f", {self.waited[name]:.1f} s waiting on rate limits and backoff" if self.waited[name] else '')
+                for name in classes
+            )
@@ -0,0 +1,392 @@
+import argparse
+import contextlib
+import gzip
+import itertools
+import json
+import math
+import os
+import platform
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+
+from LatencyHistogram import LatencyHistogram
+
+RESULT_VERSION = 1
+DEFAULT_ALPHA = 0.01  # Significance level of the regression tests
+DEFAULT_THRESHOLD = 0.05  # Smallest relative slowdown reported as a regression
+
+
+class ThroughputSeries:
+    """Per-interval completed requests, items and errors of each recorder.
+
+    Like the live metrics monitor, a background thread snapshots the
+    recorders once per `interval` while `sampling()` is active, so the
+    request hot path is untouched. Consecutive `sampling()` blocks extend
+    the same series.
+    """
+
+    def __init__(self, recorders, interval=1.0):
+        self.recorders = recorders
+        self.interval = interval
+        self.times = []
+        self.phases = {name: {'completed': [], 'items': [], 'errors': []} for name in recorders}
+        self._previous = None
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def reset(self):
+        """Drop the samples taken so far."""
+        with self._lock:
+            self.times = []
+            self.phases = {name: {'completed': [], 'items': [], 'errors': []} for name in self.recorders}
+
+    def _totals(self):
+        totals = {}
+        for name, recorder in self.recorders.items():
+            histogram = recorder.snapshot()
+            totals[name] = (histogram.total, histogram.items, histogram.errors)
+        return totals
+
+    def sample(self):
+        totals = self._totals()
+        with self._lock:
+            self.times.append(time.time())
+            for name, (completed, items, errors) in totals.items():
+                previous = self._previous[name]
+                series = self.phases[name]
+                series['completed'].append(completed - previous[0])
+                series['items'].append(items - previous[1])
+                series['errors'].append(errors - previous[2])
+            self._previous = totals
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    @contextlib.contextmanager
+    def sampling(self):
+        """Sample the recorders in the background for the duration of the block; nested blocks share one thread."""
+        with self._lock:
+            self._depth += 1
+            start = self._depth == 1
+        if start:
+            self._previous = self._totals()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._depth -= 1
+                stop = self._depth == 0
+            if stop:
+                self._stop.set()
+                self._thread.join()
+                # The last, partial interval
+                self.sample()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'interval': self.interval,
+                'times': list(self.times),
+                'phases': {
+                    name: {key: list(values) for key, values in series.items()}
+                    for name, series in self.phases.items() if any(series['completed']) or any(series['errors'])
+                },
+            }
+
+
+def merge_throughput(series_list):
+    """Sum throughput series from several processes, aligned on wall-clock intervals."""
+    series_list = [series for series in series_list if series and series.get('times')]
+    if not series_list:
+        return {'interval': 1.0, 'times': [], 'phases': {}}
+    interval = series_list[0]['interval']
+    slots = sorted({round(t / interval) for series in series_list for t in series['times']})
+    position = {slot: offset for offset, slot in enumerate(slots)}
+    phases = {}
+    for series in series_list:
+        offsets = [position[round(t / interval)] for t in series['times']]
+        for name, values in series['phases'].items():
+            merged = phases.setdefault(name, {key: [0] * len(slots) for key in values})
+            for key, column in values.items():
+                for offset, value in zip(offsets, column):
+                    merged[key][offset] += value
+    return {'interval': interval, 'times': [slot * interval for slot in slots], 'phases': phases}
+
+
+def environment():
+    """Where the benchmark ran: host, Python and library versions."""
+    packages = {}
+    for package in ('appwrite', 'requests', 'urllib3', 'aiohttp', 'numpy'):
+        try:
+            packages[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            packages[package] = None
+    return {
+        'hostname': socket.gethostname(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'packages': packages,
+    }
+
+
+def build_result(config, results, label=None):
+    """Assemble a result document from the run `config` and collected `results` (as from DBSeeder.collect_results)."""
+    histograms = results['histograms']
+    return {
+        'version': RESULT_VERSION,
+        'label': label,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'config': config,
+        'environment': environment(),
+        'histograms': histograms,
+        'throughput': results.get('throughput', {}),
+        'errors': {name: data.get('errors', 0) for name, data in histograms.items()},
+        'governor': results.get('governor', {}),
+        'transport': results.get('transport', {}),
+        'client': results.get('client', {}),
+    }
+
+
+def save_result(directory, result):
+    """Write a result as gzip-compressed JSON into `directory`; returns the file's path."""
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    base = f"{result.get('label') or result['config'].get('run', 'run')}-{stamp}-{os.getpid()}"
+    # Runs finishing within the same second get a sequence suffix rather than overwriting each other
+    for sequence in itertools.count():
+        path = os.path.join(directory, f"{base}{f'-{sequence}' if sequence else ''}.json.gz")
+        try:
+            with gzip.open(path, 'xt', encoding='utf-8') as f:
+                json.dump(result, f, separators=(',', ':'))
+            return path
+        except FileExistsError:
+            continue
+
+
+def load_result(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        result = json.load(f)
+    if result.get('version') != RESULT_VERSION:
+        raise ValueError(f"{path} has result format version {result.get('version')}; expected {RESULT_VERSION}")
+    return result
+
+
+def _normal_sf(z):
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _incomplete_beta(a, b, x):
+    """Regularized incomplete beta function I_x(a, b), by Lentz's continued fraction."""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - _incomplete_beta(b, a, 1.0 - x)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x)) / a
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    fraction = d
+    for m in range(1, 300):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            fraction *= c * d
+        if abs(c * d - 1.0) < 1e-12:
+            break
+    return front * fraction
+
+
+def _student_t_cdf(t, df):
+    tail = 0.5 * _incomplete_beta(df / 2, 0.5, df / (df + t * t))
+    return 1.0 - tail if t > 0 else tail
+
+
+def mann_whitney(baseline, candidate):
+    """One-sided Mann-Whitney U test that `candidate` latencies are larger, on two histograms.
+
+    Samples in the same bucket count as ties. Returns (p_value,
+    probability), where `probability` estimates P(candidate > baseline).
+    Uses the normal approximation with tie correction, which is accurate
+    at the sample sizes of a benchmark run.
+    """
+    if baseline.precision_bits != candidate.precision_bits or len(baseline.counts) != len(candidate.counts):
+        raise ValueError("Cannot compare histograms with different bucket layouts")
+    n_a, n_b = baseline.total, candidate.total
+    if not n_a or not n_b:
+        return 1.0, 0.5
+    u = 0.0
+    below = 0
+    ties = 0.0
+    for count_a, count_b in zip(baseline.counts, candidate.counts):
+        if count_b:
+            u += count_b * (below + 0.5 * count_a)
+        if count_a or count_b:
+            tied = count_a + count_b
+            ties += tied ** 3 - tied
+        below += count_a
+    n = n_a + n_b
+    variance = n_a * n_b / 12 * ((n + 1) - ties / (n * (n - 1)))
+    probability = u / (n_a * n_b)
+    if variance <= 0:
+        return (0.0 if probability > 0.5 else 1.0), probability
+    return _normal_sf((u - n_a * n_b / 2) / math.sqrt(variance)), probability
+
+
+def welch_t(baseline, candidate):
+    """One-sided Welch's t-test that `candidate` has a lower mean; returns the p-value (None when undecidable)."""
+    n_a, n_b = len(baseline), len(candidate)
+    if n_a < 2 or n_b < 2:
+        return None
+    mean_a, mean_b = sum(baseline) / n_a, sum(candidate) / n_b
+    var_a = sum((x - mean_a) ** 2 for x in baseline) / (n_a - 1)
+    var_b = sum((x - mean_b) ** 2 for x in candidate) / (n_b - 1)
+    standard_error = var_a / n_a + var_b / n_b
+    if standard_error == 0:
+        return 0.0 if mean_b < mean_a else 1.0
+    t = (mean_b - mean_a) / math.sqrt(standard_error)
+    df = standard_error ** 2 / ((var_a / n_a) ** 2 / (n_a - 1) + (var_b / n_b) ** 2 / (n_b - 1))
+    return _student_t_cdf(t, df)
+
+
+def throughput_samples(result, phase, per_item=False):
+    """Per-second throughput of `phase` while it was running.
+
+    Idle intervals before and after the phase are dropped, and so are the
+    first and last active intervals, which are only partly covered.
+    """
+    series = result.get('throughput', {})
+    values = series.get('phases', {}).get(phase)
+    if not values:
+        return []
+    column = values['items' if per_item else 'completed']
+    active = [offset for offset, value in enumerate(column) if value]
+    if len(active) < 3:
+        return []
+    interval = series['interval']
+    times = series['times']
+    # Sampling ticks can drift; rate each sample over its actual interval
+    return [
+        column[offset] / ((times[offset] - times[offset - 1]) or interval)
+        for offset in range(active[0] + 1, active[-1])
+    ]
+
+
+def compare_results(baseline, candidate, alpha=DEFAULT_ALPHA, threshold=DEFAULT_THRESHOLD):
+    """Compare the phases two result documents share.
+
+    A phase's latency regresses when the Mann-Whitney test finds the
+    candidate slower at level `alpha` and its median grew by more than
+    `threshold`; throughput regresses when Welch's t-test on the
+    per-second throughput finds it lower at level `alpha` and its mean
+    dropped by more than `threshold`. Returns one row per phase and metric.
+    """
+    rows = []
+    for phase, data in baseline['histograms'].items():
+        if phase not in candidate['histograms']:
+            continue
+        before = LatencyHistogram.from_dict(data)
+        after = LatencyHistogram.from_dict(candidate['histograms'][phase])
+        if not before.total or not after.total:
+            continue
+        p_value, probability = mann_whitney(before, after)
+        p50_before, p50_after = before.percentile(50), after.percentile(50)
+        change = p50_after / p50_before - 1 if p50_before else 0.0
+        rows.append({
+            'phase': phase,
+            'metric': 'latency p50',
+            'baseline': p50_before,
+            'candidate': p50_after,
+            'change': change,
+            'p_value': p_value,
+            'detail': f"p99 {before.percentile(99):.2f} -> {after.percentile(99):.2f} ms, "
+                      f"P(slower) {probability:.2f}",
+            'regression': p_value < alpha and change > threshold,
+        })
+
+        per_item = before.items != before.total
+        rates_before = throughput_samples(baseline, phase, per_item)
+        rates_after = throughput_samples(candidate, phase, per_item)
+        p_value = welch_t(rates_before, rates_after)
+        if p_value is None:
+            continue
+        mean_before = sum(rates_before) / len(rates_before)
+        mean_after = sum(rates_after) / len(rates_after)
+        change = mean_after / mean_before - 1 if mean_before else 0.0
+        rows.append({
+            'phase': phase,
+            'metric': 'items/s' if per_item else 'requests/s',
+            'baseline': mean_before,
+            'candidate': mean_after,
+            'change': change,
+            'p_value': p_value,
+            'detail': f"{len(rates_before)} vs {len(rates_after)} one-second samples",
+            'regression': p_value < alpha and change < -threshold,
+        })
+    return rows
+
+
+def _describe(path, result):
+    config = result.get('config', {})
+    return f"{path} ({config.get('run', 'run')}, {result.get('created_at', '?')}, {result['environment'].get('hostname')})"
+
+
+def compare(paths, alpha=DEFAULT_ALPHA, threshold=DEFAULT_THRESHOLD):
+    """Compare every run against the first one and print a table; returns the number of regressions."""
+    baseline = load_result(paths[0])
+    print(f"Baseline: {_describe(paths[0], baseline)}")
+    regressions = 0
+    for path in paths[1:]:
+        candidate = load_result(path)
+        print(f"\nCandidate: {_describe(path, candidate)}")
+        rows = compare_results(baseline, candidate, alpha, threshold)
+        width = max([12] + [len(row['phase']) for row in rows])
+        print(f"{'phase':<{width}} {'metric':<12} {'baseline':>12} {'candidate':>12} {'change':>8} {'p-value':>9}")
+        for row in rows:
+            flag = 'REGRESSION' if row['regression'] else ''
+            line = (f"{row['phase']:<{width}} {row['metric']:<12} {row['baseline']:>12.2f} {row['candidate']:>12.2f} "
+                    f"{row['change']:>+8.1%} {row['p_value']:>9.2g}  {row['detail']}  {flag}")
+            print(line.rstrip())
+            regressions += row['regression']
+        errors_before = sum(baseline.get('errors', {}).values())
+        errors_after = sum(candidate.get('errors', {}).values())
+        if errors_before or errors_after:
+            print(f"Failed requests: {errors_before} -> {errors_after}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Inspect and compare saved benchmark results')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    compare_command = subcommands.add_parser('compare', help='compare runs against the first (baseline) run')
+    compare_command.add_argument('results', nargs='+', help='result files; the first is the baseline')
+    compare_command.add_argument('--alpha', type=float, default=DEFAULT_ALPHA, help='significance level')
+    compare_command.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                 help='smallest relative slowdown that counts as a regression')
+
+    args = parser.parse_args()
+    if len(args.results) < 2:
+        parser.error('compare needs a baseline and at least one other result')
+    regressions = compare(args.results, args.alpha, args.threshold)
+    print(f"\n{regressions} regression(s) found")
+    sys.exit(1 if regressions else 0)
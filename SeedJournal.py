@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import time
+
+
+class SeedJournal:
+    """Append-only, fsync'd journal of the committed batches of a seed job.
+
+    The first line records the job's plan (a JSON-serialisable dict); every
+    further line marks one batch as committed, and is written and fsync'd
+    only after the server accepted that batch. Reopening a journal replays
+    it, refuses a different plan and drops a line torn by a crash, so a
+    restarted job knows exactly which batches are done. Batches that were
+    in flight when the job died have no line and are simply sent again;
+    with fixed document IDs and payloads an upsert makes that harmless.
+    """
+
+    def __init__(self, path, plan):
+        # Compare plans in their JSON form, so tuples and lists are the same
+        self.plan = json.loads(json.dumps(plan))
+        self.path = path
+        self.done = {}
+        self._lock = threading.Lock()
+        exists = os.path.exists(path) and os.path.getsize(path) > 0 and self._replay()
+        self._file = open(path, 'a')
+        if not exists:
+            self._append({'type': 'plan', 'plan': self.plan, 'time': time.time()})
+
+    def _replay(self):
+        """Load the committed batches and drop a torn last line; returns whether a plan was found."""
+        valid_size = 0
+        plan = None
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line) if line.endswith(b'\n') else None
+                except ValueError:
+                    entry = None
+                if entry is None:
+                    # A write torn by a crash can only be the last line
+                    break
+                valid_size += len(line)
+                if entry['type'] == 'plan':
+                    plan = entry['plan']
+                elif entry['type'] == 'batch':
+                    self.done[entry['batch']] = entry['documents']
+        if plan is None:
+            # The plan line itself was torn, so no batch can have been recorded: start over
+            self.done.clear()
+            valid_size = 0
+        elif plan != self.plan:
+            raise ValueError(f"Journal {self.path} belongs to a different seed plan; remove it to start over")
+        if valid_size < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+        return valid_size > 0
+
+    def _append(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def record(self, batch, documents):
+        """Durably mark `batch` (of `documents` documents) as committed."""
+        self._append({'type': 'batch', 'batch': batch, 'documents': documents, 'time': time.time()})
+        with self._lock:
+            self.done[batch] = documents
+
+    def pending(self, batches):
+        """Batches among range(`batches`) not yet committed, in order."""
+        with self._lock:
+            return [batch for batch in range(batches) if batch not in self.done]
+
+    @property
+    def committed(self):
+        """Documents in committed batches."""
+        with self._lock:
+            return sum(self.done.values())
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
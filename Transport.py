@@ -0,0 +1,226 @@
+import contextlib
+import json
+import threading
+import time
+from collections import Counter
+
+import requests
+from appwrite.client import Client
+from appwrite.encoders.value_class_encoder import ValueClassEncoder
+from appwrite.exception import AppwriteException
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class TransportStats:
+    """Connection reuse and connect/TLS/request time counters, shared by every session of a client."""
+
+    def __init__(self):
+        self.counts = Counter()  # requests, connections
+        self.seconds = Counter()  # connect, tls, request
+        self._lock = threading.Lock()
+
+    def record_connection(self, connect_seconds, tls_seconds):
+        with self._lock:
+            self.counts['connections'] += 1
+            self.seconds['connect'] += connect_seconds
+            self.seconds['tls'] += tls_seconds
+
+    def record_request(self, seconds):
+        with self._lock:
+            self.counts['requests'] += 1
+            self.seconds['request'] += seconds
+
+    def snapshot(self):
+        """Plain-dict copy of the counters, e.g. to send to another process."""
+        with self._lock:
+            return {'counts': dict(self.counts), 'seconds': dict(self.seconds)}
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+            self.seconds.clear()
+
+    def absorb(self, snapshot):
+        """Add counters from another snapshot into this one."""
+        with self._lock:
+            self.counts.update(snapshot.get('counts', {}))
+            self.seconds.update(snapshot.get('seconds', {}))
+
+    @property
+    def reuse_rate(self):
+        """Share of requests served on an already open connection."""
+        requests_made = self.counts['requests']
+        return max(1 - self.counts['connections'] / requests_made, 0.0) if requests_made else 0.0
+
+    def describe(self):
+        """Reuse rate and where client-side time went, for log output."""
+        with self._lock:
+            requests_made = self.counts['requests']
+            connections = self.counts['connections']
+            seconds = dict(self.seconds)
+        if not requests_made:
+            return 'no requests'
+        handshake = seconds.get('connect', 0) + seconds.get('tls', 0)
+        return (
+            f"{requests_made} requests over {connections} connections ({self.reuse_rate:.1%} reused); "
+            f"connect {seconds.get('connect', 0) / max(connections, 1) * 1000:.2f} ms, "
+            f"TLS {seconds.get('tls', 0) / max(connections, 1) * 1000:.2f} ms per connection; "
+            f"request {seconds.get('request', 0) / requests_made * 1000:.2f} ms on average, "
+            f"{handshake / seconds['request'] if seconds.get('request') else 0:.1%} of it in handshakes"
+        )
+
+
+class _TimedConnectionMixin:
+    """Times TCP connect (`_new_conn`) and the whole connect; the difference is the TLS handshake."""
+
+    stats = None
+
+    def _new_conn(self):
+        start_time = time.perf_counter()
+        sock = super()._new_conn()
+        self._tcp_seconds = time.perf_counter() - start_time
+        return sock
+
+    def connect(self):
+        start_time = time.perf_counter()
+        super().connect()
+        total = time.perf_counter() - start_time
+        tcp = getattr(self, '_tcp_seconds', total) if isinstance(self, HTTPSConnection) else total
+        self.stats.record_connection(tcp, total - tcp)
+
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools open connections that report to `stats`."""
+
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        http = type('TimedHTTPConnection', (_TimedConnectionMixin, HTTPConnection), {'stats': self.stats})
+        https = type('TimedHTTPSConnection', (_TimedConnectionMixin, HTTPSConnection), {'stats': self.stats})
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('TimedHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http}),
+            'https': type('TimedHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': https}),
+        }
+
+
+class TransportClient(Client):
+    """Appwrite Client with a pooled, keep-alive transport.
+
+    The SDK's Client sends every call through `requests.request`, which
+    builds a throwaway session and so opens (and TLS-handshakes) a new
+    connection per request. This subclass keeps connections open in a pool
+    of `pool_size` per host, either one pool shared by every thread
+    (`scope='shared'`, size it to the worker count) or a small pool per
+    thread (`scope='thread'`). `keepalive=False` closes every connection
+    after its response, for comparison. Connection reuse and the time spent
+    connecting, in TLS handshakes and in whole requests are kept in `stats`.
+    Requests carries no HTTP/2 support, so calls use HTTP/1.1. With
+    `stages` (a Profiler.StageTimers) each call is split into serialize,
+    network and decode stages. `timeout` is requests' (connect, read)
+    seconds; a finite read timeout keeps a half-open keep-alive connection
+    from blocking a worker forever and lets the governor retry instead.
+    """
+
+    def __init__(self, pool_size=64, scope='shared', keepalive=True, pool_block=False, timeout=(10, 120), stages=None):
+        super().__init__()
+        if scope not in ('shared', 'thread'):
+            raise ValueError(f"Unknown session scope '{scope}'; expected 'shared' or 'thread'")
+        self.pool_size = pool_size
+        self.scope = scope
+        self.keepalive = keepalive
+        self.pool_block = pool_block
+        self.timeout = timeout
+        self.stages = stages
+        self.stats = TransportStats()
+        self._shared_session = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _new_session(self, pool_size):
+        session = requests.Session()
+        adapter = _TimedAdapter(self.stats, pool_connections=4, pool_maxsize=pool_size, pool_block=self.pool_block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not self.keepalive:
+            session.headers['connection'] = 'close'
+        return session
+
+    def session(self):
+        """The requests session the calling thread should use."""
+        if self.scope == 'thread':
+            if not hasattr(self._local, 'session'):
+                # A thread makes one request at a time, so it only ever needs one connection per host
+                self._local.session = self._new_session(1)
+            return self._local.session
+        if self._shared_session is None:
+            with self._lock:
+                if self._shared_session is None:
+                    self._shared_session = self._new_session(self.pool_size)
+        return self._shared_session
+
+    def _stage(self, name):
+        return self.stages.stage(name) if self.stages else contextlib.nullcontext()
+
+    def call(self, method, path='', headers=None, params=None, response_type='json'):
+        """Same request and error handling as Client.call, sent over the pooled session."""
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+        headers = {**self._global_headers, **(headers or {})}
+        if headers['content-type'].startswith('multipart/form-data'):
+            # Uploads keep the SDK's chunked multipart handling
+            return super().call(method, path, headers, params, response_type)
+
+        data = None
+        with self._stage('serialize'):
+            if method != 'get':
+                data = json.dumps(params, cls=ValueClassEncoder) if headers['content-type'].startswith('application/json') else params
+                params = {}
+            params = self.flatten(params)
+
+        start_time = time.perf_counter()
+        try:
+            with self._stage('network'):
+                response = self.session().request(
+                    method=method,
+                    url=self._endpoint + path,
+                    params=params,
+                    data=data,
+                    headers=headers,
+                    verify=not self._self_signed,
+                    allow_redirects=response_type != 'location',
+                    timeout=self.timeout
+                )
+        except requests.RequestException as e:
+            raise AppwriteException(e)
+        finally:
+            self.stats.record_request(time.perf_counter() - start_time)
+
+        content_type = response.headers.get('Content-Type', '')
+        if response.status_code >= 400:
+            try:
+                payload = response.json() if content_type.startswith('application/json') else None
+            except ValueError:
+                # A proxy's error page can claim to be JSON
+                payload = None
+            if isinstance(payload, dict):
+                error = AppwriteException(payload.get('message'), response.status_code, payload.get('type'), response.text)
+            else:
+                error = AppwriteException(response.text, response.status_code, None, response.text)
+            # Lets the request governor honour X-RateLimit-Reset on throttled responses
+            error.headers = dict(response.headers)
+            raise error
+
+        warnings = response.headers.get('x-appwrite-warning')
+        if warnings:
+            for warning in warnings.split(';'):
+                print(f'Warning: {warning}')
+        if response_type == 'location':
+            return response.headers.get('Location')
+        if content_type.startswith('application/json'):
+            with self._stage('decode'):
+                return response.json()
+        return response.content
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import math
+import threading
+
+import numpy as np
+
+
+class UniformKeys:
+    """Every live document is equally likely."""
+
+    def index(self, rng, size):
+        return rng.randrange(size)
+
+
+class ZipfianKeys:
+    """Bounded Zipf-like skew: rank r is picked with probability ~ 1 / (r + 1) ** exponent.
+
+    Uses the inverse CDF of the continuous power law, so a draw costs O(1)
+    however large the working set grows. Rank 0 is the oldest live slot.
+    """
+
+    def __init__(self, exponent=0.99):
+        self.exponent = exponent
+
+    def index(self, rng, size):
+        u = rng.random()
+        if abs(self.exponent - 1.0) < 1e-9:
+            rank = (size + 1) ** u
+        else:
+            one_minus = 1.0 - self.exponent
+            rank = (((size + 1) ** one_minus - 1.0) * u + 1.0) ** (1.0 / one_minus)
+        return min(int(rank) - 1, size - 1)
+
+
+class HotSetKeys:
+    """`hot_probability` of the accesses go to the first `hot_fraction` of the live slots."""
+
+    def __init__(self, hot_fraction=0.2, hot_probability=0.8):
+        self.hot_fraction = hot_fraction
+        self.hot_probability = hot_probability
+
+    def index(self, rng, size):
+        hot_size = max(1, math.ceil(size * self.hot_fraction))
+        if hot_size >= size or rng.random() < self.hot_probability:
+            return rng.randrange(hot_size)
+        return rng.randrange(hot_size, size)
+
+
+KEY_DISTRIBUTIONS = {'uniform': UniformKeys, 'zipfian': ZipfianKeys, 'hotset': HotSetKeys}
+
+
+def key_distribution(spec='uniform'):
+    """Build a key distribution from a name or a {'kind': name, **options} dict."""
+    if isinstance(spec, str):
+        spec = {'kind': spec}
+    options = dict(spec)
+    kind = options.pop('kind')
+    if kind not in KEY_DISTRIBUTIONS:
+        raise ValueError(f"Unknown key distribution '{kind}'; expected one of {', '.join(KEY_DISTRIBUTIONS)}")
+    return KEY_DISTRIBUTIONS[kind](**options)
+
+
+class WorkingSet:
+    """Compact index of live document IDs and the expected hash of their fields.
+
+    IDs live in a fixed-width bytes array and hashes in a parallel uint64
+    array, both grown by doubling; deletes swap the last slot into the hole,
+    so the live documents always occupy slots [0, len). That keeps memory
+    at roughly `id_width + 8` bytes per document and lets the key
+    distributions pick a slot in O(1). A hash of 0 means the expected
+    content is unknown (after a partial update) and is not checked.
+    """
+
+    def __init__(self, fields, capacity=1024, id_width=36):
+        self.fields = list(fields)
+        self.ids = np.zeros(capacity, dtype=f'S{id_width}')
+        self.hashes = np.zeros(capacity, dtype=np.uint64)
+        self.size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    def field_hash(self, document):
+        """64-bit hash of the tracked fields of a payload or fetched document."""
+        encoded = json.dumps([document.get(field) for field in self.fields], separators=(',', ':'), default=str)
+        value = int.from_bytes(hashlib.blake2b(encoded.encode(), digest_size=8).digest(), 'little')
+        return value or 1
+
+    def _grow(self):
+        capacity = len(self.ids) * 2
+        self.ids = np.resize(self.ids, capacity)
+        self.hashes = np.resize(self.hashes, capacity)
+
+    def add_many(self, documents):
+        """Track newly written documents, given as {'$id': ..., **fields} dicts."""
+        entries = [(document['$id'].encode(), self.field_hash(document)) for document in documents]
+        with self._lock:
+            for doc_id, value in entries:
+                if self.size == len(self.ids):
+                    self._grow()
+                self.ids[self.size] = doc_id
+                self.hashes[self.size] = value
+                self.size += 1
+
+    def add(self, doc_id, payload):
+        self.add_many([{'$id': doc_id, **payload}])
+
+    def draw(self, distribution, rng):
+        """Pick a live document; returns (slot, doc_id, expected_hash) or None when empty."""
+        with self._lock:
+            if not self.size:
+                return None
+            slot = distribution.index(rng, self.size)
+            return slot, self.ids[slot].decode(), int(self.hashes[slot])
+
+    def take(self, distribution, rng):
+        """Pick a live document and stop tracking it (for deletes); returns (doc_id, expected_hash) or None."""
+        with self._lock:
+            if not self.size:
+                return None
+            slot = distribution.index(rng, self.size)
+            doc_id, value = self.ids[slot].decode(), int(self.hashes[slot])
+            self.size -= 1
+            self.ids[slot] = self.ids[self.size]
+            self.hashes[slot] = self.hashes[self.size]
+            return doc_id, value
+
+    def updated(self, slot, doc_id, data):
+        """Record an update of `doc_id` (drawn at `slot`) that wrote `data`."""
+        value = self.field_hash(data) if all(field in data for field in self.fields) else 0
+        with self._lock:
+            # Deletes may have moved the document since it was drawn
+            if slot < self.size and self.ids[slot] == doc_id.encode():
+                self.hashes[slot] = value
+
+    def matches(self, expected_hash, document):
+        """True/False if the document has the expected content, None when it is unknown."""
+        if not expected_hash:
+            return None
+        return self.field_hash(document) == expected_hash
+
+    def sample(self, count, rng):
+        """Up to `count` distinct live (doc_id, expected_hash) pairs."""
+        with self._lock:
+            slots = rng.sample(range(self.size), min(count, self.size))
+            return [(self.ids[slot].decode(), int(self.hashes[slot])) for slot in slots]
@@ -0,0 +1,221 @@
+import json
+import os
+
+from faker import Faker
+
+from PayloadPool import (
+    ArrayField, BooleanField, ChoiceField, ConstantField, DatetimeField, EmailField, FloatField,
+    IntegerField, IpField, NameField, PayloadPool, SequenceField, TextField
+)
+
+ATTRIBUTE_TYPES = ('string', 'email', 'integer', 'float', 'boolean', 'datetime', 'enum', 'url', 'ip', 'relationship')
+INDEX_TYPES = ('key', 'unique', 'fulltext')
+OPERATIONS = ('create', 'upsert', 'get', 'list', 'update', 'delete')
+HASH_EXCLUDED_TYPES = ('float', 'datetime')
+
+# The collection DBSeeder has always benchmarked; used when no spec file is given
+USERS_COLLECTION = {
+    'id': 'users_collection',
+    'name': 'Users Collection',
+    'attributes': [
+        {'key': 'Name', 'type': 'string', 'size': 255, 'required': True, 'generator': 'name'},
+        {'key': 'email', 'type': 'email', 'required': True},
+        {'key': 'age', 'type': 'integer', 'required': True, 'min': 0, 'max': 150,
+         'generator': {'kind': 'integer', 'min': 18, 'max': 100}},
+    ],
+    'verify_field': 'email',
+}
+
+
+def load_spec(path):
+    """Read a workload spec from a .json, .yaml or .yml file."""
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            import yaml  # Only needed for YAML specs
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _generator_spec(attribute):
+    """The attribute's generator spec as a dict, filling in a default from its type."""
+    generator = attribute.get('generator')
+    if isinstance(generator, str):
+        return {'kind': generator}
+    if generator is not None:
+        return dict(generator)
+    attribute_type = attribute['type']
+    if attribute_type == 'string':
+        return {'kind': 'text', 'max_length': min(attribute.get('size', 64), 64)}
+    if attribute_type == 'integer':
+        return {'kind': 'integer', 'min': attribute.get('min', 0), 'max': attribute.get('max', 1000)}
+    if attribute_type == 'float':
+        return {'kind': 'float', 'min': attribute.get('min', 0.0), 'max': attribute.get('max', 1000.0)}
+    if attribute_type == 'enum':
+        return {'kind': 'choice', 'values': attribute['elements']}
+    if attribute_type == 'url':
+        return {'kind': 'sequence', 'prefix': f"https://example.com/{attribute['key']}/"}
+    return {'kind': attribute_type}
+
+
+def build_field(spec, faker, seed=0):
+    """Build a PayloadPool field generator from a generator spec dict."""
+    kind = spec['kind']
+    if kind == 'name':
+        return NameField(faker, spec.get('vocabulary_size', 1000))
+    if kind == 'email':
+        return EmailField(faker, spec.get('vocabulary_size', 1000))
+    if kind == 'integer':
+        return IntegerField(spec.get('min', 0), spec.get('max', 1000))
+    if kind == 'float':
+        return FloatField(spec.get('min', 0.0), spec.get('max', 1000.0), spec.get('decimals', 2))
+    if kind == 'boolean':
+        return BooleanField(spec.get('probability', 0.5))
+    if kind == 'choice':
+        return ChoiceField(spec['values'], spec.get('weights'))
+    if kind == 'text':
+        max_length = spec.get('max_length', 64)
+        return TextField(spec.get('min_length', min(8, max_length)), max_length, seed)
+    if kind == 'datetime':
+        return DatetimeField(spec.get('start', '2020-01-01T00:00:00'), spec.get('end', '2025-01-01T00:00:00'))
+    if kind == 'sequence':
+        return SequenceField(spec.get('prefix', ''), spec.get('width', 0))
+    if kind == 'ip':
+        return IpField()
+    if kind == 'constant':
+        return ConstantField(spec.get('value'))
+    raise ValueError(f"Unknown generator kind '{kind}'")
+
+
+class CollectionSpec:
+    """One collection of a workload: attributes, indexes and how to verify its documents."""
+
+    def __init__(self, spec):
+        self.id = spec['id']
+        self.name = spec.get('name', self.id)
+        self.permissions = spec.get('permissions', ["read(\"any\")", "write(\"any\")"])
+        self.document_security = spec.get('document_security', False)
+        self.attributes = spec.get('attributes', [])
+        self.indexes = spec.get('indexes', [])
+        for attribute in self.attributes:
+            if attribute.get('type') not in ATTRIBUTE_TYPES:
+                raise ValueError(f"Attribute '{attribute.get('key')}' of '{self.id}' has unknown type '{attribute.get('type')}'")
+        for index in self.indexes:
+            if index.get('type', 'key') not in INDEX_TYPES:
+                raise ValueError(f"Index '{index.get('key')}' of '{self.id}' has unknown type '{index.get('type')}'")
+        # Float and datetime values may come back formatted differently, so they are neither
+        # the default verify field nor hashed by default
+        comparable = [
+            attribute['key'] for attribute in self.generated_attributes()
+            if attribute['type'] not in HASH_EXCLUDED_TYPES and not attribute.get('array')
+        ]
+        self.verify_field = spec.get('verify_field') or (comparable[0] if comparable else None)
+        self.hash_fields = spec.get('hash_fields') or [
+            attribute['key'] for attribute in self.generated_attributes() if attribute['type'] not in HASH_EXCLUDED_TYPES
+        ]
+
+    def generated_attributes(self):
+        """Attributes that get a value in generated payloads."""
+        return [
+            attribute for attribute in self.attributes
+            if attribute['type'] != 'relationship' and attribute.get('generator', True) is not None
+        ]
+
+    def fields(self, seed=0):
+        """Field generators for this collection's payloads, seeded with `seed`."""
+        faker = Faker()
+        faker.seed_instance(seed)
+        fields = {}
+        for position, attribute in enumerate(self.generated_attributes()):
+            spec = _generator_spec(attribute)
+            field = build_field(spec, faker, seed + position)
+            if attribute.get('array'):
+                field = ArrayField(field, spec.get('min_items', 1), spec.get('max_items', 5))
+            fields[attribute['key']] = field
+        return fields
+
+
+class Workload:
+    """A declarative benchmark workload.
+
+    The spec (a dict, usually loaded from YAML or JSON) declares the
+    database, its collections with attribute types, sizes, indexes and
+    per-field value generators, and the operation mix::
+
+        database: {id: perf_db, name: Performance DB}
+        target: orders            # collection the benchmark phases run against
+        collections:
+          - id: orders
+            attributes:
+              - {key: sku, type: string, size: 32, generator: {kind: sequence, prefix: SKU-}}
+              - {key: notes, type: string, size: 4000, generator: {kind: text, min_length: 500, max_length: 4000}}
+              - {key: price, type: float, min: 0, max: 500}
+              - {key: status, type: enum, elements: [new, paid, shipped]}
+            indexes:
+              - {key: sku_unique, type: unique, attributes: [sku]}
+        operations: {create: 40, upsert: {weight: 10, batch_size: 100}, get: 30, list: {weight: 10, limit: 25}, update: 8, delete: 2}
+        key_distribution: {kind: zipfian, exponent: 0.99}   # or uniform, or {kind: hotset, hot_fraction: 0.2}
+        queries:                  # query shapes for QueryBench; see QueryBench.QueryShape
+          - {kind: range, attribute: price, selectivity: 0.05}
+          - {kind: search, attribute: notes}
+
+    Attributes without a generator get one matching their type; set
+    `generator: null` to leave an attribute out of payloads. Operation
+    weights are normalised, and any extra keys are passed on as options.
+    `key_distribution` decides which live documents get, update and delete
+    pick; `hash_fields` on a collection chooses the fields whose hash is
+    checked on reads. `queries` lists the list_documents shapes the query
+    benchmark runs against the target collection; without it the benchmark
+    derives shapes from the attribute types.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        database = spec.get('database', {})
+        self.database_id = database.get('id', 'performance_test_db')
+        self.database_name = database.get('name', 'Performance Test Database')
+        self.collections = [CollectionSpec(collection) for collection in spec['collections']]
+        if not self.collections:
+            raise ValueError("A workload needs at least one collection")
+        self.target = self.collection(spec.get('target', self.collections[0].id))
+        if self.target.verify_field is None:
+            raise ValueError(f"Target collection '{self.target.id}' has no generated attribute that reads back as "
+                             f"written (not a float, datetime or array); set verify_field")
+        self.key_distribution = spec.get('key_distribution', 'uniform')
+        self.queries = spec.get('queries')
+
+        operations = spec.get('operations') or {'create': 1}
+        self.operations = {}
+        for name, options in operations.items():
+            if name not in OPERATIONS:
+                raise ValueError(f"Unknown operation '{name}'; expected one of {', '.join(OPERATIONS)}")
+            options = dict(options) if isinstance(options, dict) else {'weight': options}
+            if options.get('weight', 1) > 0:
+                self.operations[name] = options
+        total_weight = sum(options.get('weight', 1) for options in self.operations.values())
+        for options in self.operations.values():
+            options['weight'] = options.get('weight', 1) / total_weight
+
+    @classmethod
+    def load(cls, path):
+        return cls(load_spec(path))
+
+    @classmethod
+    def users(cls, database_id, database_name, collection_id, collection_name):
+        """The built-in users workload (Name, email, age), creates only."""
+        collection = dict(USERS_COLLECTION, id=collection_id, name=collection_name)
+        return cls({'database': {'id': database_id, 'name': database_name}, 'collections': [collection]})
+
+    def collection(self, collection_id):
+        for collection in self.collections:
+            if collection.id == collection_id:
+                return collection
+        raise ValueError(f"Workload has no collection '{collection_id}'")
+
+    def payload_pool(self, seed=0, **options):
+        """A PayloadPool generating documents for the target collection."""
+        return PayloadPool(seed=seed, fields=self.target.fields(seed), **options)
+
+    def operation_mix(self):
+        """(names, probabilities) of the operation mix, for weighted draws."""
+        names = list(self.operations)
+        return names, [self.operations[name]['weight'] for name in names]
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from SeedJournal import SeedJournal
+
+PLAN = {'collection': 'users', 'documents': 1000, 'batch_size': 100, 'fields': ('name', 'age')}
+
+
+def test_reopening_replays_committed_batches(tmp_path):
+    path = str(tmp_path / 'seed.journal')
+    with SeedJournal(path, PLAN) as journal:
+        journal.record(0, 100)
+        journal.record(3, 100)
+        assert journal.pending(5) == [1, 2, 4]
+
+    with SeedJournal(path, PLAN) as journal:
+        assert journal.done == {0: 100, 3: 100}
+        assert journal.committed == 200
+        assert journal.pending(5) == [1, 2, 4]
+        journal.record(1, 100)
+
+    with SeedJournal(path, PLAN) as journal:
+        assert journal.pending(5) == [2, 4]
+    with open(path) as f:
+        assert sum(json.loads(line)['type'] == 'plan' for line in f) == 1
+
+
+def test_torn_last_line_is_dropped_and_truncated(tmp_path):
+    path = str(tmp_path / 'seed.journal')
+    with SeedJournal(path, PLAN) as journal:
+        journal.record(0, 100)
+    with open(path, 'rb') as f:
+        intact = f.read()
+    with open(path, 'ab') as f:
+        f.write(b'{"type":"batch","batch":1,"docu')
+
+    with SeedJournal(path, PLAN) as journal:
+        assert journal.done == {0: 100}
+        journal.record(2, 50)
+    with open(path, 'rb') as f:
+        content = f.read()
+    assert content.startswith(intact)
+    assert [json.loads(line)['type'] for line in content.splitlines()] == ['plan', 'batch', 'batch']
+
+
+def test_torn_plan_line_starts_over(tmp_path):
+    path = str(tmp_path / 'seed.journal')
+    with open(path, 'wb') as f:
+        f.write(b'{"type":"plan","plan":{"collec')
+
+    with SeedJournal(path, PLAN) as journal:
+        assert journal.done == {}
+        journal.record(0, 100)
+    with SeedJournal(path, PLAN) as journal:
+        assert journal.done == {0: 100}
+
+
+def test_different_plan_is_refused(tmp_path):
+    path = str(tmp_path / 'seed.journal')
+    with SeedJournal(path, PLAN) as journal:
+        journal.record(0, 100)
+    with pytest.raises(ValueError):
+        SeedJournal(path, dict(PLAN, batch_size=50))
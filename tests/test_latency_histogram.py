@@ -0,0 +1,152 @@
+import math
+import random
+
+import pytest
+
+from LatencyHistogram import LatencyHistogram, LatencyRecorder
+
+
+def exact_percentile(values, pct):
+    """Nearest-rank percentile, the definition LatencyHistogram.percentile approximates."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)), 1) - 1]
+
+
+def record_us(histogram, values):
+    for value in values:
+        histogram.record(value / 1000)
+
+
+def copy(histogram):
+    return LatencyHistogram.from_dict(histogram.to_dict())
+
+
+@pytest.mark.parametrize('precision_bits', [5, 7, 10])
+def test_percentiles_within_stated_precision(precision_bits):
+    rng = random.Random(precision_bits)
+    # Log-uniform over 1 us .. 1 h, so every bucket magnitude is exercised
+    values = [int(math.exp(rng.uniform(0, math.log(3_600_000_000)))) for _ in range(20000)]
+    histogram = LatencyHistogram(precision_bits=precision_bits)
+    record_us(histogram, values)
+    relative_error = 1 / 2 ** (precision_bits - 1)
+    for pct in (1, 10, 50, 90, 99, 99.9, 100):
+        exact = exact_percentile(values, pct)
+        reported = histogram.percentile(pct) * 1000
+        assert exact <= reported <= exact * (1 + relative_error) + 1, pct
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    values = list(range(histogram.sub_buckets))
+    record_us(histogram, values)
+    for pct in (25, 50, 75, 100):
+        assert histogram.percentile(pct) * 1000 == exact_percentile(values, pct)
+
+
+def test_summary_statistics():
+    histogram = LatencyHistogram()
+    histogram.record(2.0, items=10)
+    histogram.record(4.0)
+    assert (histogram.total, histogram.items) == (2, 11)
+    assert histogram.mean == 3.0
+    assert (histogram.min, histogram.max) == (2.0, 4.0)
+    assert LatencyHistogram().percentile(50) == 0.0
+
+
+def test_merge_equals_recording_everything_in_one():
+    rng = random.Random(1)
+    first_values = [rng.randrange(1, 10_000_000) for _ in range(5000)]
+    second_values = [rng.randrange(1, 100_000) for _ in range(3000)]
+    first, second, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    record_us(first, first_values)
+    record_us(second, second_values)
+    record_us(combined, first_values + second_values)
+
+    merged = first.merge(second)
+    assert merged.to_dict() == combined.to_dict()
+
+
+def test_merge_keeps_the_widest_phase_and_ignores_empty_histograms():
+    first, second = LatencyHistogram(), LatencyHistogram()
+    first.record(1.0)
+    first.start_time, first.end_time = 100.0, 110.0
+    second.start_time, second.end_time = 105.0, 120.0
+    second.errors = 2
+    first.merge(second)
+    assert (first.start_time, first.end_time, first.errors) == (100.0, 120.0, 2)
+    assert (first.total, first.min_us, first.max_us) == (1, 1000, 1000)
+
+
+def test_merge_rejects_other_layouts():
+    with pytest.raises(ValueError):
+        LatencyHistogram(precision_bits=7).merge(LatencyHistogram(precision_bits=8))
+    with pytest.raises(ValueError):
+        LatencyHistogram(max_value_us=1_000_000).merge(LatencyHistogram())
+
+
+def test_dict_round_trip():
+    histogram = LatencyHistogram()
+    record_us(histogram, [5, 500, 50_000, 5_000_000])
+    histogram.errors, histogram.started = 3, 7
+    histogram.start_time, histogram.end_time = 1.5, 2.5
+    assert copy(histogram).to_dict() == histogram.to_dict()
+
+
+def test_difference_is_the_interval_since_a_snapshot():
+    rng = random.Random(2)
+    before = [rng.randrange(1, 1_000_000) for _ in range(2000)]
+    after = [rng.randrange(1, 1_000_000) for _ in range(1000)]
+    histogram, interval = LatencyHistogram(), LatencyHistogram()
+    record_us(histogram, before)
+    histogram.end_time = 10.0
+    earlier = copy(histogram)
+    record_us(histogram, after)
+    record_us(interval, after)
+    histogram.end_time = 11.0
+
+    delta = histogram.difference(earlier)
+    assert list(delta.counts) == list(interval.counts)
+    assert (delta.total, delta.items, delta.sum_us) == (interval.total, interval.items, interval.sum_us)
+    assert (delta.start_time, delta.end_time) == (10.0, 11.0)
+    # Extremes come back as bucket bounds, within the histogram's precision
+    assert interval.min_us <= delta.min_us <= interval.min_us * (1 + 1 / histogram.half)
+    assert interval.max_us <= delta.max_us <= interval.max_us * (1 + 1 / histogram.half)
+    for pct in (50, 99, 100):
+        assert delta.percentile(pct) == pytest.approx(interval.percentile(pct), rel=1 / histogram.half)
+
+    # Merging the interval back into the snapshot restores the full histogram
+    assert list(earlier.merge(delta).counts) == list(histogram.counts)
+
+
+def test_values_at_and_beyond_max_value_are_clamped():
+    histogram = LatencyHistogram(max_value_us=1_000_000)
+    histogram.record(1000.0)  # exactly max_value_us
+    histogram.record(5000.0)  # beyond it
+    histogram.record(-1.0)  # clock went backwards
+    assert histogram.max_us == 1_000_000
+    assert histogram.min_us == 0
+    assert histogram.counts[-1] == 2
+    assert histogram.percentile(100) == 1000.0
+    assert histogram.percentile(99.9) <= histogram.max_us / 1000
+
+
+def test_top_bucket_covers_max_value():
+    for max_value_us in (1_000, 1_000_000, 3_600_000_000):
+        histogram = LatencyHistogram(max_value_us=max_value_us)
+        top = len(histogram.counts) - 1
+        assert histogram._index(max_value_us) == top
+        assert histogram._highest_equivalent(top) >= max_value_us
+
+
+def test_recorder_snapshot_merges_thread_shards_and_reset_clears_them():
+    import threading
+
+    recorder = LatencyRecorder('test')
+    threads = [threading.Thread(target=lambda: [recorder.record(1.0) for _ in range(100)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert recorder.snapshot().total == 400
+    recorder.reset()
+    assert recorder.snapshot().total == 0
@@ -0,0 +1,59 @@
+import asyncio
+import math
+
+import pytest
+
+from LoadScheduler import arrival_offsets, ramp_stages, run_open_loop
+
+
+def test_constant_rate_is_evenly_spaced():
+    offsets = list(arrival_offsets(rate=10, duration=2))
+    assert len(offsets) == 20
+    assert offsets == pytest.approx([k / 10 for k in range(20)])
+
+
+def test_ramp_places_arrivals_on_the_rate_integral():
+    # 0 -> 10 rps over 2 s: 10 arrivals, the k-th where 5 * t^2 / 2 = k
+    offsets = list(arrival_offsets(ramp=[(2, 0, 10)]))
+    assert offsets == pytest.approx([math.sqrt(2 * k / 5) for k in range(10)])
+
+    down = list(arrival_offsets(ramp=[(2, 10, 0)]))
+    assert len(down) == 10
+    assert all(b - a > 0.09 for a, b in zip(down, down[1:]))
+
+
+def test_stages_follow_each_other():
+    offsets = list(arrival_offsets(ramp=[(1, 5, 5), (2, 0, 0), (1, 10, 10)]))
+    assert len(offsets) == 15
+    assert offsets[:5] == pytest.approx([0, 0.2, 0.4, 0.6, 0.8])
+    assert offsets[5:] == pytest.approx([3 + k / 10 for k in range(10)])
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'rate': 10, 'duration': 0},
+    {'ramp': [(5, 0, 10), (-1, 10, 10)]},
+])
+def test_stages_without_duration_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        ramp_stages(**kwargs)
+    with pytest.raises(ValueError):
+        list(arrival_offsets(**kwargs))
+
+
+def test_open_loop_latency_includes_queueing():
+    completions = []
+
+    async def operation():
+        await asyncio.sleep(0.05)
+        if len(completions) == 1:
+            raise RuntimeError("server error")
+
+    elapsed = asyncio.run(run_open_loop(
+        operation, [0, 0, 0], lambda *args: completions.append(args), max_in_flight=1,
+    ))
+    assert elapsed >= 0.15
+    assert [ok for _, _, ok in completions] == [True, False, True]
+    latency_ms, service_ms, _ = completions[-1]
+    # The last request waited for two others before it could be sent
+    assert latency_ms >= 140
+    assert service_ms < latency_ms - 80
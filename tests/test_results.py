@@ -0,0 +1,145 @@
+import gzip
+import json
+import math
+
+import pytest
+
+import Results
+from LatencyHistogram import LatencyHistogram
+from Results import (
+    _incomplete_beta, _student_t_cdf, compare_results, load_result, mann_whitney, merge_throughput,
+    save_result, welch_t,
+)
+
+
+def histogram_of(values_us):
+    histogram = LatencyHistogram()
+    for value in values_us:
+        histogram.record(value / 1000)
+    return histogram
+
+
+@pytest.mark.parametrize('x', [0.05, 0.3, 0.5, 0.8, 0.99])
+def test_incomplete_beta_closed_forms(x):
+    assert _incomplete_beta(1, 1, x) == pytest.approx(x)
+    assert _incomplete_beta(3, 1, x) == pytest.approx(x ** 3)
+    assert _incomplete_beta(1, 4, x) == pytest.approx(1 - (1 - x) ** 4)
+    assert _incomplete_beta(2.5, 7, x) + _incomplete_beta(7, 2.5, 1 - x) == pytest.approx(1)
+
+
+def test_incomplete_beta_bounds_and_symmetry():
+    assert _incomplete_beta(2, 3, 0) == 0.0
+    assert _incomplete_beta(2, 3, 1) == 1.0
+    assert _incomplete_beta(40, 40, 0.5) == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize('t', [-5, -1.3, 0.4, 2, 10])
+def test_student_t_cdf_closed_forms(t):
+    # df = 1 is the Cauchy distribution, df = 2 has a closed form as well
+    assert _student_t_cdf(t, 1) == pytest.approx(0.5 + math.atan(t) / math.pi)
+    assert _student_t_cdf(t, 2) == pytest.approx(0.5 + t / (2 * math.sqrt(2 + t * t)))
+
+
+def test_student_t_cdf_table_values():
+    assert _student_t_cdf(2.228, 10) == pytest.approx(0.975, abs=1e-4)
+    assert _student_t_cdf(-2.576, 1e6) == pytest.approx(0.005, abs=1e-4)
+
+
+def test_welch_t_against_hand_computed_value():
+    # Means 12 and 10, both variances 2.5: t = -2 with 8 degrees of freedom
+    assert welch_t([10, 11, 12, 13, 14], [8, 9, 10, 11, 12]) == pytest.approx(0.0403, abs=1e-4)
+    assert welch_t([10, 11, 12, 13, 14], [12, 13, 14, 15, 16]) == pytest.approx(1 - 0.0403, abs=1e-4)
+
+
+def test_welch_t_degenerate_samples():
+    assert welch_t([1], [1, 2]) is None
+    assert welch_t([5, 5, 5], [4, 4, 4]) == 0.0
+    assert welch_t([5, 5, 5], [6, 6, 6]) == 1.0
+
+
+def test_mann_whitney_matches_pairwise_count():
+    # Below sub_buckets every microsecond has its own bucket, so ties are exact ties
+    baseline = [3, 5, 5, 8, 9, 12, 20, 20, 21, 40]
+    candidate = [5, 9, 13, 22, 22, 30, 41, 50]
+    u = sum((b > a) + 0.5 * (b == a) for a in baseline for b in candidate)
+    n_a, n_b = len(baseline), len(candidate)
+    n = n_a + n_b
+    pooled = baseline + candidate
+    ties = sum(pooled.count(value) ** 3 - pooled.count(value) for value in set(pooled))
+    variance = n_a * n_b / 12 * ((n + 1) - ties / (n * (n - 1)))
+    expected = 0.5 * math.erfc((u - n_a * n_b / 2) / math.sqrt(variance) / math.sqrt(2))
+
+    p_value, probability = mann_whitney(histogram_of(baseline), histogram_of(candidate))
+    assert probability == pytest.approx(u / (n_a * n_b))
+    assert p_value == pytest.approx(expected)
+
+
+def test_mann_whitney_detects_shift_and_not_equality():
+    same = histogram_of(range(1000, 50_000, 7))
+    p_value, probability = mann_whitney(same, histogram_of(range(1000, 50_000, 7)))
+    assert probability == pytest.approx(0.5)
+    assert p_value == pytest.approx(0.5)
+
+    p_value, probability = mann_whitney(same, histogram_of(range(60_000, 100_000, 7)))
+    assert probability == 1.0
+    assert p_value < 1e-10
+    assert mann_whitney(LatencyHistogram(), same) == (1.0, 0.5)
+    with pytest.raises(ValueError):
+        mann_whitney(same, LatencyHistogram(precision_bits=5))
+
+
+def test_merge_throughput_aligns_on_intervals():
+    first = {'interval': 1.0, 'times': [100.0, 101.0, 102.0],
+             'phases': {'insert': {'completed': [1, 2, 3], 'items': [10, 20, 30], 'errors': [0, 0, 1]}}}
+    second = {'interval': 1.0, 'times': [101.1, 102.1, 103.1],
+              'phases': {'insert': {'completed': [4, 5, 6], 'items': [40, 50, 60], 'errors': [0, 0, 0]},
+                         'query': {'completed': [7, 0, 0], 'items': [7, 0, 0], 'errors': [0, 0, 0]}}}
+    merged = merge_throughput([first, None, second])
+    assert merged['times'] == [100.0, 101.0, 102.0, 103.0]
+    assert merged['phases']['insert'] == {
+        'completed': [1, 6, 8, 6], 'items': [10, 60, 80, 60], 'errors': [0, 0, 1, 0],
+    }
+    assert merged['phases']['query']['completed'] == [0, 7, 0, 0]
+    assert merge_throughput([]) == {'interval': 1.0, 'times': [], 'phases': {}}
+
+
+def result_with(values_us, rates, label='run'):
+    histogram = histogram_of(values_us)
+    return {
+        'version': Results.RESULT_VERSION,
+        'label': label,
+        'config': {'run': 'test'},
+        'environment': {'hostname': 'host'},
+        'histograms': {'insert': histogram.to_dict()},
+        'throughput': {'interval': 1.0, 'times': [float(t) for t in range(len(rates))],
+                       'phases': {'insert': {'completed': rates, 'items': rates, 'errors': [0] * len(rates)}}},
+    }
+
+
+def test_save_result_never_overwrites_and_load_round_trips(tmp_path):
+    result = result_with([1000, 2000], [0, 5, 5, 0])
+    paths = {save_result(str(tmp_path), result) for _ in range(3)}
+    assert len(paths) == 3
+    for path in paths:
+        assert load_result(path) == result
+
+
+def test_load_result_rejects_other_versions(tmp_path):
+    path = str(tmp_path / 'old.json.gz')
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump({'version': Results.RESULT_VERSION + 1}, f)
+    with pytest.raises(ValueError):
+        load_result(path)
+
+
+def test_compare_results_flags_regressions_only():
+    steady = [100, 101, 99, 100, 102, 98, 100, 101, 99, 100]
+    baseline = result_with(range(1000, 20_000, 3), [0, 50] + steady + [40, 0])
+    unchanged = result_with(range(1000, 20_000, 3), [0, 50] + steady[::-1] + [40, 0])
+    slower = result_with(range(3000, 40_000, 3), [0, 50] + [rate - 30 for rate in steady] + [40, 0])
+
+    rows = compare_results(baseline, unchanged)
+    assert [row['metric'] for row in rows] == ['latency p50', 'requests/s']
+    assert not any(row['regression'] for row in rows)
+    rows = compare_results(baseline, slower)
+    assert all(row['regression'] for row in rows)